@@ -0,0 +1,120 @@
+# activity_feed.py
+"""
+In-memory ring buffer of the most recent activities, already serialized as
+ActivityOut dicts, so GET /activity/recent never has to query the database.
+
+The buffer is warmed from the database at startup and then fed by the write
+paths in crud after each commit. Every change gets a sequence number and is
+kept in a bounded change log, deletions included, so clients can poll with
+`since` for what changed in order. The buffer is per process: with several
+workers, each one sees its own writes plus whatever it loaded at startup.
+"""
+import os
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Iterable, List, Optional, Tuple
+
+ACTIVITY_FEED_SIZE = int(os.getenv("ACTIVITY_FEED_SIZE", "200"))
+# Distinct activities remembered in the change log, as a multiple of the size
+ACTIVITY_FEED_LOG_FACTOR = int(os.getenv("ACTIVITY_FEED_LOG_FACTOR", "4"))
+
+
+class ActivityFeed:
+    """Bounded, thread-safe buffer of serialized activities, newest last"""
+
+    def __init__(self, size: int = ACTIVITY_FEED_SIZE, log_size: Optional[int] = None):
+        self.size = size
+        self.log_size = log_size or size * ACTIVITY_FEED_LOG_FACTOR
+        self._entries: "OrderedDict[int, Tuple[int, dict]]" = OrderedDict()
+        # activity id -> (seq of its latest change, deleted), oldest change first
+        self._changes: "OrderedDict[int, Tuple[int, bool]]" = OrderedDict()
+        # Changes up to this seq may have been dropped from the log
+        self._floor = 0
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.warmed = False
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the latest change"""
+        return self._seq
+
+    def _record(self, activity_id: int, deleted: bool = False) -> int:
+        """Log a change to an activity (lock held); returns its seq"""
+        self._seq += 1
+        self._changes.pop(activity_id, None)
+        self._changes[activity_id] = (self._seq, deleted)
+        while len(self._changes) > self.log_size:
+            _, (seq, _) = self._changes.popitem(last=False)
+            self._floor = seq
+        return self._seq
+
+    def warm(self, activities: Iterable[dict]) -> None:
+        """Replace the buffer with activities given newest first"""
+        with self._lock:
+            self._entries.clear()
+            for activity in reversed(list(activities)[:self.size]):
+                self._entries[activity["id"]] = (self._record(activity["id"]), activity)
+            self.warmed = True
+
+    def add(self, activity: dict) -> None:
+        """Buffer a newly created activity as the newest entry"""
+        with self._lock:
+            self._entries[activity["id"]] = (self._record(activity["id"]), activity)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def update(self, activity: dict) -> None:
+        """
+        Replace a buffered activity in place.
+
+        Updates keep their position because the feed is ordered by when the
+        activity was added; activities older than the buffer are ignored.
+        """
+        with self._lock:
+            if activity["id"] in self._entries:
+                self._entries[activity["id"]] = (self._record(activity["id"]), activity)
+
+    def remove(self, activity_id: int) -> None:
+        """Drop a deleted activity and leave a tombstone for `since` pollers"""
+        with self._lock:
+            self._entries.pop(activity_id, None)
+            self._record(activity_id, deleted=True)
+
+    def recent(self, limit: int) -> Tuple[List[dict], int]:
+        """Return up to `limit` activities, newest first, and the current seq"""
+        with self._lock:
+            items = [activity for _, activity in islice(reversed(self._entries.values()), limit)]
+            return items, self._seq
+
+    def changes(self, since: int, limit: int) -> Optional[Tuple[List[dict], int]]:
+        """
+        Up to `limit` changes after `since`, oldest first, and the seq to poll
+        with next (that of the last change returned).
+
+        A deleted activity appears as {"id": ..., "deleted": True}. Returns
+        None when changes after `since` may have been dropped from the log
+        (or `since` comes from another process); the caller must start over
+        from recent().
+        """
+        with self._lock:
+            if since < self._floor or since > self._seq:
+                return None
+            items = []
+            last = since
+            for activity_id, (seq, deleted) in self._changes.items():
+                if seq <= since:
+                    continue
+                if len(items) >= limit:
+                    break
+                last = seq
+                if deleted:
+                    items.append({"id": activity_id, "deleted": True})
+                elif activity_id in self._entries:
+                    items.append(self._entries[activity_id][1])
+                # else: pushed out of the buffer, and older than what it shows
+            return items, last
+
+
+feed = ActivityFeed()
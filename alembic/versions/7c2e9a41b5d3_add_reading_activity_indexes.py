@@ -0,0 +1,70 @@
+"""add reading_activity indexes
+
+Revision ID: 7c2e9a41b5d3
+Revises: 384df1149443
+Create Date: 2026-10-18 09:12:41.512307
+
+Before the unique (user_id, book_id) index is created, duplicate
+activities are merged: each pair keeps the row with the most progress
+(the latest one on a tie), with the earliest date_added of the group. The
+other rows are deleted and their count is logged. Deleted rows cannot be
+restored; downgrade only drops the indexes, so back up the database first
+if the duplicates matter.
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9a41b5d3'
+down_revision: Union[str, None] = '384df1149443'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+log = logging.getLogger("alembic.runtime.migration")
+
+# The row kept for each (user_id, book_id): most progress, then latest
+KEEPERS = (
+    "SELECT id FROM ("
+    "SELECT id, ROW_NUMBER() OVER ("
+    "PARTITION BY user_id, book_id ORDER BY COALESCE(progress, 0) DESC, id DESC"
+    ") AS place FROM reading_activity"
+    ") AS ranked WHERE place = 1"
+)
+
+
+def upgrade() -> None:
+    # Merge duplicate (user_id, book_id) rows so the unique index can be
+    # created on existing databases
+    duplicates = op.get_bind().scalar(sa.text(
+        "SELECT COALESCE(SUM(n - 1), 0) FROM ("
+        "SELECT COUNT(*) AS n FROM reading_activity GROUP BY user_id, book_id HAVING COUNT(*) > 1"
+        ") AS duplicated"
+    ))
+    if duplicates:
+        log.warning(
+            "Merging %d duplicate reading_activity rows into one per (user_id, book_id); "
+            "the merged-away rows are deleted and cannot be restored by downgrade",
+            duplicates,
+        )
+        op.execute(
+            "UPDATE reading_activity SET date_added = ("
+            "SELECT MIN(other.date_added) FROM reading_activity AS other "
+            "WHERE other.user_id = reading_activity.user_id AND other.book_id = reading_activity.book_id"
+            f") WHERE id IN ({KEEPERS})"
+        )
+        op.execute(f"DELETE FROM reading_activity WHERE id NOT IN ({KEEPERS})")
+    op.create_index('ix_reading_activity_user_id_book_id', 'reading_activity', ['user_id', 'book_id'], unique=True)
+    op.create_index('ix_reading_activity_user_id_status', 'reading_activity', ['user_id', 'status'], unique=False)
+    op.create_index(op.f('ix_reading_activity_date_added'), 'reading_activity', ['date_added'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_reading_activity_date_added'), table_name='reading_activity')
+    op.drop_index('ix_reading_activity_user_id_status', table_name='reading_activity')
+    op.drop_index('ix_reading_activity_user_id_book_id', table_name='reading_activity')
@@ -0,0 +1,26 @@
+"""add reading_activity (user_id, id) index for library paging
+
+Revision ID: a3f5d2c8e614
+Revises: e4a8c3f17b90
+Create Date: 2026-10-18 19:02:17.448120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f5d2c8e614'
+down_revision: Union[str, None] = 'e4a8c3f17b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_reading_activity_user_id_id', 'reading_activity', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reading_activity_user_id_id', table_name='reading_activity')
@@ -0,0 +1,43 @@
+"""add user_reading_stats
+
+Revision ID: b91f04d6e2a7
+Revises: c81d2e5f4a07
+Create Date: 2026-10-18 14:03:17.284196
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b91f04d6e2a7'
+down_revision: Union[str, None] = 'c81d2e5f4a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_reading_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=64), nullable=False),
+    sa.Column('activity_count', sa.Integer(), nullable=False),
+    sa.Column('favorite_count', sa.Integer(), nullable=False),
+    sa.Column('progress_total', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'status')
+    )
+    # Backfill from the existing activities
+    op.execute(
+        "INSERT INTO user_reading_stats "
+        "(user_id, status, activity_count, favorite_count, progress_total) "
+        "SELECT user_id, status, COUNT(*), "
+        "SUM(CASE WHEN is_favorite = 1 THEN 1 ELSE 0 END), "
+        "SUM(COALESCE(progress, 0)) "
+        "FROM reading_activity GROUP BY user_id, status"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_reading_stats')
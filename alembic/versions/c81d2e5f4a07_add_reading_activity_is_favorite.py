@@ -0,0 +1,37 @@
+"""add reading_activity.is_favorite
+
+Revision ID: c81d2e5f4a07
+Revises: 7c2e9a41b5d3
+Create Date: 2026-10-18 13:21:06.417952
+
+The column has been in models.Activity since the first release but was
+missing from the initial migration, so only databases created with
+create_all have it. It is added here when missing, before the stats
+backfill in b91f04d6e2a7 reads it.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81d2e5f4a07'
+down_revision: Union[str, None] = '7c2e9a41b5d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column() -> bool:
+    columns = sa.inspect(op.get_bind()).get_columns('reading_activity')
+    return any(column['name'] == 'is_favorite' for column in columns)
+
+
+def upgrade() -> None:
+    if not _has_column():
+        op.add_column('reading_activity', sa.Column('is_favorite', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('reading_activity', 'is_favorite')
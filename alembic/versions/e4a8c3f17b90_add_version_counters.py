@@ -0,0 +1,28 @@
+"""add version counters for conditional GET
+
+Revision ID: e4a8c3f17b90
+Revises: b91f04d6e2a7
+Create Date: 2026-10-18 16:41:52.903315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a8c3f17b90'
+down_revision: Union[str, None] = 'b91f04d6e2a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('library_version', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('books', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('books', 'version')
+    op.drop_column('users', 'library_version')
@@ -0,0 +1,24 @@
+# bench/__init__.py
+"""
+Load-test and benchmark harness for the Readify API.
+
+    python -m bench.run                                  # seed a temp SQLite db, run in-process
+    python -m bench.run --users 500 --duration 60        # bigger dataset, longer run
+    python -m bench.run --mode http --url http://127.0.0.1:8000
+    python -m bench.compare before.json after.json       # diff two result files
+    python -m bench.sse_fanout --subscribers 5000        # SSE connect/fan-out under many open streams
+    python -m bench.upstream --latency-ms 300            # remote searches against a slow Google stub
+    python -m bench.export_memory --sizes 10000,1000000  # export peak memory against library size
+    python -m bench.bulk_import --books 2000             # POST /books/bulk against one POST /books/ per book
+    python -m bench.bulk_activity --items 500            # /activity/bulk against the per-item endpoints
+    python -m bench.db_contention --readers 8            # SQLite readers vs writers, tuned engine vs bare
+    python -m bench.async_vs_sync --concurrency 500      # library read as a sync vs an async route
+    python -m bench.login_storm --logins 50              # GET /books/{id} latency during a login storm
+    python -m bench.auth_overhead                        # cost of resolving the caller per request
+    python -m bench.local_search --books 1000000         # local search latency over a large catalogue
+    python -m bench.ab feed                              # one endpoint under two env settings (see bench/ab.py)
+    python -m bench.ab brotli                            # library page with compression off vs on
+
+Results are written as JSON (bench/results/ by default) with throughput and
+p50/p95/p99 per endpoint, tagged with the git commit they were taken at.
+"""
@@ -0,0 +1,230 @@
+# bench/ab.py
+"""
+One endpoint under two settings, each in its own process.
+
+    python -m bench.ab PRESET [--duration S] [--concurrency N] [--rounds N] [--users N]
+                              [--books N] [--activities N] [--database-url URL] [--output PATH]
+
+Settings read from the environment at import time (cache sizes, feature
+flags) can only be compared by starting the app twice. The database is
+seeded once, then each side of the preset runs in a fresh interpreter with
+its environment overrides, starts the app's lifespan and drives the
+preset's request with --concurrency clients for --duration seconds
+in-process (like bench.run). With --rounds the sides alternate that many
+times and each side reports its median round by throughput, which evens
+out drift on a noisy machine. Presets:
+
+- feed: GET /activity/recent?limit=10 with ACTIVITY_FEED_SIZE=0 (the
+  ORDER BY date_added query) against the in-memory feed
+- orjson: a 50-item library page (uncompressed) with the stdlib encoder
+  against FAST_JSON_RESPONSE
+- gzip, brotli: the same page with Accept-Encoding: gzip or br, with
+  COMPRESSION_ENABLED off and on
+- metrics: GET /books/{id} (served from the book cache, so the
+  instrumentation is a large share of the work) with METRICS_ENABLED off
+  and on
+- book-cache: the same request with BOOK_CACHE_SIZE=0 (a SELECT and a
+  BookOut validation per request) against the book cache
+- profiler: the same request with the profiler off, enabled but sampling
+  nothing (the per-request check), and sampling 1% of requests into a
+  temporary PROFILER_DIR
+
+Besides latency, each side reports the mean bytes on the wire per response
+and the process CPU time per request (the in-process client included).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.run import configure_environment, save_report
+
+
+def library_page(accept_encoding: str):
+    """Request for a random user's first 50 activities"""
+    def request(rng, args):
+        from bench.seed import username
+        return f"/activity/{username(rng.randrange(args.users))}", {"limit": 50}, {"Accept-Encoding": accept_encoding}
+    return request
+
+
+def book(rng, args):
+    return f"/books/{rng.randrange(args.books) + 1}", None, None
+
+
+PRESETS = {
+    "feed": {
+        "request": lambda rng, args: ("/activity/recent", {"limit": 10}, None),
+        "sides": {"query": {"ACTIVITY_FEED_SIZE": "0"}, "feed": {}},
+    },
+    "orjson": {
+        "request": library_page("identity"),
+        "sides": {"stdlib": {"FAST_JSON_RESPONSE": "false"}, "orjson": {"FAST_JSON_RESPONSE": "true"}},
+    },
+    "gzip": {
+        "request": library_page("gzip"),
+        "sides": {"off": {"COMPRESSION_ENABLED": "false"}, "gzip": {"COMPRESSION_ENABLED": "true"}},
+    },
+    "brotli": {
+        "request": library_page("br"),
+        "sides": {"off": {"COMPRESSION_ENABLED": "false"}, "brotli": {"COMPRESSION_ENABLED": "true"}},
+    },
+    "metrics": {
+        "request": book,
+        "sides": {"off": {"METRICS_ENABLED": "false"}, "on": {"METRICS_ENABLED": "true"}},
+    },
+    "book-cache": {
+        "request": book,
+        "sides": {"off": {"BOOK_CACHE_SIZE": "0"}, "cached": {}},
+    },
+    "profiler": {
+        "request": book,
+        "sides": {
+            "off": {"PROFILER_ENABLED": "false"},
+            "idle": {"PROFILER_ENABLED": "true", "PROFILER_SAMPLE_RATE": "0"},
+            "sampled": {
+                "PROFILER_ENABLED": "true",
+                "PROFILER_SAMPLE_RATE": "0.01",
+                "PROFILER_DIR": os.path.join(tempfile.gettempdir(), "readify-bench-profiles"),
+            },
+        },
+    },
+}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("preset", choices=sorted(PRESETS))
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per side")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Unmeasured seconds before each side")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=1, help="Alternating runs of each side")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--activities", type=int, default=50, help="Activities per user")
+    parser.add_argument("--database-url", default=None, help="Database to seed and serve")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--side", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/<commit>-ab-<preset>-<time>.json)")
+    args = parser.parse_args(argv)
+    args.mode = "inprocess"
+    return args
+
+
+async def drive(client, request, args: argparse.Namespace, duration: float, seed: int) -> dict:
+    from bench.workload import summarize
+
+    latencies = []
+    errors = 0
+    received = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(index: int):
+        nonlocal errors, received
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            path, params, headers = request(rng, args)
+            start = time.perf_counter()
+            response = await client.get(path, params=params, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+            # Before content decoding, i.e. what went over the wire
+            received += response.num_bytes_downloaded
+
+    start, cpu = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(worker(index) for index in range(args.concurrency)))
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+    return {
+        **summarize(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "errors": errors,
+        "bytes_per_response": round(received / len(latencies)) if latencies else 0,
+        "cpu_ms_per_request": round(cpu / len(latencies) * 1000, 3) if latencies else 0.0,
+    }
+
+
+async def run_side(args: argparse.Namespace) -> dict:
+    """Serve and drive one side (in the child process)"""
+    import httpx
+    import google_books
+    from bench import stub_google
+    from main import app
+
+    request = PRESETS[args.preset]["request"]
+    google_books._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_google.app))
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://readify") as client:
+            if args.warmup > 0:
+                await drive(client, request, args, args.warmup, args.seed + 1)
+            return await drive(client, request, args, args.duration, args.seed)
+
+
+def spawn(args: argparse.Namespace, side: str, overrides: dict) -> dict:
+    """Run one side in a fresh interpreter, with its settings in the environment"""
+    command = [
+        sys.executable, "-m", "bench.ab", args.preset, "--side", side,
+        "--database-url", args.database_url,
+        "--duration", str(args.duration), "--warmup", str(args.warmup),
+        "--concurrency", str(args.concurrency), "--users", str(args.users),
+        "--books", str(args.books), "--seed", str(args.seed),
+    ]
+    completed = subprocess.run(
+        command, env={**os.environ, **overrides}, stdout=subprocess.PIPE, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+
+    if args.side is not None:
+        print(json.dumps(asyncio.run(run_side(args))))
+        return 0
+
+    from bench.seed import seed
+    seeded = seed(args.users, args.books, args.activities, args.seed)
+
+    sides = PRESETS[args.preset]["sides"]
+    rounds = {side: [] for side in sides}
+    for _ in range(args.rounds):
+        for side, overrides in sides.items():
+            rounds[side].append(spawn(args, side, overrides))
+    results = {}
+    for side, runs in rounds.items():
+        median = sorted(runs, key=lambda run: run["rps"])[len(runs) // 2]
+        results[side] = {**median, "rounds_rps": [run["rps"] for run in runs], "env": sides[side]}
+    first, last = list(sides)[0], list(sides)[-1]
+    results["ratio"] = round(results[last]["rps"] / results[first]["rps"], 2) if results[first]["rps"] else None
+
+    config = {
+        "preset": args.preset,
+        "duration_s": args.duration,
+        "warmup_s": args.warmup,
+        "concurrency": args.concurrency,
+        "rounds": args.rounds,
+        "users": args.users,
+        "books": args.books,
+        "activities_per_user": args.activities,
+    }
+    output = save_report(f"ab-{args.preset}", config, seeded, results, args.output)
+
+    for side in sides:
+        row = results[side]
+        print(
+            f"{side:<8} {row['rps']:>9} req/s  p50 {row['p50_ms']} ms  p95 {row['p95_ms']} ms  "
+            f"p99 {row['p99_ms']} ms  {row['bytes_per_response']} B/resp  "
+            f"{row['cpu_ms_per_request']} ms CPU/req  {row['errors']} errors"
+        )
+    print(f"{last} is {results['ratio']}x {first} -> {output}")
+    return 0 if not any(results[side]["errors"] for side in sides) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
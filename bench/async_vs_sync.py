@@ -0,0 +1,147 @@
+# bench/async_vs_sync.py
+"""
+The library read through a sync (threadpool) route against an async one.
+
+    python -m bench.async_vs_sync [--concurrency N] [--duration S] [--users N]
+                                  [--database-url URL] [--output PATH]
+
+Runs in-process against a seeded SQLite file (like bench.run). Two routes
+that do the same work as GET /activity/{username} (identity lookup, one
+page of activities with their books, encoded with page_response) are
+mounted on a bare FastAPI app:
+
+- sync: `def` with database.get_db, so each request holds one of the
+  threadpool's 40 slots for its whole database round trip
+- async: `async def` with database.get_async_db
+
+Each is driven with --concurrency requests in flight (500 by default) for
+--duration seconds. The report gives throughput, p50/p95/p99 and errors.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from bench.run import configure_environment, save_report
+
+PAGE = 50
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=500, help="Requests in flight")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per route")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each route")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--activities", type=int, default=50, help="Activities per user")
+    parser.add_argument("--database-url", default=None, help="Database to seed and serve")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/<commit>-async-vs-sync-<time>.json)")
+    args = parser.parse_args(argv)
+    args.mode = "inprocess"
+    return args
+
+
+def build_app():
+    """A bare app with the library read as a sync and as an async route"""
+    from fastapi import Depends, FastAPI
+    import crud
+    import schemas
+    from database import get_async_db, get_db
+    from responses import page_response
+
+    app = FastAPI()
+
+    @app.get("/sync/{username}")
+    def sync_library(username: str, db=Depends(get_db)):
+        user = crud.get_user_identity(db, username)
+        activities = crud.get_user_activities(db, user, limit=PAGE + 1)
+        return page_response(schemas.ActivityOut, activities, PAGE)
+
+    @app.get("/async/{username}")
+    async def async_library(username: str, db=Depends(get_async_db)):
+        user = await crud.get_user_identity_async(db, username)
+        activities = await crud.get_user_activities_async(db, user, limit=PAGE + 1)
+        return page_response(schemas.ActivityOut, activities, PAGE)
+
+    return app
+
+
+async def drive(client, route: str, usernames, duration: float, concurrency: int, seed: int) -> dict:
+    from bench.workload import summarize
+
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(f"/{route}/{rng.choice(usernames)}")
+                errors += response.status_code != 200
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {**summarize(latencies), "rps": round(len(latencies) / elapsed, 1), "errors": errors}
+
+
+async def run(args: argparse.Namespace, usernames) -> dict:
+    import httpx
+    from database import async_engine
+
+    app = build_app()
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://readify", timeout=120) as client:
+            for route in ("sync", "async"):
+                if args.warmup > 0:
+                    await drive(client, route, usernames, args.warmup, args.concurrency, args.seed + 1)
+                results[route] = await drive(client, route, usernames, args.duration, args.concurrency, args.seed)
+    finally:
+        # Without the app's lifespan nobody else closes the aiosqlite threads
+        await async_engine.dispose()
+    results["speedup"] = round(results["async"]["rps"] / results["sync"]["rps"], 2) if results["sync"]["rps"] else None
+    return results
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from bench.seed import seed, username
+    seeded = seed(args.users, args.books, args.activities, args.seed)
+    usernames = [username(i) for i in range(args.users)]
+
+    results = asyncio.run(run(args, usernames))
+    config = {
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "users": args.users,
+        "books": args.books,
+        "activities_per_user": args.activities,
+    }
+    output = save_report("async-vs-sync", config, seeded, results, args.output)
+
+    print(f"{args.concurrency} requests in flight, {args.duration:g} s per route")
+    for route in ("sync", "async"):
+        row = results[route]
+        print(
+            f"{route:<6} {row['rps']:>9} req/s  p50 {row['p50_ms']} ms  p95 {row['p95_ms']} ms  "
+            f"p99 {row['p99_ms']} ms  {row['errors']} errors"
+        )
+    print(f"async is {results['speedup']}x sync -> {output}")
+    return 0 if not results["sync"]["errors"] and not results["async"]["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
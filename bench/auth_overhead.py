@@ -0,0 +1,130 @@
+# bench/auth_overhead.py
+"""
+Per-request cost of identifying the caller, before and after signed tokens.
+
+    python -m bench.auth_overhead [--iterations N] [--users N] [--database-url URL] [--output PATH]
+
+Runs in-process against a seeded SQLite file (like bench.run). Each way of
+resolving the caller is timed --iterations times:
+
+- username_lookup: crud.get_user_by_username, the per-request round trip
+  every endpoint made when callers were identified by a username param
+- token_verify: security.decode_access_token with its cache cleared first
+  (HMAC check and claims parsing)
+- token_cached: security.decode_access_token on a cached token
+- me_cold / me_warm: GET /users/me end to end, with the token and identity
+  caches cleared before every request, and with both warm
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from bench.run import configure_environment, save_report
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--database-url", default=None, help="Database to seed and serve")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/<commit>-auth-<time>.json)")
+    args = parser.parse_args(argv)
+    args.mode = "inprocess"
+    return args
+
+
+def timed(fn, iterations: int, before=None) -> list:
+    samples = []
+    for i in range(iterations):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def timed_async(fn, iterations: int, before=None) -> list:
+    samples = []
+    for i in range(iterations):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        await fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize_us(samples) -> dict:
+    from bench.workload import summarize
+    row = summarize(samples)
+    return {
+        "count": row["count"],
+        "mean_us": round(sum(samples) / len(samples) * 1e6, 1),
+        "p50_us": round(row["p50_ms"] * 1000, 1),
+        "p99_us": round(row["p99_ms"] * 1000, 1),
+    }
+
+
+async def run(args: argparse.Namespace, usernames) -> dict:
+    import httpx
+    import crud
+    import security
+    from database import SessionLocal
+    from main import app
+
+    results = {}
+    db = SessionLocal()
+    try:
+        users = [crud.get_user_by_username(db, name) for name in usernames]
+        tokens = [security.create_access_token(user.id, user.username) for user in users]
+        results["username_lookup"] = timed(lambda i: crud.get_user_by_username(db, usernames[i % len(usernames)]), args.iterations)
+    finally:
+        db.close()
+
+    results["token_verify"] = timed(
+        lambda i: security.decode_access_token(tokens[i % len(tokens)]), args.iterations, security.token_cache.clear
+    )
+    results["token_cached"] = timed(lambda i: security.decode_access_token(tokens[i % len(tokens)]), args.iterations)
+
+    def clear_caches():
+        security.token_cache.clear()
+        crud.identity_cache.clear()
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://readify") as client:
+            async def me(i):
+                response = await client.get("/users/me", headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"})
+                response.raise_for_status()
+
+            results["me_cold"] = await timed_async(me, args.iterations, clear_caches)
+            await timed_async(me, len(tokens))  # fill the caches
+            results["me_warm"] = await timed_async(me, args.iterations)
+
+    return {name: summarize_us(samples) for name, samples in results.items()}
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from bench.seed import seed, username
+    seeded = seed(args.users, 10, 1, args.seed)
+    usernames = [username(i) for i in range(args.users)]
+
+    results = asyncio.run(run(args, usernames))
+    config = {"iterations": args.iterations, "users": args.users}
+    output = save_report("auth", config, seeded, results, args.output)
+
+    print(f"{'':<16} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}")
+    for name, row in results.items():
+        print(f"{name:<16} {row['mean_us']:>9} {row['p50_us']:>9} {row['p99_us']:>9}")
+    print(f"-> {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# bench/bulk_activity.py
+"""
+Library write throughput: per-item activity endpoints against the bulk ones.
+
+    python -m bench.bulk_activity [--items N] [--batch N] [--database-url URL] [--output PATH]
+
+Runs in-process against a freshly seeded SQLite file (like bench.run). Two
+users each add the same --items books to their library and then mark every
+one finished: one through POST /activity/ and PUT /activity/{id} per item,
+the other through POST /activity/bulk and PUT /activity/bulk, --batch items
+per request. The patches change status as well as progress, so neither
+side is absorbed by the progress write-behind buffer. The report gives
+items per second for each step and the speed-ups.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from bench.run import configure_environment, save_report
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=500, help="Books added and updated per mode")
+    parser.add_argument("--batch", type=int, default=100, help="Items per bulk request")
+    parser.add_argument("--database-url", default=None, help="Database to seed and serve")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/<commit>-bulk-activity-<time>.json)")
+    args = parser.parse_args(argv)
+    args.mode = "inprocess"
+    return args
+
+
+def rate(count: int, elapsed: float) -> dict:
+    return {"seconds": round(elapsed, 3), "items_per_s": round(count / elapsed, 1) if elapsed else None}
+
+
+async def single(client, username: str, book_ids) -> dict:
+    errors = 0
+    activity_ids = []
+    start = time.perf_counter()
+    for book_id in book_ids:
+        response = await client.post("/activity/", json={"username": username, "book_id": book_id, "status": "reading"})
+        errors += response.status_code != 201
+        activity_ids.append(response.json().get("id"))
+    create = rate(len(book_ids), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for activity_id in activity_ids:
+        response = await client.put(f"/activity/{activity_id}", json={"status": "finished", "progress": 100})
+        errors += response.status_code != 200
+    update = rate(len(activity_ids), time.perf_counter() - start)
+    return {"create": create, "update": update, "errors": errors}
+
+
+async def bulk(client, username: str, book_ids, batch: int) -> dict:
+    errors = 0
+    activity_ids = []
+    start = time.perf_counter()
+    for offset in range(0, len(book_ids), batch):
+        response = await client.post("/activity/bulk", json={"username": username, "items": [
+            {"book_id": book_id, "status": "reading"} for book_id in book_ids[offset:offset + batch]
+        ]})
+        results = response.json() if response.status_code == 200 else []
+        errors += sum(1 for item in results if item["outcome"] != "created") + (response.status_code != 200)
+        activity_ids.extend(item["activity_id"] for item in results)
+    create = rate(len(book_ids), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for offset in range(0, len(activity_ids), batch):
+        response = await client.put("/activity/bulk", json={"username": username, "items": [
+            {"id": activity_id, "status": "finished", "progress": 100} for activity_id in activity_ids[offset:offset + batch]
+        ]})
+        results = response.json() if response.status_code == 200 else []
+        errors += sum(1 for item in results if item["outcome"] != "updated") + (response.status_code != 200)
+    update = rate(len(activity_ids), time.perf_counter() - start)
+    return {"create": create, "update": update, "errors": errors}
+
+
+async def run(args: argparse.Namespace, usernames, book_ids) -> dict:
+    import httpx
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://readify", timeout=60) as client:
+            results = {
+                "single": await single(client, usernames[0], book_ids),
+                "bulk": await bulk(client, usernames[1], book_ids, args.batch),
+            }
+    for step in ("create", "update"):
+        results[f"{step}_speedup"] = round(
+            results["bulk"][step]["items_per_s"] / results["single"][step]["items_per_s"], 1
+        )
+    return results
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from sqlalchemy import select
+    from bench.seed import seed, username
+    from database import SessionLocal
+    from models import Book
+    seeded = seed(2, args.items, 0, args.seed)
+    db = SessionLocal()
+    try:
+        book_ids = db.scalars(select(Book.id).order_by(Book.id).limit(args.items)).all()
+    finally:
+        db.close()
+
+    results = asyncio.run(run(args, [username(0), username(1)], book_ids))
+    config = {"items": args.items, "batch": args.batch}
+    output = save_report("bulk-activity", config, seeded, results, args.output)
+
+    for mode in ("single", "bulk"):
+        row = results[mode]
+        print(
+            f"{mode:<7} add {row['create']['items_per_s']} items/s, update {row['update']['items_per_s']} items/s, "
+            f"{row['errors']} errors"
+        )
+    print(f"bulk is {results['create_speedup']}x (add) and {results['update_speedup']}x (update) -> {output}")
+    return 0 if not results["single"]["errors"] and not results["bulk"]["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+# bench/bulk_import.py
+"""
+Book import throughput: POST /books/ one at a time against POST /books/bulk.
+
+    python -m bench.bulk_import [--books N] [--batch N] [--existing PCT]
+                                [--database-url URL] [--output PATH]
+
+Runs in-process against a fresh SQLite file (like bench.run). Both modes
+import the same number of new books (unique external_ids), with --existing
+percent of each payload repeating books that are already stored, as
+happens when a catalogue is re-imported. The report gives wall time and
+rows per second for each mode and the speed-up.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from bench.run import configure_environment, save_report
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=2000, help="Books imported per mode")
+    parser.add_argument("--batch", type=int, default=500, help="Books per POST /books/bulk request")
+    parser.add_argument("--existing", type=float, default=20.0, help="Percent of each payload that is already stored")
+    parser.add_argument("--database-url", default=None, help="Database to seed and serve")
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/<commit>-bulk-import-<time>.json)")
+    args = parser.parse_args(argv)
+    args.mode = "inprocess"
+    return args
+
+
+def payload(mode: str, count: int, existing: float) -> list:
+    """count books for mode, every 1/existing-th one repeating an already stored book"""
+    every = int(100 / existing) if existing else 0
+    books = []
+    for i in range(count):
+        if every and i % every == 0:
+            books.append({"title": "Already stored", "external_id": f"bulk-bench-known-{i % 50}"})
+        else:
+            books.append({
+                "title": f"Imported {mode} {i}",
+                "author": f"Author {i % 97}",
+                "description": "A book imported by the bulk benchmark. " * 4,
+                "category": "Fiction",
+                "external_id": f"bulk-bench-{mode}-{i}",
+            })
+    return books
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import httpx
+    from main import app
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://readify", timeout=60) as client:
+            response = await client.post("/books/bulk", json=[
+                {"title": "Already stored", "external_id": f"bulk-bench-known-{i}"} for i in range(50)
+            ])
+            response.raise_for_status()
+
+            books = payload("single", args.books, args.existing)
+            errors = 0
+            start = time.perf_counter()
+            for book in books:
+                response = await client.post("/books/", json=book)
+                errors += response.status_code != 201
+            elapsed = time.perf_counter() - start
+            results["single"] = {"seconds": round(elapsed, 3), "rows_per_s": round(len(books) / elapsed, 1), "errors": errors}
+
+            books = payload("bulk", args.books, args.existing)
+            errors = 0
+            created = existing = 0
+            start = time.perf_counter()
+            for offset in range(0, len(books), args.batch):
+                response = await client.post("/books/bulk", json=books[offset:offset + args.batch])
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                created += len(response.json()["created"])
+                existing += len(response.json()["existing"])
+            elapsed = time.perf_counter() - start
+            results["bulk"] = {
+                "seconds": round(elapsed, 3),
+                "rows_per_s": round(len(books) / elapsed, 1),
+                "created": created,
+                "existing": existing,
+                "errors": errors,
+            }
+
+    results["speedup"] = round(results["bulk"]["rows_per_s"] / results["single"]["rows_per_s"], 1)
+    return results
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from bench.seed import seed
+    seeded = seed(1, 1, 1, 42)
+
+    results = asyncio.run(run(args))
+    config = {"books": args.books, "batch": args.batch, "existing_pct": args.existing}
+    output = save_report("bulk-import", config, seeded, results, args.output)
+
+    for mode in ("single", "bulk"):
+        row = results[mode]
+        print(f"{mode:<7} {args.books} books in {row['seconds']} s: {row['rows_per_s']} rows/s, {row['errors']} errors")
+    print(f"bulk is {results['speedup']}x single inserts -> {output}")
+    return 0 if not results["single"]["errors"] and not results["bulk"]["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+# bench/compare.py
+"""
+Compare two bench result files endpoint by endpoint.
+
+    python -m bench.compare bench/results/old.json bench/results/new.json
+
+Exits with 1 if any endpoint's p95 regressed by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed p95 regression in percent")
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print(f"{before['git']['commit']} -> {after['git']['commit']}")
+
+    regressed = []
+    endpoints = sorted(set(before["results"]["endpoints"]) | set(after["results"]["endpoints"]))
+    for name in endpoints:
+        old = before["results"]["endpoints"].get(name)
+        new = after["results"]["endpoints"].get(name)
+        if old is None or new is None:
+            print(f"{name:<10} only in {'after' if old is None else 'before'}")
+            continue
+        cells = [f"{metric} {old[metric]} -> {new[metric]} ({_change(old[metric], new[metric])})" for metric in METRICS]
+        print(f"{name:<10} " + "  ".join(cells))
+        if old["p95_ms"] and (new["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 > args.threshold:
+            regressed.append(name)
+
+    if regressed:
+        print(f"p95 regressed more than {args.threshold:g}%: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+# bench/db_contention.py
+"""
+Readers against writers on one SQLite file: the tuned engine against a bare one.
+
+    python -m bench.db_contention [--seconds S] [--readers N] [--writers N] [--rows N]
+                                  [--path FILE] [--output PATH]
+
+Each reader thread scans a --rows table over and over, pausing while the
+scan is open, so a read is always in progress. --writers threads read a
+row and write it back, committing each change, back to back. The same
+workload runs twice:
+
+- tuned: database.build_engine (WAL, synchronous=NORMAL, busy_timeout, ...)
+- bare: create_engine(url) with SQLite's defaults (rollback journal)
+
+The report gives reads and writes per second, write latency and the
+"database is locked" (or any other OperationalError) count for each.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from bench.run import save_report
+
+TABLE = "bench_contention"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0, help="Measured seconds per engine")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=2000, help="Rows each read scans")
+    parser.add_argument("--path", default=None, help="SQLite file to use (default: a temp file)")
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/<commit>-db-contention-<time>.json)")
+    return parser.parse_args(argv)
+
+
+def prepare(engine, rows: int) -> None:
+    from sqlalchemy import text
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        connection.execute(text(f"CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, payload TEXT NOT NULL)"))
+        connection.execute(
+            text(f"INSERT INTO {TABLE} (id, payload) VALUES (:id, :payload)"),
+            [{"id": i, "payload": "x" * 64} for i in range(1, rows + 1)]
+        )
+
+
+def contend(engine, seconds: float, readers: int, writers: int, rows: int) -> dict:
+    """Run readers against writers on engine's database for `seconds`"""
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from bench.workload import summarize
+
+    prepare(engine, rows)
+    stop = threading.Event()
+    lock = threading.Lock()
+    errors = []
+    reads = []
+    write_latencies = []
+
+    def read():
+        while not stop.is_set():
+            try:
+                with engine.connect() as connection:
+                    result = connection.execute(text(f"SELECT id, payload FROM {TABLE}"))
+                    for i, _ in enumerate(result):
+                        if i % 250 == 0:
+                            time.sleep(0.001)  # keep the read open a while
+                with lock:
+                    reads.append(1)
+            except OperationalError as exc:
+                with lock:
+                    errors.append(str(exc.orig))
+
+    def write(offset):
+        i = offset
+        while not stop.is_set():
+            i += writers
+            start = time.perf_counter()
+            try:
+                # Read-modify-write like the app's update paths (pysqlite
+                # opens the transaction at the UPDATE)
+                with engine.begin() as connection:
+                    payload = connection.execute(
+                        text(f"SELECT payload FROM {TABLE} WHERE id = :id"), {"id": i % rows + 1}
+                    ).scalar()
+                    connection.execute(
+                        text(f"UPDATE {TABLE} SET payload = :payload WHERE id = :id"),
+                        {"payload": payload[1:] + payload[0], "id": i % rows + 1}
+                    )
+                write_latencies.append(time.perf_counter() - start)
+            except OperationalError as exc:
+                with lock:
+                    errors.append(str(exc.orig))
+
+    threads = [threading.Thread(target=read) for _ in range(readers)]
+    threads += [threading.Thread(target=write, args=(offset,)) for offset in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+
+    return {
+        "reads_per_s": round(len(reads) / elapsed, 1),
+        "writes_per_s": round(len(write_latencies) / elapsed, 1),
+        "writes": summarize(write_latencies),
+        "errors": len(errors),
+        "locked_errors": sum("locked" in message for message in errors),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    path = args.path or os.path.join(tempfile.gettempdir(), "readify-contention.db")
+    url = f"sqlite:///{path}"
+
+    from sqlalchemy import create_engine
+    from database import build_engine
+
+    results = {}
+    for name, make_engine in (("bare", create_engine), ("tuned", build_engine)):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        results[name] = contend(make_engine(url), args.seconds, args.readers, args.writers, args.rows)
+
+    config = {"seconds": args.seconds, "readers": args.readers, "writers": args.writers, "rows": args.rows}
+    output = save_report("db-contention", config, None, results, args.output)
+
+    for name, row in results.items():
+        print(
+            f"{name:<6} {row['reads_per_s']:>8} reads/s {row['writes_per_s']:>8} writes/s, "
+            f"write p50 {row['writes']['p50_ms']} ms p99 {row['writes']['p99_ms']} ms, "
+            f"{row['errors']} errors ({row['locked_errors']} locked)"
+        )
+    print(f"-> {output}")
+    return 0 if not results["tuned"]["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
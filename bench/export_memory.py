@@ -0,0 +1,156 @@
+# bench/export_memory.py
+"""
+Peak memory of GET /activity/{username}/export against library size.
+
+    python -m bench.export_memory [--sizes 1000,10000,100000] [--format ndjson|csv]
+                                  [--database-url URL] [--output PATH]
+
+    python -m bench.export_memory --sizes 10000,1000000   # the 1M-row library
+
+Runs in-process against a seeded SQLite file (like bench.run). One user is
+created per size with that many activities. Each export is driven straight
+through the ASGI interface and its body is counted and dropped, since
+httpx's ASGITransport would buffer the whole response. Python allocations
+are traced with tracemalloc while the export runs; the peak should stay flat
+as the library grows.
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+
+from bench.run import configure_environment, save_report
+
+CHUNK_SIZE = 10000
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated library sizes")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--database-url", default=None, help="Database to seed and serve")
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/<commit>-export-<time>.json)")
+    args = parser.parse_args(argv)
+    args.sizes = sorted(int(size) for size in args.sizes.split(","))
+    args.mode = "inprocess"
+    return args
+
+
+def seed_libraries(sizes) -> dict:
+    """Create max(sizes) books and one export_user_<size> per size; returns row counts"""
+    from sqlalchemy import func, insert, select
+    from bench.seed import seed
+    from database import SessionLocal
+    from models import Activity, Book, User
+
+    seed(1, 1, 1)  # schema and search index
+    db = SessionLocal()
+    try:
+        have = db.scalar(select(func.count()).select_from(Book).where(Book.external_id.like("export-%")))
+        for start in range(have, max(sizes), CHUNK_SIZE):
+            db.execute(insert(Book), [
+                {"title": f"Export book {i}", "author": f"Author {i % 997}", "description": "An exported book. " * 6,
+                 "category": "Fiction", "external_id": f"export-{i}"}
+                for i in range(start, min(start + CHUNK_SIZE, max(sizes)))
+            ])
+        db.commit()
+        book_ids = db.scalars(
+            select(Book.id).where(Book.external_id.like("export-%")).order_by(Book.id)
+        ).all()
+
+        for size in sizes:
+            name = f"export_user_{size}"
+            if db.scalar(select(User.id).where(User.username == name)):
+                continue
+            user_id = db.execute(insert(User).values(username=name, password_hash="x").returning(User.id)).scalar()
+            for start in range(0, size, CHUNK_SIZE):
+                db.execute(insert(Activity), [
+                    {"user_id": user_id, "book_id": book_id, "status": "reading", "progress": i % 101, "is_favorite": i % 5 == 0}
+                    for i, book_id in enumerate(book_ids[start:min(start + CHUNK_SIZE, size)], start)
+                ])
+            db.commit()
+        return {"books": len(book_ids), "libraries": sizes}
+    finally:
+        db.close()
+
+
+async def export(app, username: str, export_format: str) -> dict:
+    """Run one export through the ASGI app, counting and dropping the body"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": f"/activity/{username}/export",
+        "raw_path": f"/activity/{username}/export".encode("ascii"),
+        "query_string": f"format={export_format}".encode("ascii"),
+        "root_path": "",
+        "headers": [(b"host", b"readify")],
+        "client": ("127.0.0.1", 0),
+        "server": ("readify", 80),
+    }
+    result = {"status": None, "bytes": 0, "chunks": 0}
+    done = asyncio.Event()
+
+    async def receive():
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            result["bytes"] += len(message.get("body", b""))
+            result["chunks"] += 1
+            if not message.get("more_body"):
+                done.set()
+
+    await app(scope, receive, send)
+    return result
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from main import app
+
+    results = []
+    async with app.router.lifespan_context(app):
+        await export(app, f"export_user_{args.sizes[0]}", args.format)  # warm up
+        for size in args.sizes:
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = await export(app, f"export_user_{size}", args.format)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append({
+                "rows": size,
+                "status": result["status"],
+                "bytes": result["bytes"],
+                "chunks": result["chunks"],
+                "seconds": round(elapsed, 3),
+                "rows_per_s": round(size / elapsed, 1) if elapsed else None,
+                "peak_kib": round(peak / 1024, 1),
+            })
+    return {"format": args.format, "exports": results}
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+    seeded = seed_libraries(args.sizes)
+
+    results = asyncio.run(run(args))
+    config = {"sizes": args.sizes, "format": args.format}
+    output = save_report("export", config, seeded, results, args.output)
+
+    print(f"{'rows':>9} {'MiB out':>9} {'rows/s':>10} {'peak KiB':>10}")
+    for row in results["exports"]:
+        print(f"{row['rows']:>9} {row['bytes'] / 2 ** 20:>9.1f} {row['rows_per_s']:>10} {row['peak_kib']:>10}")
+    print(f"-> {output}")
+    return 0 if all(row["status"] == 200 for row in results["exports"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# bench/local_search.py
+"""
+Latency of local catalogue search over a large corpus.
+
+    python -m bench.local_search [--books N] [--queries N] [--like-queries N]
+                                 [--database-url URL] [--output PATH]
+
+Seeds --books books (1,000,000 by default; seeding that many takes a few
+minutes, pass --database-url to keep and reuse the file) and times
+sequential searches by kind of query:
+
+- common: one word found in most books
+- pair: two such words, both required
+- rare: an author number, found in about ten books
+- miss: a word no book contains
+
+Each kind is timed on the FTS5 backend through GET /books/search?source=local
+(in-process, like bench.run) and as the bare SELECT, and as the bare SELECT
+on the LIKE fallback for --like-queries rounds, since it scans the table.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from bench.run import configure_environment, save_report
+
+KINDS = ("common", "pair", "rare", "miss")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200, help="Searches per kind of query")
+    parser.add_argument("--like-queries", type=int, default=5, help="Searches per kind on the LIKE backend")
+    parser.add_argument("--limit", type=int, default=8, help="max_results")
+    parser.add_argument("--database-url", default=None, help="Database to seed and search")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/<commit>-local-search-<time>.json)")
+    args = parser.parse_args(argv)
+    args.mode = "inprocess"
+    return args
+
+
+def queries(kind: str, count: int, books: int, seed: int) -> list:
+    from bench.seed import WORDS
+
+    rng = random.Random(seed)
+    if kind == "common":
+        return [rng.choice(WORDS) for _ in range(count)]
+    if kind == "pair":
+        return [" ".join(rng.sample(WORDS, 2)) for _ in range(count)]
+    if kind == "rare":
+        return [f"author {rng.randrange(books // 10 + 1)}" for _ in range(count)]
+    return [f"zz{rng.randrange(10**6)}" for _ in range(count)]
+
+
+def select_latencies(backend, terms, limit: int) -> list:
+    from database import SessionLocal
+
+    latencies = []
+    with SessionLocal() as db:
+        for q in terms:
+            start = time.perf_counter()
+            db.scalars(backend.statement(q, limit)).all()
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import httpx
+    import search_index
+    from bench.workload import summarize
+    from main import app
+
+    results = {"endpoint": {}, "fts5": {}, "like": {}}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://readify") as client:
+            for kind in KINDS:
+                latencies = []
+                hits = 0
+                for q in queries(kind, args.queries, args.books, args.seed):
+                    start = time.perf_counter()
+                    response = await client.get(
+                        "/books/search", params={"q": q, "source": "local", "max_results": args.limit}
+                    )
+                    latencies.append(time.perf_counter() - start)
+                    response.raise_for_status()
+                    hits += len(response.json())
+                results["endpoint"][kind] = {**summarize(latencies), "mean_hits": round(hits / args.queries, 1)}
+
+    fts, like = search_index.BACKENDS["fts5"](), search_index.BACKENDS["like"]()
+    for kind in KINDS:
+        results["fts5"][kind] = summarize(select_latencies(
+            fts, queries(kind, args.queries, args.books, args.seed), args.limit
+        ))
+        results["like"][kind] = summarize(select_latencies(
+            like, queries(kind, args.like_queries, args.books, args.seed), args.limit
+        ))
+    return results
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from bench.seed import seed
+    start = time.perf_counter()
+    seeded = seed(1, args.books, 0, args.seed)
+    seeded["seed_s"] = round(time.perf_counter() - start, 1)
+
+    results = asyncio.run(run(args))
+    config = {"books": args.books, "queries": args.queries, "like_queries": args.like_queries, "limit": args.limit}
+    output = save_report("local-search", config, seeded, results, args.output)
+
+    print(f"{args.books} books, seeded in {seeded['seed_s']} s")
+    print(f"{'':<10} {'kind':<7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for path in ("endpoint", "fts5", "like"):
+        for kind in KINDS:
+            row = results[path][kind]
+            print(f"{path:<10} {kind:<7} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+    print(f"-> {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# bench/login_storm.py
+"""
+A storm of logins and what it does to GET /books/{id}.
+
+    python -m bench.login_storm [--logins N] [--probes N] [--users N]
+                                [--database-url URL] [--output PATH]
+
+Runs in-process against a seeded SQLite file (like bench.run) with the
+real password hashing cost (PASSWORD_HASH_ROUNDS, passlib's default when
+unset). --logins clients log in back to back while one client times
+GET /books/{id} requests. The probe is measured three times:
+
+- baseline: nothing else running
+- pool: during the storm, with hashing on the process pool (the app)
+- inline: during the storm, with hashing.verify_password run on the event
+  loop, as the login route did before the pool
+
+Logins the pool sheds with 503 are counted, not retried.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from bench.run import configure_environment, save_report
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50, help="Clients logging in concurrently")
+    parser.add_argument("--probes", type=int, default=300, help="GET /books/{id} requests per phase")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--books", type=int, default=200)
+    parser.add_argument("--database-url", default=None, help="Database to seed and serve")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/<commit>-login-storm-<time>.json)")
+    args = parser.parse_args(argv)
+    args.mode = "inprocess"
+    return args
+
+
+async def probe(client, count: int, books: int) -> list:
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        response = await client.get(f"/books/{i % books + 1}")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def storm(client, args: argparse.Namespace, usernames) -> dict:
+    """Probe while --logins clients log in until the probe is done"""
+    from bench.seed import BENCH_PASSWORD
+    from bench.workload import summarize
+
+    done = asyncio.Event()
+    outcomes = {"ok": 0, "shed": 0, "failed": 0}
+
+    async def login(worker: int):
+        i = worker
+        while not done.is_set():
+            response = await client.post("/auth/token", json={
+                "username": usernames[i % len(usernames)], "password": BENCH_PASSWORD
+            })
+            i += args.logins
+            if response.status_code == 200:
+                outcomes["ok"] += 1
+            elif response.status_code == 503:
+                outcomes["shed"] += 1
+                await asyncio.sleep(0.05)
+            else:
+                outcomes["failed"] += 1
+
+    logins = [asyncio.ensure_future(login(worker)) for worker in range(args.logins)]
+    start = time.perf_counter()
+    try:
+        await asyncio.sleep(0.2)  # let the storm build up
+        latencies = await probe(client, args.probes, args.books)
+    finally:
+        done.set()
+        await asyncio.gather(*logins)
+    elapsed = time.perf_counter() - start
+    return {
+        "probe": summarize(latencies),
+        "logins_per_s": round(outcomes["ok"] / elapsed, 1),
+        **outcomes,
+    }
+
+
+async def run(args: argparse.Namespace, usernames) -> dict:
+    import httpx
+    import hashing
+    from bench.workload import summarize
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://readify", timeout=120) as client:
+            await probe(client, 50, args.books)  # warm up
+            results = {"baseline": {"probe": summarize(await probe(client, args.probes, args.books))}}
+            results["pool"] = await storm(client, args, usernames)
+
+            async def verify_inline(plain_password, hashed_password):
+                return hashing.verify_password(plain_password, hashed_password)
+
+            pooled, hashing.verify_password_async = hashing.verify_password_async, verify_inline
+            try:
+                results["inline"] = await storm(client, args, usernames)
+            finally:
+                hashing.verify_password_async = pooled
+    return results
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from bench.seed import seed, username
+    import hashing
+    seeded = seed(args.users, args.books, 1, args.seed)
+    usernames = [username(i) for i in range(args.users)]
+
+    results = asyncio.run(run(args, usernames))
+    config = {
+        "logins": args.logins,
+        "probes": args.probes,
+        "users": args.users,
+        "hash_workers": hashing.HASH_WORKERS,
+        "hash_max_pending": hashing.HASH_MAX_PENDING,
+        "hash_rounds": hashing.PASSWORD_HASH_ROUNDS or "default",
+    }
+    output = save_report("login-storm", config, seeded, results, args.output)
+
+    for phase in ("baseline", "pool", "inline"):
+        row = results[phase]
+        line = (
+            f"{phase:<8} GET /books/{{id}} p50 {row['probe']['p50_ms']} ms  p95 {row['probe']['p95_ms']} ms  "
+            f"p99 {row['probe']['p99_ms']} ms"
+        )
+        if "logins_per_s" in row:
+            line += f"  | {row['logins_per_s']} logins/s, {row['shed']} shed, {row['failed']} failed"
+        print(line)
+    print(f"-> {output}")
+    return 0 if not results["pool"]["failed"] and not results["inline"]["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# bench/run.py
+"""
+Seed a database and drive the mixed workload against the API.
+
+    python -m bench.run [--mode inprocess|http] [--url URL] [--database-url URL]
+                        [--users N] [--books N] [--activities N]
+                        [--duration S] [--warmup S] [--concurrency N] [--output PATH]
+
+inprocess (default) seeds a fresh SQLite file unless --database-url is
+given, starts the app's lifespan and talks to it through ASGITransport with
+Google Books stubbed. http drives an already running server at --url; pass
+--database-url to seed the database that server uses first (see
+bench/stub_google.py for the Google stub).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def git_revision() -> dict:
+    """Commit the results belong to, and whether the tree had local changes"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def save_report(kind: str, config: dict, dataset, results: dict, output: Optional[str] = None) -> Path:
+    """Write a result file (default: bench/results/<commit>-<kind>-<time>.json)"""
+    report = {
+        "git": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "dataset": dataset,
+        "results": results,
+    }
+    path = Path(output) if output else (
+        RESULTS_DIR / f"{report['git']['commit']}-{kind}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2) + "\n")
+    return path
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("inprocess", "http"), default="inprocess")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server for --mode http")
+    parser.add_argument("--database-url", default=None, help="Database to seed (and, in-process, to serve)")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--activities", type=int, default=50, help="Activities per user")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/<commit>-<mode>-<time>.json)")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Point the app modules at the bench database before they are imported"""
+    if args.database_url is None and args.mode == "inprocess":
+        path = Path(tempfile.gettempdir()) / "readify-bench.db"
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{path}{suffix}").unlink(missing_ok=True)
+        args.database_url = f"sqlite:///{path}"
+    if args.database_url is not None:
+        os.environ["DATABASE_URL"] = args.database_url
+    if args.mode == "inprocess":
+        from bench.stub_google import VOLUMES_PATH
+        os.environ["GOOGLE_BOOKS_BASE_URL"] = f"http://stub-google{VOLUMES_PATH}"
+
+
+async def run_inprocess(args: argparse.Namespace, usernames) -> dict:
+    import httpx
+    import google_books
+    from bench import stub_google
+    from bench.workload import Workload, discover_activities
+    from main import app
+
+    # Installed before the lifespan runs, so start_client() keeps it
+    google_books._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_google.app))
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://readify") as client:
+            return await _drive(client, args, usernames, Workload, discover_activities)
+
+
+async def run_http(args: argparse.Namespace, usernames) -> dict:
+    import httpx
+    from bench.workload import Workload, discover_activities
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        return await _drive(client, args, usernames, Workload, discover_activities)
+
+
+async def _drive(client, args, usernames, workload_class, discover) -> dict:
+    activities = await discover(client, usernames[:min(len(usernames), 50)])
+    if args.warmup > 0:
+        await workload_class(client, usernames, activities, seed=args.seed + 1).run(args.warmup, args.concurrency)
+    workload = workload_class(client, usernames, activities, seed=args.seed)
+    return await workload.run(args.duration, args.concurrency)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+
+    seeded = None
+    if args.database_url is not None:
+        from bench.seed import seed
+        seeded = seed(args.users, args.books, args.activities, args.seed)
+    from bench.seed import username
+    usernames = [username(i) for i in range(args.users)]
+
+    runner = run_inprocess if args.mode == "inprocess" else run_http
+    results = asyncio.run(runner(args, usernames))
+
+    config = {
+        "mode": args.mode,
+        "url": args.url if args.mode == "http" else None,
+        "users": args.users,
+        "books": args.books,
+        "activities_per_user": args.activities,
+        "seed": args.seed,
+        "duration_s": args.duration,
+        "warmup_s": args.warmup,
+        "concurrency": args.concurrency,
+    }
+    output = save_report(args.mode, config, seeded, results, args.output)
+
+    print(f"{'endpoint':<10} {'req':>7} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in results["endpoints"].items():
+        print(
+            f"{name:<10} {row['requests']:>7} {row['errors']:>5} {row['throughput_rps']:>9.1f} "
+            f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}"
+        )
+    print(f"total {results['requests']} requests, {results['throughput_rps']} req/s -> {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# bench/seed.py
+"""
+Seed the configured database (DATABASE_URL) with a reproducible dataset.
+
+Users are named bench_user_<n> and all share BENCH_PASSWORD, so an HTTP run
+against a separately started server can log in without extra setup. The
+same seed always produces the same library contents.
+
+Import after DATABASE_URL is set: database.py binds its engine on import.
+"""
+import random
+from itertools import islice
+from sqlalchemy import func, insert, select
+from database import SessionLocal, engine, ensure_schema
+from models import Activity, Book, User
+import crud
+import hashing
+import search_index
+
+BENCH_PASSWORD = "bench-password"
+STATUSES = ("wishlist", "reading", "completed")
+CATEGORIES = ("Fiction", "History", "Science", "Fantasy", "Biography", "Poetry")
+# Words used for titles and descriptions; search terms are drawn from these
+WORDS = (
+    "river", "shadow", "garden", "empire", "winter", "signal", "harbor", "ember",
+    "atlas", "lantern", "orchard", "comet", "meridian", "quarry", "tide", "summit",
+)
+CHUNK_SIZE = 1000
+
+
+def username(index: int) -> str:
+    return f"bench_user_{index}"
+
+
+def _chunks(rows):
+    """Lists of up to CHUNK_SIZE rows, built as they are consumed"""
+    rows = iter(rows)
+    while chunk := list(islice(rows, CHUNK_SIZE)):
+        yield chunk
+
+
+def seed(users: int, books: int, activities_per_user: int, seed: int = 42) -> dict:
+    """
+    Create the schema and insert users, books and activities.
+
+    Skips seeding if bench users already exist, so repeated runs against the
+    same database measure the same data. Returns the row counts.
+    """
+    ensure_schema(engine)
+    search_index.ensure_index(engine)
+    rng = random.Random(seed)
+
+    db = SessionLocal()
+    try:
+        existing = db.scalar(select(func.count()).select_from(User).where(User.username.like("bench_user_%")))
+        if existing:
+            return {"users": existing, "seeded": False}
+
+        password_hash = hashing.hash_password(BENCH_PASSWORD)
+        for chunk in _chunks([
+            {"username": username(i), "email": f"{username(i)}@bench.example", "password_hash": password_hash}
+            for i in range(users)
+        ]):
+            db.execute(insert(User), chunk)
+
+        for chunk in _chunks(
+            {
+                "title": " ".join(rng.choice(WORDS).title() for _ in range(3)),
+                "author": f"Author {rng.randrange(books // 10 + 1)}",
+                "description": " ".join(rng.choice(WORDS) for _ in range(40)),
+                "category": rng.choice(CATEGORIES),
+                "external_id": f"bench-{i}",
+            }
+            for i in range(books)
+        ):
+            db.execute(insert(Book), chunk)
+
+        user_ids = db.scalars(
+            select(User.id).where(User.username.like("bench_user_%")).order_by(User.id)
+        ).all()
+        book_ids = db.scalars(select(Book.id).where(Book.external_id.like("bench-%"))).all()
+        per_user = min(activities_per_user, len(book_ids))
+        rows = []
+        for user_id in user_ids:
+            for book_id in rng.sample(book_ids, per_user):
+                rows.append({
+                    "user_id": user_id,
+                    "book_id": book_id,
+                    "status": rng.choice(STATUSES),
+                    "progress": rng.randrange(101),
+                    "is_favorite": 1 if rng.random() < 0.2 else 0,
+                })
+        for chunk in _chunks(rows):
+            db.execute(insert(Activity), chunk)
+        db.commit()
+
+        # Aggregates are maintained by the write paths, which seeding bypasses
+        crud.rebuild_user_stats(db)
+        return {"users": len(user_ids), "books": len(book_ids), "activities": len(rows), "seeded": True}
+    finally:
+        db.close()
@@ -0,0 +1,219 @@
+# bench/sse_fanout.py
+"""
+Hold thousands of /activity/stream connections open and measure fan-out.
+
+    python -m bench.sse_fanout [--subscribers N] [--users N] [--rounds N]
+                               [--requests N] [--database-url URL] [--output PATH]
+
+Runs in-process against a seeded SQLite file (like bench.run). Streams are
+driven straight through the ASGI interface, since httpx's ASGITransport
+buffers whole responses. Subscribers are spread over --users accounts
+(per-user streams, which look the user up in the database) and connect
+while the identity cache is cold. The report covers:
+
+- connect: time for every stream to deliver its first frame (streams that
+  have not after --timeout count as failed)
+- pool: database connections still checked out while the streams are open
+- requests: GET /books/{id} latency with all streams open
+- fanout: time from publishing one event per user until every subscriber
+  has it, per round
+"""
+import argparse
+import asyncio
+import sys
+import time
+from urllib.parse import urlencode
+
+from bench.run import configure_environment, save_report
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=50, help="Accounts the subscribers are spread over")
+    parser.add_argument("--books", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=10, help="Fan-out rounds (one event per user each)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests timed while the streams are open")
+    parser.add_argument("--database-url", default=None, help="Database to seed and serve")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for each phase")
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/<commit>-sse-<time>.json)")
+    args = parser.parse_args(argv)
+    args.mode = "inprocess"
+    return args
+
+
+class StreamClient:
+    """One SSE connection, driven through the ASGI interface"""
+
+    def __init__(self, app, username: str):
+        self.app = app
+        self.username = username
+        self.status = None
+        self.events = 0
+        self.connected = asyncio.Event()
+        self.changed = asyncio.Event()
+        self._disconnect = asyncio.Event()
+        self.task = None
+
+    def start(self) -> None:
+        query = urlencode({"username": self.username})
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/activity/stream",
+            "raw_path": b"/activity/stream",
+            "query_string": query.encode("ascii"),
+            "root_path": "",
+            "headers": [(b"host", b"readify"), (b"accept", b"text/event-stream")],
+            "client": ("127.0.0.1", 0),
+            "server": ("readify", 80),
+        }
+        self.task = asyncio.ensure_future(self.app(scope, self._receive, self._send))
+        self.task.add_done_callback(lambda _: self.connected.set())
+
+    async def _receive(self) -> dict:
+        await self._disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def _send(self, message: dict) -> None:
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            self.events += message["body"].count(b"\nevent: activity.")
+            self.connected.set()
+            self.changed.set()
+
+    async def close(self) -> None:
+        self._disconnect.set()
+        if self.task is not None and not self.task.done():
+            try:
+                await asyncio.wait_for(self.task, 10)
+            except asyncio.TimeoutError:
+                pass  # wait_for has cancelled it (e.g. stuck waiting for a connection)
+
+
+async def wait_all(streams, condition, timeout: float) -> float:
+    start = time.perf_counter()
+    deadline = start + timeout
+    for stream in streams:
+        while not condition(stream):
+            stream.changed.clear()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise TimeoutError("subscribers did not catch up in time")
+            try:
+                await asyncio.wait_for(stream.changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+    return time.perf_counter() - start
+
+
+async def run(args: argparse.Namespace, usernames) -> dict:
+    import httpx
+    from bench.workload import summarize
+    import crud
+    import events
+    from database import async_engine
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        crud.identity_cache.clear()
+        streams = [StreamClient(app, usernames[i % len(usernames)]) for i in range(args.subscribers)]
+
+        try:
+            start = time.perf_counter()
+            for stream in streams:
+                stream.start()
+            waiters = [asyncio.ensure_future(stream.connected.wait()) for stream in streams]
+            _, unfinished = await asyncio.wait(waiters, timeout=args.timeout)
+            for waiter in unfinished:
+                waiter.cancel()
+            connect_s = time.perf_counter() - start
+            failed = sum(1 for stream in streams if stream.status != 200)
+
+            checked_out = async_engine.pool.checkedout()
+
+            transport = httpx.ASGITransport(app=app)
+            latencies = []
+            errors = 0
+            async with httpx.AsyncClient(transport=transport, base_url="http://readify") as client:
+                for i in range(args.requests):
+                    request_start = time.perf_counter()
+                    try:
+                        response = await asyncio.wait_for(client.get(f"/books/{i % args.books + 1}"), args.timeout)
+                        errors += response.status_code >= 400
+                    except (asyncio.TimeoutError, httpx.HTTPError):
+                        errors += 1
+                    latencies.append(time.perf_counter() - request_start)
+
+                live = [stream for stream in streams if stream.status == 200]
+                user_ids = {name: (await client.get(f"/users/{name}")).json()["id"] for name in usernames}
+
+            fanout = []
+            for round_number in range(1, args.rounds + 1):
+                round_start = time.perf_counter()
+                for name, user_id in user_ids.items():
+                    events.broker.publish("activity.updated", {"id": round_number, "user": name}, user_id)
+                await wait_all(live, lambda stream: stream.events >= round_number, args.timeout)
+                fanout.append(time.perf_counter() - round_start)
+
+            subscribed = events.broker.subscriber_count
+        finally:
+            await asyncio.gather(*(stream.close() for stream in streams))
+
+        return {
+            "subscribers": args.subscribers,
+            "failed": failed,
+            "connect_s": round(connect_s, 3),
+            "connects_per_s": round(args.subscribers / connect_s, 1) if connect_s else None,
+            "pool_checked_out": checked_out,
+            "requests": summarize(latencies),
+            "request_errors": errors,
+            "fanout": summarize(fanout),
+            "delivered": sum(stream.events for stream in live),
+            "dropped": events.broker.dropped,
+            "subscribed_before_close": subscribed,
+            "subscribed_after_close": events.broker.subscriber_count,
+        }
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from bench.seed import seed, username
+    seeded = seed(args.users, args.books, 1, args.seed)
+    usernames = [username(i) for i in range(args.users)]
+
+    results = asyncio.run(run(args, usernames))
+    config = {
+        "subscribers": args.subscribers,
+        "users": args.users,
+        "books": args.books,
+        "rounds": args.rounds,
+        "requests": args.requests,
+    }
+    output = save_report("sse", config, seeded, results, args.output)
+
+    print(
+        f"{results['subscribers']} streams ({results['failed']} failed) connected in {results['connect_s']} s, "
+        f"{results['pool_checked_out']} db connections held"
+    )
+    print(
+        f"GET /books/{{id}} with streams open: p50 {results['requests']['p50_ms']} ms, "
+        f"p95 {results['requests']['p95_ms']} ms, {results['request_errors']} errors"
+    )
+    print(
+        f"fan-out per round: p50 {results['fanout']['p50_ms']} ms, p95 {results['fanout']['p95_ms']} ms; "
+        f"{results['delivered']} events delivered, {results['dropped']} dropped -> {output}"
+    )
+    healthy = not results["failed"] and not results["request_errors"] and results["pool_checked_out"] == 0
+    return 0 if healthy else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+# bench/stub_google.py
+"""
+Deterministic stand-in for the Google Books volumes API.
+
+In-process runs route google_books' client to this app directly. For HTTP
+runs serve it next to the API and point the API at it:
+
+    uvicorn bench.stub_google:app --port 8099
+    GOOGLE_BOOKS_BASE_URL=http://127.0.0.1:8099/books/v1/volumes uvicorn main:app
+
+STUB_GOOGLE_LATENCY_MS adds a fixed delay to every response to mimic the
+real upstream.
+"""
+import asyncio
+import hashlib
+import os
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+STUB_GOOGLE_LATENCY_MS = float(os.getenv("STUB_GOOGLE_LATENCY_MS", "50"))
+
+VOLUMES_PATH = "/books/v1/volumes"
+
+# Requests served so far, so tests can count upstream calls
+calls = 0
+
+
+def volume(q: str, index: int) -> dict:
+    """The index-th result for query q; the same inputs always give the same volume"""
+    digest = hashlib.sha1(f"{q}:{index}".encode("utf-8")).hexdigest()[:12]
+    return {
+        "id": f"stub-{digest}",
+        "volumeInfo": {
+            "title": f"{q.title()} volume {index + 1}",
+            "authors": [f"Author {digest[:4]}"],
+            "description": f"A stub book about {q}. " * 8,
+            "categories": ["Fiction" if index % 2 else "Non-fiction"],
+            "imageLinks": {"thumbnail": f"https://covers.example/{digest}.jpg"},
+        },
+    }
+
+
+async def volumes(request: Request) -> JSONResponse:
+    global calls
+    calls += 1
+    q = " ".join(request.query_params.get("q", "").split())
+    max_results = min(int(request.query_params.get("maxResults", "10")), 40)
+    if STUB_GOOGLE_LATENCY_MS:
+        await asyncio.sleep(STUB_GOOGLE_LATENCY_MS / 1000)
+    items = [volume(q, index) for index in range(max_results)] if q else []
+    return JSONResponse({"kind": "books#volumes", "totalItems": len(items), "items": items})
+
+
+app = Starlette(routes=[Route(VOLUMES_PATH, volumes)])
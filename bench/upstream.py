@@ -0,0 +1,155 @@
+# bench/upstream.py
+"""
+Remote searches against a slow upstream, and what they do to other requests.
+
+    python -m bench.upstream [--latency-ms MS] [--searches N] [--concurrency N]
+                             [--probes N] [--books N] [--output PATH]
+
+Runs in-process with Google Books replaced by bench/stub_google.py, which
+answers after --latency-ms. Every search uses a fresh query, so each one is
+a cache miss that goes upstream. The report covers:
+
+- baseline: GET /books/{id} latency with nothing else running
+- searches: GET /books/search?source=remote latency, --concurrency at a time
+- under_load: GET /books/{id} latency, back to back, for as long as the
+  searches are in flight
+
+With the upstream call awaited on the event loop, under_load stays close to
+baseline however slow the upstream is.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from bench.run import configure_environment, save_report
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Delay the stub adds to every upstream call")
+    parser.add_argument("--searches", type=int, default=400, help="Remote searches in total")
+    parser.add_argument("--concurrency", type=int, default=50, help="Searches in flight at once")
+    parser.add_argument("--probes", type=int, default=200, help="GET /books/{id} requests for the baseline")
+    parser.add_argument("--books", type=int, default=200)
+    parser.add_argument("--database-url", default=None, help="Database to seed and serve")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/<commit>-upstream-<time>.json)")
+    args = parser.parse_args(argv)
+    args.mode = "inprocess"
+    return args
+
+
+async def probe(client, count: int, books: int, stop: asyncio.Event = None):
+    """
+    Time GET /books/{id} one after another; returns (latencies, errors).
+
+    With stop, keeps going (past count if need be) until stop is set.
+    """
+    latencies = []
+    errors = 0
+    i = 0
+    while (i < count) if stop is None else not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get(f"/books/{i % books + 1}")
+        latencies.append(time.perf_counter() - start)
+        errors += response.status_code >= 400
+        i += 1
+    return latencies, errors
+
+
+async def search(client, args: argparse.Namespace):
+    """Run --searches unique remote searches, --concurrency at a time"""
+    queue = asyncio.Queue()
+    for i in range(args.searches):
+        queue.put_nowait(f"upstream bench query {i}")
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            q = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get("/books/search", params={"q": q, "source": "remote"})
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import httpx
+    import google_books
+    from bench import stub_google
+    from bench.workload import summarize
+    from main import app
+
+    # Installed before the lifespan runs, so start_client() keeps it
+    google_books._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_google.app))
+    async with app.router.lifespan_context(app):
+        google_books.search_cache.clear()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://readify", timeout=60) as client:
+            await probe(client, 100, args.books)  # warm up
+            baseline, baseline_errors = await probe(client, args.probes, args.books)
+
+            calls = stub_google.calls
+            searches = asyncio.ensure_future(search(client, args))
+            stop = asyncio.Event()
+            searches.add_done_callback(lambda _: stop.set())
+            # Let the first wave of searches reach the upstream before probing
+            await asyncio.sleep(0.01)
+            under_load, load_errors = await probe(client, args.probes, args.books, stop)
+            search_latencies, search_errors, search_s = await searches
+
+    return {
+        "latency_ms": args.latency_ms,
+        "baseline": summarize(baseline),
+        "searches": summarize(search_latencies),
+        "searches_per_s": round(len(search_latencies) / search_s, 1) if search_s else None,
+        "upstream_calls": stub_google.calls - calls,
+        "under_load": summarize(under_load),
+        "errors": baseline_errors + load_errors + search_errors,
+    }
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Read by bench.stub_google at import, which configure_environment does
+    os.environ["STUB_GOOGLE_LATENCY_MS"] = str(args.latency_ms)
+    configure_environment(args)
+
+    from bench.seed import seed
+    seeded = seed(1, args.books, 1, args.seed)
+
+    results = asyncio.run(run(args))
+    config = {
+        "latency_ms": args.latency_ms,
+        "searches": args.searches,
+        "concurrency": args.concurrency,
+        "probes": args.probes,
+        "books": args.books,
+    }
+    output = save_report("upstream", config, seeded, results, args.output)
+
+    print(
+        f"{results['searches']['count']} remote searches at {args.latency_ms:g} ms upstream latency: "
+        f"p50 {results['searches']['p50_ms']} ms, p95 {results['searches']['p95_ms']} ms, "
+        f"{results['searches_per_s']} searches/s, {results['upstream_calls']} upstream calls"
+    )
+    for phase in ("baseline", "under_load"):
+        row = results[phase]
+        print(
+            f"GET /books/{{id}} {phase:<10}: p50 {row['p50_ms']} ms, p95 {row['p95_ms']} ms, "
+            f"p99 {row['p99_ms']} ms ({row['count']} requests)"
+        )
+    print(f"{results['errors']} errors -> {output}")
+    return 0 if not results["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# bench/workload.py
+"""
+Mixed read/write workload against the API through any httpx.AsyncClient,
+so the same scenario runs in-process (ASGITransport) or over HTTP.
+"""
+import asyncio
+import random
+import time
+from typing import Dict, List, Optional
+import httpx
+from bench.seed import BENCH_PASSWORD, WORDS
+
+# Relative weight of each operation in the mix
+DEFAULT_MIX = {
+    "login": 5,
+    "search": 15,
+    "library": 35,
+    "progress": 20,
+    "recent": 25,
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(samples: List[float]) -> dict:
+    """Count and p50/p95/p99/max in milliseconds of latency samples (seconds)"""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+class Recorder:
+    """Latency samples and error counts per operation"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, name: str, seconds: float, ok: bool) -> None:
+        self.samples.setdefault(name, []).append(seconds)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            endpoints[name] = {
+                "requests": len(ordered),
+                "errors": self.errors.get(name, 0),
+                "throughput_rps": round(len(ordered) / elapsed, 2),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3),
+            }
+        total = sum(len(samples) for samples in self.samples.values())
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+async def discover_activities(client: httpx.AsyncClient, usernames: List[str]) -> Dict[str, List[int]]:
+    """Activity ids per user for the progress updates (not timed)"""
+    found = {}
+    for name in usernames:
+        response = await client.get(f"/activity/{name}", params={"limit": 200})
+        response.raise_for_status()
+        found[name] = [item["id"] for item in response.json()["items"]]
+    return found
+
+
+class Workload:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        usernames: List[str],
+        activities: Dict[str, List[int]],
+        mix: Optional[Dict[str, int]] = None,
+        seed: int = 42,
+    ):
+        self.client = client
+        self.usernames = usernames
+        self.activities = {name: ids for name, ids in activities.items() if ids}
+        self.mix = mix or DEFAULT_MIX
+        self.seed = seed
+        self.recorder = Recorder()
+
+    async def login(self, rng: random.Random) -> httpx.Response:
+        return await self.client.post(
+            "/auth/token", json={"username": rng.choice(self.usernames), "password": BENCH_PASSWORD}
+        )
+
+    async def search(self, rng: random.Random) -> httpx.Response:
+        q = " ".join(rng.sample(WORDS, rng.choice((1, 2))))
+        return await self.client.get("/books/search", params={"q": q, "source": "hybrid"})
+
+    async def library(self, rng: random.Random) -> httpx.Response:
+        return await self.client.get(f"/activity/{rng.choice(self.usernames)}", params={"limit": 50})
+
+    async def progress(self, rng: random.Random) -> httpx.Response:
+        activity_id = rng.choice(self.activities[rng.choice(list(self.activities))])
+        return await self.client.put(f"/activity/{activity_id}", json={"progress": rng.randrange(101)})
+
+    async def recent(self, rng: random.Random) -> httpx.Response:
+        return await self.client.get("/activity/recent", params={"limit": 10})
+
+    async def _worker(self, index: int, deadline: float) -> None:
+        rng = random.Random(self.seed * 1000 + index)
+        names = [name for name in self.mix if name != "progress" or self.activities]
+        weights = [self.mix[name] for name in names]
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await getattr(self, name)(rng)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            self.recorder.record(name, time.perf_counter() - start, ok)
+
+    async def run(self, duration: float, concurrency: int) -> dict:
+        """Run `concurrency` workers for `duration` seconds and summarize"""
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(self._worker(index, deadline) for index in range(concurrency)))
+        return self.recorder.summary(time.perf_counter() - start)
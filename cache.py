@@ -0,0 +1,177 @@
+# cache.py
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with per-entry expiry and LRU eviction.
+
+    Entries older than `ttl` seconds are treated as missing; once the cache
+    holds `maxsize` entries the least recently used one is evicted.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing/expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= self._timer():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry if full"""
+        expires_at = self._timer() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        """Remove a key if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key and return its value, expired or not (not counted as a hit or miss)"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def values(self) -> list:
+        """Snapshot of the stored values (expired entries included until evicted)"""
+        with self._lock:
+            return [value for value, _ in self._data.values()]
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+class SQLiteCache:
+    """
+    TTL cache stored in a local SQLite file so several worker processes on
+    one host can share entries (and see each other's invalidations).
+
+    Values must be JSON-serializable. Has the same interface as TTLCache.
+    """
+
+    def __init__(self, path: str, maxsize: int = 1024, ttl: float = 300.0, table: str = "cache"):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.table = table
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._connection().execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """One autocommit connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        row = self._connection().execute(
+            f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?",
+            (str(key), time.time())
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        conn = self._connection()
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+            (str(key), json.dumps(value), expires_at)
+        )
+        # Trim expired entries first, then the ones closest to expiry
+        (size,) = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        if size > self.maxsize:
+            conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+            self.evictions += conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY expires_at LIMIT max(0, "
+                f"(SELECT COUNT(*) FROM {self.table}) - ?))",
+                (self.maxsize,)
+            ).rowcount
+
+    def delete(self, key: Hashable) -> None:
+        self._connection().execute(f"DELETE FROM {self.table} WHERE key = ?", (str(key),))
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        row = self._connection().execute(
+            f"DELETE FROM {self.table} WHERE key = ? RETURNING value", (str(key),)
+        ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def clear(self) -> None:
+        self._connection().execute(f"DELETE FROM {self.table}")
+
+    def __len__(self) -> int:
+        return self._connection().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters for this process (entries are shared)"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
@@ -0,0 +1,154 @@
+# catalogue_sync.py
+"""
+Background persistence of Google Books search results into `books`.
+
+/books/search hands its remote results to `enqueue`, which never blocks. A
+worker thread collects them into batches, drops external_ids it has stored
+recently, and upserts the rest with crud.bulk_create_books in its own
+session. A later POST /books/ for one of those titles is then a plain
+external_id index hit.
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+from typing import Iterable, List, Optional
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from cache import TTLCache
+from database import SessionLocal
+import crud
+import schemas
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_SYNC_ENABLED = os.getenv("CATALOGUE_SYNC_ENABLED", "true").lower() in ("1", "true", "yes")
+CATALOGUE_SYNC_QUEUE_SIZE = int(os.getenv("CATALOGUE_SYNC_QUEUE_SIZE", "10000"))
+CATALOGUE_SYNC_BATCH_SIZE = int(os.getenv("CATALOGUE_SYNC_BATCH_SIZE", "200"))
+CATALOGUE_SYNC_INTERVAL = float(os.getenv("CATALOGUE_SYNC_INTERVAL", "2.0"))
+
+
+class CatalogueSync:
+    def __init__(
+        self,
+        queue_size: int = CATALOGUE_SYNC_QUEUE_SIZE,
+        batch_size: int = CATALOGUE_SYNC_BATCH_SIZE,
+        interval: float = CATALOGUE_SYNC_INTERVAL,
+    ):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: "queue.Queue[Optional[schemas.BookCreate]]" = queue.Queue(maxsize=queue_size)
+        # external_ids stored (or found existing) recently, to skip repeats
+        self._recent = TTLCache(maxsize=50000, ttl=3600)
+        self._thread: Optional[threading.Thread] = None
+        # Set by stop() when the queue is too full to take the sentinel
+        self._stopping = threading.Event()
+        self.enqueued = 0
+        self.dropped = 0
+        self.created = 0
+        self.existing = 0
+        self.batches = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="catalogue-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush what is queued and stop the worker (blocks up to `timeout`)"""
+        if self._thread is not None:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                # The worker drains the queue and then sees the flag
+                self._stopping.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def enqueue(self, results: Iterable[dict]) -> None:
+        """Queue search results for persistence; drops them if the queue is full"""
+        for result in results:
+            external_id = result.get("external_id")
+            if not external_id or not result.get("title") or self._recent.get(external_id):
+                continue
+            try:
+                book = schemas.BookCreate(**result)
+            except ValidationError:
+                continue
+            try:
+                self._queue.put_nowait(book)
+                self.enqueued += 1
+            except queue.Full:
+                self.dropped += 1
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[schemas.BookCreate] = []
+            try:
+                item = self._queue.get(timeout=self.interval)
+                while True:
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                stopping = self._stopping.is_set() and self._queue.empty()
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: List[schemas.BookCreate]) -> None:
+        db = SessionLocal()
+        try:
+            try:
+                created, existing = crud.bulk_create_books(db, batch)
+            except IntegrityError:
+                # Raced with another writer on external_id; the retry sees it
+                db.rollback()
+                created, existing = crud.bulk_create_books(db, batch)
+            self.created += len(created)
+            self.existing += len(existing)
+            self.batches += 1
+            for book in batch:
+                self._recent.set(book.external_id, True)
+        except Exception:
+            self.errors += 1
+            logger.exception("Failed to persist %d search results", len(batch))
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "created": self.created,
+            "existing": self.existing,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
+
+
+sync = CatalogueSync()
+
+
+def start() -> None:
+    if CATALOGUE_SYNC_ENABLED:
+        sync.start()
+
+
+async def stop() -> None:
+    """Stop the worker after it has persisted what is queued (called on shutdown)"""
+    # Joining the worker blocks; keep it off the event loop
+    await asyncio.to_thread(sync.stop)
+
+
+def enqueue(results: Iterable[dict]) -> None:
+    if CATALOGUE_SYNC_ENABLED:
+        sync.enqueue(results)
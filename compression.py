@@ -0,0 +1,143 @@
+# compression.py
+"""
+Response compression: brotli when the client accepts it and the `brotli`
+package is installed, gzip otherwise.
+
+gzip (and the identity path) is Starlette's GZipMiddleware. brotli is a
+small responder of our own that follows the same rules: bodies under the
+size threshold, responses that already have a Content-Encoding and
+text/event-stream are passed through, and Vary: Accept-Encoding is added.
+Streamed brotli bodies are flushed after every chunk, so each chunk can be
+decoded as soon as it arrives.
+"""
+import os
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Compressing these would hold events back until the compressor emits output
+EXCLUDED_CONTENT_TYPES = ("text/event-stream",)
+
+
+def accepts(header: str, coding: str) -> bool:
+    """Whether an Accept-Encoding header allows `coding` (by name or "*", with q > 0)"""
+    weights = {}
+    for item in header.split(","):
+        name, *params = item.split(";")
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    return weights.get(coding, weights.get("*", 0.0)) > 0
+
+
+class BrotliResponder:
+    """Brotli-compress one response, flushing after every streamed chunk"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int = BROTLI_QUALITY) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.quality = quality
+        self.send: Optional[Send] = None
+        self.initial_message: Optional[Message] = None
+        self.passthrough = False
+        self.compressor = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk decides the headers
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or headers.get("content-type", "").startswith(EXCLUDED_CONTENT_TYPES)
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            # e.g. http.response.pathsend: nothing to compress
+            await self._start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.initial_message is None:
+            if not self.passthrough:
+                message["body"] = self.compress(body, more_body=more_body)
+            await self.send(message)
+            return
+
+        if not self.passthrough and (more_body or len(body) >= self.minimum_size):
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            headers["Content-Encoding"] = "br"
+            self.compressor = brotli.Compressor(quality=self.quality)
+            message["body"] = self.compress(body, more_body=more_body)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(message["body"]))
+        else:
+            self.passthrough = True
+        await self._start()
+        await self.send(message)
+
+    async def _start(self) -> None:
+        if self.initial_message is not None:
+            message, self.initial_message = self.initial_message, None
+            await self.send(message)
+
+    def compress(self, body: bytes, *, more_body: bool) -> bytes:
+        body = self.compressor.process(body)
+        return body + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = Headers(scope=scope).get("Accept-Encoding", "")
+        if brotli is not None and accepts(header, "br"):
+            await BrotliResponder(self.app, self.minimum_size, self.brotli_quality)(scope, receive, send)
+            return
+        # GZipMiddleware only looks for "gzip" in the raw header; hand it the
+        # outcome of the negotiation instead, so "gzip;q=0" is honoured
+        headers = [(name, value) for name, value in scope["headers"] if name != b"accept-encoding"]
+        if accepts(header, "gzip"):
+            headers.append((b"accept-encoding", b"gzip"))
+        await self.gzip({**scope, "headers": headers}, receive, send)
@@ -1,22 +1,29 @@
 # crud.py
-from typing import Optional
-from sqlalchemy.orm import Session
-from models import User, Book, Activity
-from schemas import UserCreate, BookCreate
-from passlib.context import CryptContext
-
-# Password hashing configuration
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    """Hash a plain text password"""
-    # Truncate password to 72 bytes as required by bcrypt
-    truncated_password = password.encode('utf-8')[:72].decode('utf-8')
-    return pwd_context.hash(truncated_password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain text password against a hashed password"""
-    return pwd_context.verify(plain_password, hashed_password)
+import os
+import random
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from models import User, Book, Activity, UserStats
+from schemas import UserCreate, UserOut, BookCreate, BookOut, ActivityBulkItem, ActivityPatch, ActivityOut
+from cache import TTLCache, SQLiteCache
+import search_index
+import activity_feed
+import events
+import progress_buffer
+# Password helpers live in hashing (re-exported here for existing callers)
+from hashing import pwd_context, hash_password, verify_password
+
+
+def _limit(query, limit: Optional[int]):
+    """Apply an optional LIMIT and return the rows"""
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
 
 
 # ============================================================================
@@ -41,6 +48,7 @@ def create_user(
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    invalidate_user_identity(new_user.username)
     return new_user
 
 
@@ -64,9 +72,12 @@ def get_user(db: Session, username: str) -> Optional[User]:
     return get_user_by_username(db, username)
 
 
-def get_all_users(db: Session):
-    """Get all users"""
-    return db.query(User).all()
+def get_all_users(db: Session, limit: Optional[int] = None, after_id: Optional[int] = None):
+    """Get users ordered by id, optionally one keyset page after `after_id`"""
+    query = db.query(User)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    return _limit(query.order_by(User.id), limit)
 
 
 def update_user(db: Session, user_id: int, full_name: Optional[str] = None) -> Optional[User]:
@@ -77,9 +88,75 @@ def update_user(db: Session, user_id: int, full_name: Optional[str] = None) -> O
             user.full_name = full_name
         db.commit()
         db.refresh(user)
+        invalidate_user_identity(user.username)
     return user
 
 
+# ============================================================================
+# USER IDENTITY CACHE (username -> UserOut)
+# ============================================================================
+
+IDENTITY_CACHE_BACKEND = os.getenv("IDENTITY_CACHE_BACKEND", "memory")
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "300"))
+IDENTITY_CACHE_PATH = os.getenv("IDENTITY_CACHE_PATH", "./identity_cache.db")
+
+
+def _build_identity_cache():
+    """
+    In-process LRU by default; "sqlite" keeps entries in a local file so all
+    uvicorn workers on a host share them (and their invalidations)
+    """
+    if IDENTITY_CACHE_BACKEND == "sqlite":
+        return SQLiteCache(
+            IDENTITY_CACHE_PATH,
+            maxsize=IDENTITY_CACHE_SIZE,
+            ttl=IDENTITY_CACHE_TTL,
+            table="user_identity"
+        )
+    return TTLCache(maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL)
+
+
+identity_cache = _build_identity_cache()
+
+# Bumped by every invalidation. A miss notes it before reading the row and
+# only caches the row if it is unchanged, so a read that raced an update
+# cannot put the old profile back after the update's invalidation.
+_identity_generation = 0
+_identity_lock = threading.Lock()
+
+
+def _remember_identity(user: User, generation: int) -> UserOut:
+    identity = UserOut.model_validate(user)
+    with _identity_lock:
+        if generation == _identity_generation:
+            identity_cache.set(user.username, identity.model_dump())
+    return identity
+
+
+def get_user_identity(db: Session, username: str) -> Optional[UserOut]:
+    """Resolve a username to its public profile, from the cache when possible"""
+    cached = identity_cache.get(username)
+    if cached is not None:
+        return UserOut(**cached)
+    generation = _identity_generation
+    user = get_user_by_username(db, username)
+    return _remember_identity(user, generation) if user else None
+
+
+def invalidate_user_identity(username: str) -> None:
+    """Drop a cached identity; call after any change to a user row"""
+    global _identity_generation
+    with _identity_lock:
+        _identity_generation += 1
+        identity_cache.delete(username)
+
+
+def identity_cache_stats() -> dict:
+    """Hit/miss counters and hit ratio of the identity cache"""
+    return identity_cache.stats()
+
+
 # ============================================================================
 # BOOK CRUD OPERATIONS
 # ============================================================================
@@ -97,9 +174,61 @@ def create_book(db: Session, book: BookCreate, owner_id: int = None) -> Book:
     db.add(new_book)
     db.commit()
     db.refresh(new_book)
+    _remember_book(new_book)
     return new_book
 
 
+def bulk_create_books(
+    db: Session,
+    books: List[BookCreate],
+    chunk_size: int = 500
+) -> Tuple[List[int], List[int]]:
+    """
+    Insert many books in one transaction, skipping known external_ids.
+
+    Existing external_ids are found with batched IN queries and the remaining
+    books are written with chunked multi-row INSERTs. Returns the ids of the
+    created books and of the already existing ones, each in payload order.
+    """
+    # Deduplicate the payload itself on external_id (books without one are kept)
+    pending = []
+    seen = set()
+    external_ids = []
+    for book in books:
+        if book.external_id:
+            if book.external_id in seen:
+                continue
+            seen.add(book.external_id)
+            external_ids.append(book.external_id)
+        pending.append(book)
+
+    existing = {}
+    for start in range(0, len(external_ids), chunk_size):
+        chunk = external_ids[start:start + chunk_size]
+        rows = db.execute(
+            select(Book.external_id, Book.id).where(Book.external_id.in_(chunk))
+        )
+        existing.update(rows.all())
+
+    rows = [
+        book.model_dump() for book in pending
+        if not book.external_id or book.external_id not in existing
+    ]
+    created_ids = []
+    for start in range(0, len(rows), chunk_size):
+        result = db.execute(
+            insert(Book).returning(Book.id, sort_by_parameter_order=True),
+            rows[start:start + chunk_size]
+        )
+        created_ids.extend(result.scalars())
+    db.commit()
+    # RETURNING is in parameter order, so ids line up with rows
+    for book_id, row in zip(created_ids, rows):
+        _remember_book_payload(BookOut(id=book_id, **row).model_dump(), version=1)
+    # Both lists follow the order of the payload
+    return created_ids, [existing[external_id] for external_id in external_ids if external_id in existing]
+
+
 def get_book(db: Session, book_id: int) -> Optional[Book]:
     """Get book by ID"""
     return db.query(Book).filter(Book.id == book_id).first()
@@ -110,54 +239,345 @@ def get_book_by_google_id(db: Session, google_id: str) -> Optional[Book]:
     return db.query(Book).filter(Book.external_id == google_id).first()
 
 
-def get_books_for_user(db: Session, user_id: int):
-    """Get all books associated with a user through activities"""
-    return (
-        db.query(Book)
-        .join(Activity)
-        .filter(Activity.user_id == user_id)
-        .all()
+def get_books_for_user(
+    db: Session,
+    user_id: int,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None
+):
+    """Get books associated with a user through activities, ordered by book id"""
+    query = db.query(Book).join(Activity).filter(Activity.user_id == user_id)
+    if after_id is not None:
+        query = query.filter(Book.id > after_id)
+    return _limit(query.order_by(Book.id), limit)
+
+
+def list_book_versions(db: Session, limit: int, after_id: Optional[int] = None):
+    """(id, version) pairs of one list_books page, enough to build its ETag"""
+    query = db.query(Book.id, Book.version)
+    if after_id is not None:
+        query = query.filter(Book.id > after_id)
+    return query.order_by(Book.id).limit(limit).all()
+
+
+def list_books(db: Session, limit: Optional[int] = None, after_id: Optional[int] = None):
+    """Get books ordered by id, optionally one keyset page after `after_id`"""
+    query = db.query(Book)
+    if after_id is not None:
+        query = query.filter(Book.id > after_id)
+    return _limit(query.order_by(Book.id), limit)
+
+
+# ============================================================================
+# BOOK CACHE (book id -> serialized BookOut, plus an external_id index)
+# ============================================================================
+
+BOOK_CACHE_SIZE = int(os.getenv("BOOK_CACHE_SIZE", "50000"))
+BOOK_CACHE_TTL = float(os.getenv("BOOK_CACHE_TTL", "86400"))
+BOOK_CACHE_WARM = int(os.getenv("BOOK_CACHE_WARM", "1000"))
+
+# id -> (version, BookOut dict); versions feed the book ETag
+book_cache = TTLCache(maxsize=BOOK_CACHE_SIZE, ttl=BOOK_CACHE_TTL)
+# external_id -> id
+book_external_ids = TTLCache(maxsize=BOOK_CACHE_SIZE, ttl=BOOK_CACHE_TTL)
+
+
+def _remember_book_payload(payload: dict, version: int) -> None:
+    book_cache.set(payload["id"], (version, payload))
+    if payload["external_id"]:
+        book_external_ids.set(payload["external_id"], payload["id"])
+
+
+def _remember_book(book: Book) -> Tuple[int, dict]:
+    entry = (book.version, BookOut.model_validate(book).model_dump())
+    _remember_book_payload(entry[1], entry[0])
+    return entry
+
+
+def get_cached_book(db: Session, book_id: int) -> Optional[Tuple[int, dict]]:
+    """(version, BookOut dict) for a book, read through the cache"""
+    cached = book_cache.get(book_id)
+    if cached is not None:
+        return cached
+    book = get_book(db, book_id)
+    return _remember_book(book) if book else None
+
+
+def get_cached_book_by_external_id(db: Session, external_id: str) -> Optional[Tuple[int, dict]]:
+    """(version, BookOut dict) for a Google Books id, read through the cache"""
+    book_id = book_external_ids.get(external_id)
+    if book_id is not None:
+        cached = book_cache.get(book_id)
+        if cached is not None:
+            return cached
+    book = get_book_by_google_id(db, external_id)
+    return _remember_book(book) if book else None
+
+
+def invalidate_book(book_id: int) -> None:
+    """Drop a cached book; call after any change to (or deletion of) a book row"""
+    # pop, not get: an invalidation is not a lookup and must not skew the hit ratio
+    cached = book_cache.pop(book_id)
+    if cached is not None and cached[1]["external_id"]:
+        book_external_ids.delete(cached[1]["external_id"])
+
+
+def warm_book_cache(db: Session, limit: int = BOOK_CACHE_WARM) -> int:
+    """Load the books found in the most libraries (called on startup)"""
+    if limit <= 0:
+        return 0
+    hottest = (
+        select(Book)
+        .join(Activity, Activity.book_id == Book.id)
+        .group_by(Book.id)
+        .order_by(func.count(Activity.id).desc())
+        .limit(limit)
     )
+    books = db.scalars(hottest).all()
+    for book in books:
+        _remember_book(book)
+    return len(books)
 
 
-def list_books(db: Session):
-    """Get all books"""
-    return db.query(Book).all()
+BOOK_CACHE_SIZE_SAMPLE = 256
+
+
+def book_cache_stats() -> dict:
+    """Hit/miss counters plus an estimate of the memory held by cached payloads"""
+    stats = book_cache.stats()
+    entries = book_cache.values()
+    sample = random.sample(entries, min(len(entries), BOOK_CACHE_SIZE_SAMPLE))
+    if sample:
+        sampled = sum(
+            sys.getsizeof(payload) + sum(sys.getsizeof(value) for value in payload.values())
+            for _, payload in sample
+        )
+        stats["approx_bytes"] = int(sampled / len(sample) * len(entries))
+    else:
+        stats["approx_bytes"] = 0
+    stats["external_ids"] = len(book_external_ids)
+    return stats
 
 
 # ============================================================================
 # ACTIVITY CRUD OPERATIONS
 # ============================================================================
 
+def _activities(db: Session):
+    """
+    Activity query with the book loaded in the same SELECT.
+
+    ActivityOut nests BookOut, so without this every serialized activity
+    would lazy-load its book with a separate query.
+    """
+    return db.query(Activity).options(joinedload(Activity.book))
+
+
+def _user_activities_stmt(user_id: int, limit: Optional[int] = None, after_id: Optional[int] = None):
+    """SELECT for one keyset page of a user's activities (shared by sync and async paths)"""
+    stmt = (
+        select(Activity)
+        .options(joinedload(Activity.book))
+        .where(Activity.user_id == user_id)
+    )
+    if after_id is not None:
+        stmt = stmt.where(Activity.id > after_id)
+    stmt = stmt.order_by(Activity.id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def _recent_activities_stmt(limit: int):
+    """SELECT for the most recently added activities across all users"""
+    return (
+        select(Activity)
+        .options(joinedload(Activity.book))
+        .order_by(Activity.date_added.desc())
+        .limit(limit)
+    )
+
+
 def create_activity(
     db: Session, 
     user: User, 
-    book: Book, 
+    book: dict, 
     status: str, 
     progress: int = 0
-) -> Activity:
-    """Create a new reading activity"""
+) -> dict:
+    """
+    Create a new reading activity for a book given as its cached BookOut
+    dict (see get_cached_book), so the book row is never loaded.
+
+    Returns the ActivityOut payload (plus user_id) that was published.
+    """
     new_activity = Activity(
         user_id=user.id,
-        book_id=book.id,
+        book_id=book["id"],
         status=status,
         progress=progress,
         is_favorite=0
     )
     db.add(new_activity)
+    deltas = {}
+    _add_stats(deltas, new_activity, +1)
+    _apply_stats_deltas(db, deltas)
+    db.flush()
+    created = _serialize_activity(new_activity, book)
+    db.commit()
+    _publish_activity_changes(created=[created])
+    return created
+
+
+def bulk_create_activities(db: Session, user: User, items: List[ActivityBulkItem]) -> List[dict]:
+    """
+    Add many books to a user's library in one transaction.
+
+    Known books and existing activities are each resolved with one IN query.
+    Returns one outcome per item, in request order.
+    """
+    book_ids = {item.book_id for item in items}
+    known_books = {book.id: book for book in db.query(Book).filter(Book.id.in_(book_ids))}
+    existing = dict(db.execute(
+        select(Activity.book_id, Activity.id).where(
+            Activity.user_id == user.id,
+            Activity.book_id.in_(book_ids)
+        )
+    ).all())
+
+    results = []
+    new_activities = []
+    for item in items:
+        if item.book_id not in known_books:
+            results.append({"outcome": "book_not_found", "book_id": item.book_id})
+        elif item.book_id in existing:
+            results.append({"outcome": "exists", "book_id": item.book_id, "activity_id": existing[item.book_id]})
+        else:
+            activity = Activity(
+                user_id=user.id,
+                book=known_books[item.book_id],
+                status=item.status,
+                progress=item.progress,
+                is_favorite=0
+            )
+            # Later duplicates of the same book in this request resolve to it
+            existing[item.book_id] = activity
+            new_activities.append(activity)
+            results.append({"outcome": "created", "book_id": item.book_id, "activity_id": activity})
+
+    db.add_all(new_activities)
+    deltas = {}
+    for activity in new_activities:
+        _add_stats(deltas, activity, +1)
+    _apply_stats_deltas(db, deltas)
+    db.flush()
+    created = [_serialize_activity(activity) for activity in new_activities]
     db.commit()
-    db.refresh(new_activity)
-    return new_activity
+    _publish_activity_changes(created=created)
+    # Primary keys are only known after the flush
+    for result in results:
+        if isinstance(result.get("activity_id"), Activity):
+            result["activity_id"] = result["activity_id"].id
+    return results
+
+
+def bulk_update_activities(db: Session, user: User, patches: List[ActivityPatch]) -> List[dict]:
+    """
+    Apply many patches to a user's activities with one SELECT and one commit.
+
+    Patches for other users' activities are reported as forbidden and left
+    alone. Returns one outcome per patch, in request order.
+    """
+    ids = {patch.id for patch in patches}
+    activities = {
+        activity.id: activity
+        for activity in _activities(db).filter(Activity.id.in_(ids))
+    }
+    # Buffered progress is older than these patches: fold it in first (it is
+    # put back if the commit fails)
+    owned = [activity_id for activity_id, activity in activities.items() if activity.user_id == user.id]
+    with progress_buffer.buffer.taken(owned) as buffered:
+        results = []
+        deltas = {}
+        for patch in patches:
+            activity = activities.get(patch.id)
+            if activity is None:
+                results.append({"outcome": "not_found", "activity_id": patch.id})
+                continue
+            if activity.user_id != user.id:
+                results.append({"outcome": "forbidden", "activity_id": patch.id})
+                continue
+            _add_stats(deltas, activity, -1)
+            pending = buffered.pop(patch.id, None)
+            if patch.status is not None:
+                activity.status = patch.status
+            if patch.progress is not None:
+                activity.progress = patch.progress
+            elif pending is not None:
+                activity.progress = pending
+            if patch.is_favorite is not None:
+                activity.is_favorite = 1 if patch.is_favorite else 0
+            _add_stats(deltas, activity, +1)
+            results.append({"outcome": "updated", "activity_id": activity.id, "book_id": activity.book_id})
+        _apply_stats_deltas(db, deltas)
+        updated = [
+            _serialize_activity(activities[activity_id])
+            for activity_id in dict.fromkeys(r["activity_id"] for r in results if r["outcome"] == "updated")
+        ]
+        db.commit()
+    _publish_activity_changes(updated=updated)
+    return results
 
 
-def get_user_activities(db: Session, user: User):
-    """Get all activities for a user"""
-    return db.query(Activity).filter(Activity.user_id == user.id).all()
+def get_user_activities(
+    db: Session,
+    user: User,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None
+):
+    """Get a user's activities ordered by id, optionally one keyset page after `after_id`"""
+    return db.scalars(_user_activities_stmt(user.id, limit, after_id)).all()
 
 
 def get_user_activity(db: Session, user_id: int):
     """Get all activities for a user by user_id"""
-    return db.query(Activity).filter(Activity.user_id == user_id).all()
+    return _activities(db).filter(Activity.user_id == user_id).all()
+
+
+def iter_user_library(db: Session, user_id: int, batch_size: int = 1000):
+    """
+    Stream a user's activities joined with their books as plain row mappings.
+
+    Rows are fetched `batch_size` at a time through a server-side cursor and
+    never become ORM objects, so memory stays flat for any library size.
+    """
+    stmt = (
+        select(
+            Activity.id,
+            Activity.status,
+            Activity.progress,
+            Activity.is_favorite,
+            Activity.date_added,
+            Book.id.label("book_id"),
+            Book.title,
+            Book.author,
+            Book.description,
+            Book.cover_image,
+            Book.category,
+            Book.external_id,
+        )
+        .join(Book, Activity.book_id == Book.id)
+        .where(Activity.user_id == user_id)
+        .order_by(Activity.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    for row in db.execute(stmt).mappings():
+        yield row
+
+
+def get_recent_activities(db: Session, limit: int = 10):
+    """Get the most recently added activities across all users"""
+    return db.scalars(_recent_activities_stmt(limit)).all()
 
 
 def update_activity(
@@ -168,21 +588,367 @@ def update_activity(
     is_favorite: Optional[bool] = None
 ) -> Optional[Activity]:
     """Update an activity"""
-    activity = db.query(Activity).filter(Activity.id == activity_id).first()
-    if activity:
+    # A buffered progress update is older than this one; fold it in first
+    # (it is put back if the commit fails)
+    with progress_buffer.buffer.taken([activity_id]) as buffered:
+        if progress is None:
+            progress = buffered.get(activity_id)
+        activity = _activities(db).filter(Activity.id == activity_id).first()
+        if not activity:
+            return None
+        deltas = {}
+        _add_stats(deltas, activity, -1)
         if status is not None:
             activity.status = status
         if progress is not None:
             activity.progress = progress
         if is_favorite is not None:
             activity.is_favorite = 1 if is_favorite else 0
+        _add_stats(deltas, activity, +1)
+        _apply_stats_deltas(db, deltas)
+        updated = [_serialize_activity(activity)]
         db.commit()
-        db.refresh(activity)
+    _publish_activity_changes(updated=updated)
+    db.refresh(activity)
     return activity
 
+
+def delete_activity(db: Session, activity_id: int) -> bool:
+    """Delete an activity; returns False if it does not exist"""
+    with progress_buffer.buffer.taken([activity_id]):
+        activity = db.query(Activity).filter(Activity.id == activity_id).first()
+        if not activity:
+            return False
+        deltas = {}
+        _add_stats(deltas, activity, -1)
+        _apply_stats_deltas(db, deltas)
+        deleted = [{"id": activity.id, "user_id": activity.user_id}]
+        db.delete(activity)
+        db.commit()
+    _publish_activity_changes(deleted=deleted)
+    return True
+
+def buffer_progress_update(db: Session, activity_id: int, progress: int) -> Optional[dict]:
+    """
+    Acknowledge a progress-only update through the write-behind buffer.
+
+    One SELECT (for the 404 check and the response) and no commit; the feed
+    and subscribers hear about it right away. Returns the ActivityOut
+    payload, or None if the activity does not exist.
+    """
+    activity = _activities(db).filter(Activity.id == activity_id).first()
+    if not activity:
+        return None
+    progress_buffer.buffer.add(activity.id, activity.user_id, progress)
+    payload = _serialize_activity(activity)
+    payload["progress"] = progress
+    _publish_activity_changes(updated=[payload])
+    return payload
+
+
+def apply_progress_updates(db: Session, updates: Dict[int, int], chunk_size: int = 500) -> int:
+    """
+    Write buffered progress values in one transaction (progress_buffer's flush).
+
+    Stats and library versions are updated as for any other write; change
+    notifications were already sent when the updates were buffered.
+    """
+    ids = list(updates)
+    deltas = {}
+    written = 0
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        for activity in db.query(Activity).filter(Activity.id.in_(chunk)):
+            _add_stats(deltas, activity, -1)
+            activity.progress = updates[activity.id]
+            _add_stats(deltas, activity, +1)
+            written += 1
+    _apply_stats_deltas(db, deltas)
+    db.commit()
+    return written
+
+
 def get_activity_by_book_and_user(db: Session, book_id: int, user_id: int) -> Optional[Activity]:
     """Get activity for a specific book and user"""
-    return db.query(Activity).filter(
+    return _activities(db).filter(
         Activity.book_id == book_id,
         Activity.user_id == user_id
-    ).first()
\ No newline at end of file
+    ).first()
+
+
+# ============================================================================
+# ACTIVITY CHANGE NOTIFICATIONS
+# ============================================================================
+
+def _serialize_activity(activity: Activity, book: Optional[dict] = None) -> dict:
+    """
+    ActivityOut payload plus the owner, captured before commit expires the row.
+
+    Pass the BookOut dict as `book` when it is already at hand, so the book
+    relationship is not loaded just to serialize it.
+    """
+    if book is None:
+        payload = ActivityOut.model_validate(activity).model_dump()
+    else:
+        payload = ActivityOut(
+            id=activity.id,
+            status=activity.status,
+            progress=activity.progress,
+            is_favorite=bool(activity.is_favorite),
+            book=book
+        ).model_dump()
+    payload["user_id"] = activity.user_id
+    return payload
+
+
+def _publish_activity_changes(created=(), updated=(), deleted=()) -> None:
+    """Hand committed activity changes to in-process consumers (recent feed, SSE)"""
+    for payload in created:
+        activity_feed.feed.add(payload)
+        events.broker.publish("activity.created", payload, payload["user_id"])
+    for payload in updated:
+        activity_feed.feed.update(payload)
+        events.broker.publish("activity.updated", payload, payload["user_id"])
+    for payload in deleted:
+        activity_feed.feed.remove(payload["id"])
+        events.broker.publish("activity.deleted", payload, payload["user_id"])
+
+
+def warm_activity_feed(db: Session) -> None:
+    """Load the newest activities into the recent feed (called on startup)"""
+    activities = get_recent_activities(db, activity_feed.feed.size)
+    activity_feed.feed.warm(_serialize_activity(activity) for activity in activities)
+
+
+# ============================================================================
+# READING STATS (user_reading_stats, kept in step with reading_activity)
+# ============================================================================
+
+def _add_stats(deltas: Dict[tuple, list], activity: Activity, sign: int) -> None:
+    """
+    Add (sign=+1) or remove (sign=-1) one activity's contribution to the
+    pending stats deltas. Updates remove the old state and add the new one.
+    """
+    totals = deltas.setdefault((activity.user_id, activity.status), [0, 0, 0])
+    totals[0] += sign
+    totals[1] += sign * (1 if activity.is_favorite else 0)
+    totals[2] += sign * (activity.progress or 0)
+
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _apply_stats_deltas(db: Session, deltas: Dict[tuple, list]) -> None:
+    """
+    Apply pending stats deltas inside the caller's transaction.
+
+    Every user with a pending delta also gets its library_version bumped,
+    which is what the library ETag is derived from. Stats rows are upserted,
+    so two transactions creating the same (user, status) row do not collide.
+    """
+    user_ids = {user_id for user_id, _ in deltas}
+    if user_ids:
+        db.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .values(library_version=User.library_version + 1)
+        )
+    upsert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    for (user_id, status), (count, favorites, progress) in deltas.items():
+        if not (count or favorites or progress):
+            continue
+        if upsert is not None:
+            stmt = upsert(UserStats).values(
+                user_id=user_id,
+                status=status,
+                activity_count=count,
+                favorite_count=favorites,
+                progress_total=progress,
+            )
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[UserStats.user_id, UserStats.status],
+                set_={
+                    "activity_count": UserStats.activity_count + stmt.excluded.activity_count,
+                    "favorite_count": UserStats.favorite_count + stmt.excluded.favorite_count,
+                    "progress_total": UserStats.progress_total + stmt.excluded.progress_total,
+                },
+            ))
+            continue
+        result = db.execute(
+            update(UserStats)
+            .where(UserStats.user_id == user_id, UserStats.status == status)
+            .values(
+                activity_count=UserStats.activity_count + count,
+                favorite_count=UserStats.favorite_count + favorites,
+                progress_total=UserStats.progress_total + progress,
+            )
+        )
+        if result.rowcount == 0:
+            db.add(UserStats(
+                user_id=user_id,
+                status=status,
+                activity_count=count,
+                favorite_count=favorites,
+                progress_total=progress,
+            ))
+            db.flush()
+
+
+def get_user_stats(db: Session, user_id: int) -> dict:
+    """Reading totals for a user, read from the maintained aggregates"""
+    rows = db.query(UserStats).filter(
+        UserStats.user_id == user_id,
+        UserStats.activity_count > 0
+    ).all()
+    total = sum(row.activity_count for row in rows)
+    progress = sum(row.progress_total for row in rows)
+    return {
+        "total": total,
+        "favorites": sum(row.favorite_count for row in rows),
+        "average_progress": (progress / total) if total else 0.0,
+        "by_status": {row.status: row.activity_count for row in rows},
+    }
+
+
+def rebuild_user_stats(db: Session, user_id: Optional[int] = None, dry_run: bool = False) -> List[dict]:
+    """
+    Recompute stats from reading_activity and report rows that had drifted.
+
+    Replaces the stored aggregates (for one user, or everyone) unless dry_run.
+    """
+    actual_stmt = select(
+        Activity.user_id,
+        Activity.status,
+        func.count(),
+        func.sum(case((Activity.is_favorite == 1, 1), else_=0)),
+        func.sum(func.coalesce(Activity.progress, 0)),
+    ).group_by(Activity.user_id, Activity.status)
+    stored_stmt = select(
+        UserStats.user_id,
+        UserStats.status,
+        UserStats.activity_count,
+        UserStats.favorite_count,
+        UserStats.progress_total,
+    ).where(UserStats.activity_count != 0)
+    if user_id is not None:
+        actual_stmt = actual_stmt.where(Activity.user_id == user_id)
+        stored_stmt = stored_stmt.where(UserStats.user_id == user_id)
+
+    actual = {(row[0], row[1]): tuple(row[2:]) for row in db.execute(actual_stmt)}
+    stored = {(row[0], row[1]): tuple(row[2:]) for row in db.execute(stored_stmt)}
+
+    drift = [
+        {"user_id": key[0], "status": key[1], "stored": stored.get(key), "actual": actual.get(key)}
+        for key in sorted(set(actual) | set(stored))
+        if actual.get(key) != stored.get(key)
+    ]
+    if dry_run:
+        return drift
+
+    clear = delete(UserStats)
+    if user_id is not None:
+        clear = clear.where(UserStats.user_id == user_id)
+    db.execute(clear)
+    if actual:
+        db.execute(insert(UserStats), [
+            {
+                "user_id": key[0],
+                "status": key[1],
+                "activity_count": count,
+                "favorite_count": favorites,
+                "progress_total": progress,
+            }
+            for key, (count, favorites, progress) in actual.items()
+        ])
+    db.commit()
+    return drift
+
+
+# ============================================================================
+# ASYNC READ OPERATIONS (AsyncSession, used by the async endpoints)
+# ============================================================================
+
+async def get_user_by_id_async(db: AsyncSession, user_id: int) -> Optional[User]:
+    """Get user by ID"""
+    return await db.get(User, user_id)
+
+
+async def get_user_by_username_async(db: AsyncSession, username: str) -> Optional[User]:
+    """Get user by username"""
+    return await db.scalar(select(User).where(User.username == username))
+
+
+async def get_user_identity_async(db: AsyncSession, username: str) -> Optional[UserOut]:
+    """Resolve a username to its public profile, from the cache when possible"""
+    cached = identity_cache.get(username)
+    if cached is not None:
+        return UserOut(**cached)
+    generation = _identity_generation
+    user = await get_user_by_username_async(db, username)
+    return _remember_identity(user, generation) if user else None
+
+
+async def get_user_by_email_async(db: AsyncSession, email: str) -> Optional[User]:
+    """Get user by email"""
+    return await db.scalar(select(User).where(User.email == email))
+
+
+async def create_user_async(
+    db: AsyncSession,
+    username: str,
+    email: Optional[str],
+    password_hash: str,
+    full_name: Optional[str] = None
+) -> User:
+    """Create a new user from an already computed password hash"""
+    new_user = User(
+        username=username,
+        email=email,
+        password_hash=password_hash,
+        full_name=full_name
+    )
+    db.add(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    invalidate_user_identity(new_user.username)
+    return new_user
+
+
+async def get_book_async(db: AsyncSession, book_id: int) -> Optional[Book]:
+    """Get book by ID"""
+    return await db.get(Book, book_id)
+
+
+async def get_cached_book_async(db: AsyncSession, book_id: int) -> Optional[Tuple[int, dict]]:
+    """(version, BookOut dict) for a book, read through the cache"""
+    cached = book_cache.get(book_id)
+    if cached is not None:
+        return cached
+    book = await get_book_async(db, book_id)
+    return _remember_book(book) if book else None
+
+
+async def search_books_local_async(db: AsyncSession, q: str, limit: int = 8):
+    """Full-text search of the local catalogue, best matches first"""
+    return (await db.scalars(search_index.search_statement(q, limit))).all()
+
+
+async def get_library_version_async(db: AsyncSession, user_id: int) -> Optional[int]:
+    """Current library_version of a user, for conditional GETs"""
+    return await db.scalar(select(User.library_version).where(User.id == user_id))
+
+
+async def get_user_activities_async(
+    db: AsyncSession,
+    user: User,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None
+):
+    """Get a user's activities ordered by id, optionally one keyset page after `after_id`"""
+    return (await db.scalars(_user_activities_stmt(user.id, limit, after_id))).all()
+
+
+async def get_recent_activities_async(db: AsyncSession, limit: int = 10):
+    """Get the most recently added activities across all users"""
+    return (await db.scalars(_recent_activities_stmt(limit))).all()
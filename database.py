@@ -1,22 +1,167 @@
 # database.py
+import logging
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+import metrics
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./readify.db")
 
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+# Async drivers used when ASYNC_DATABASE_URL is not set explicitly
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
+
+# SQLite connection pragmas
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+# Connection pool settings for server databases (Postgres, MySQL, ...)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+
+# Alembic scripts, used to stamp databases created by ensure_schema
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic")
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Configure every new SQLite connection.
+
+    WAL lets readers run alongside a writer, busy_timeout makes writers wait
+    for the lock instead of failing with "database is locked", and
+    synchronous=NORMAL is durable in WAL mode while skipping most fsyncs.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    # Negative cache_size is in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.close()
+
+
+def build_engine(url: str = DATABASE_URL) -> Engine:
+    """Create an engine tuned for the database backend in `url`"""
+    if url.startswith("sqlite"):
+        engine = create_engine(
+            url,
+            connect_args={
+                "check_same_thread": False,
+                "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+            },
+            echo=DB_ECHO,
+        )
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        return engine
+
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        echo=DB_ECHO,
+    )
+
+
+def to_async_url(url: str) -> str:
+    """Swap the driver in a sync database URL for its asyncio equivalent"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args, echo=False)
+
+def build_async_engine(url: str) -> AsyncEngine:
+    """Create an asyncio engine with the same tuning as build_engine"""
+    if url.startswith("sqlite"):
+        engine = create_async_engine(
+            url,
+            connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+            echo=DB_ECHO,
+        )
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+        return engine
+
+    return create_async_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        echo=DB_ECHO,
+    )
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+engine = build_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = build_async_engine(ASYNC_DATABASE_URL)
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+def ensure_schema(bind: Engine) -> None:
+    """
+    Create the tables of an empty database and stamp it with the latest
+    migration (called on startup, after the models are imported).
+
+    A database that already has tables is left to Alembic: creating the
+    tables added since it was last migrated would make `alembic upgrade
+    head` fail on them.
+    """
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    script = ScriptDirectory(MIGRATIONS_DIR)
+    with bind.begin() as connection:
+        tables = inspect(connection).get_table_names()
+        if not tables:
+            Base.metadata.create_all(bind=connection)
+            MigrationContext.configure(connection).stamp(script, "head")
+            return
+        if "alembic_version" not in tables:
+            logger.warning(
+                "Database has tables but no alembic_version; stamp it with the "
+                "revision it matches and run `alembic upgrade head`"
+            )
+            return
+        current = MigrationContext.configure(connection).get_current_revision()
+    if current != script.get_current_head():
+        logger.warning("Database is at migration %s; run `alembic upgrade head`", current)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Async session dependency for `async def` endpoints"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,98 @@
+# events.py
+"""
+In-process pub/sub for activity changes, consumed by the SSE endpoint.
+
+crud publishes after each commit, usually from a threadpool thread; fan-out
+always runs on the event loop. Every subscriber has a bounded queue, and a
+subscriber whose queue fills up is disconnected rather than allowed to slow
+down publishing or grow memory without limit.
+"""
+import asyncio
+import itertools
+import json
+import os
+from typing import Dict, Optional, Set
+
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+
+
+class Subscriber:
+    """One connected client; receives pre-encoded SSE frames"""
+
+    def __init__(self, user_id: Optional[int], queue_size: int):
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class EventBroker:
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Subscribers for everyone (None) and per user id
+        self._by_user: Dict[Optional[int], Set[Subscriber]] = {}
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._by_user.values())
+
+    def subscribe(self, user_id: Optional[int] = None) -> Subscriber:
+        """Register a subscriber (call from the event loop)"""
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(user_id, self.queue_size)
+        self._by_user.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self._by_user.get(subscriber.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._by_user[subscriber.user_id]
+
+    def publish(self, event: str, payload: dict, user_id: int) -> None:
+        """Queue an event for matching subscribers; safe to call from any thread"""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self._by_user:
+            return
+        frame = f"id: {next(self._ids)}\nevent: {event}\ndata: {json.dumps(payload, default=str)}\n\n".encode("utf-8")
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout(frame, user_id)
+        else:
+            loop.call_soon_threadsafe(self._fanout, frame, user_id)
+
+    def _fanout(self, frame: bytes, user_id: int) -> None:
+        self.published += 1
+        for key in (None, user_id):
+            for subscriber in list(self._by_user.get(key, ())):
+                try:
+                    subscriber.queue.put_nowait(frame)
+                except asyncio.QueueFull:
+                    self._drop(subscriber)
+
+    def _drop(self, subscriber: Subscriber) -> None:
+        """Disconnect a consumer that fell behind"""
+        self.dropped += 1
+        subscriber.dropped = True
+        self.unsubscribe(subscriber)
+        # Make room for the end-of-stream marker
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self.subscriber_count,
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+broker = EventBroker()
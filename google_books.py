@@ -1,26 +1,88 @@
 # google_books.py
+import asyncio
 import os
-import requests
+import time
+from typing import Optional
+import httpx
 from dotenv import load_dotenv
+from cache import TTLCache
+import metrics
 load_dotenv()
 API_KEY = os.getenv("GOOGLE_BOOKS_API_KEY", "").strip()
 
-BASE = "https://www.googleapis.com/books/v1/volumes"
+BASE = os.getenv("GOOGLE_BOOKS_BASE_URL", "https://www.googleapis.com/books/v1/volumes")
 
-def search_google_books(q: str, max_results: int = 8):
+# Shared HTTP client settings (keep-alive pool reused across requests)
+HTTP_TIMEOUT = float(os.getenv("GOOGLE_BOOKS_TIMEOUT", "15"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("GOOGLE_BOOKS_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("GOOGLE_BOOKS_MAX_KEEPALIVE", "10"))
+
+# Search result cache (keyed on normalized query + max_results)
+SEARCH_CACHE_TTL = float(os.getenv("GOOGLE_BOOKS_CACHE_TTL", "600"))
+SEARCH_CACHE_SIZE = int(os.getenv("GOOGLE_BOOKS_CACHE_SIZE", "1024"))
+
+search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+# In-flight upstream calls, so concurrent identical misses share one request
+_inflight = {}
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+# ============================================================================
+# HTTP CLIENT LIFECYCLE
+# ============================================================================
+
+async def start_client() -> httpx.AsyncClient:
+    """Create the shared connection-pooled client (called on app startup)"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client and its pooled connections (called on shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# ============================================================================
+# SEARCH
+# ============================================================================
+
+async def search_google_books(q: str, max_results: int = 8):
     params = {"q": q, "maxResults": max_results}
     if API_KEY:
         params["key"] = API_KEY
     try:
-        r = requests.get(BASE, params=params, timeout=15)
-        r.raise_for_status()
+        client = await start_client()
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            r = await client.get(BASE, params=params)
+            r.raise_for_status()
+            outcome = "ok"
+        except httpx.TimeoutException:
+            outcome = "timeout"
+            raise
+        finally:
+            metrics.observe_upstream("google_books", time.perf_counter() - start, outcome)
         data = r.json()
-        
+
         # Check if we got results
         items = data.get("items", [])
         if not items:
             return []  # Return empty list instead of error
-        
+
         out = []
         for item in items:
             info = item.get("volumeInfo", {})
@@ -34,9 +96,43 @@ def search_google_books(q: str, max_results: int = 8):
                 "category": (info.get("categories") or [None])[0]
             })
         return out
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         raise Exception("Request to Google Books API timed out. Please try again.")
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise Exception(f"Error connecting to Google Books API: {str(e)}")
     except Exception as e:
         raise Exception(f"Error processing Google Books search: {str(e)}")
+
+
+def normalize_query(q: str) -> str:
+    """Normalize a search query so trivially different spellings share a cache entry"""
+    return " ".join(q.lower().split())
+
+
+async def cached_search(q: str, max_results: int = 8):
+    """
+    Search Google Books through the shared result cache.
+
+    Identical concurrent misses are coalesced: the first caller performs the
+    upstream request and the others await its result. Errors are not cached.
+    """
+    key = (normalize_query(q), max_results)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_and_cache(key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shield so one disconnecting client doesn't cancel the shared request
+    return await asyncio.shield(task)
+
+
+async def _fetch_and_cache(key: tuple):
+    """Run one upstream search and store the result in the cache"""
+    q, max_results = key
+    result = await search_google_books(q, max_results=max_results)
+    search_cache.set(key, result)
+    return result
@@ -0,0 +1,108 @@
+# hashing.py
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+
+load_dotenv()
+
+# Work factor for new hashes (0 keeps passlib's default)
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "0"))
+
+# Size of the hashing process pool and how many calls may queue for it
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", "64"))
+
+# Pool workers are not forked from the app process, which by then runs
+# threads (catalogue sync, progress flushes, aiosqlite) whose locks a fork
+# would copy in whatever state they are in
+HASH_START_METHOD = os.getenv(
+    "HASH_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def _build_context() -> CryptContext:
+    settings = {}
+    if PASSWORD_HASH_ROUNDS:
+        settings["pbkdf2_sha256__default_rounds"] = PASSWORD_HASH_ROUNDS
+    return CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto", **settings)
+
+
+# Password hashing configuration
+pwd_context = _build_context()
+
+
+def hash_password(password: str) -> str:
+    """Hash a plain text password"""
+    # Truncate password to 72 bytes as required by bcrypt
+    truncated_password = password.encode('utf-8')[:72].decode('utf-8')
+    return pwd_context.hash(truncated_password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a plain text password against a hashed password"""
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+# ============================================================================
+# BOUNDED HASHING POOL
+# ============================================================================
+
+class HashingBusy(Exception):
+    """Raised when too many hashing calls are already queued"""
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_MAX_PENDING)
+
+
+def start() -> None:
+    """Start the hashing process pool (called on app startup)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS,
+                mp_context=multiprocessing.get_context(HASH_START_METHOD)
+            )
+
+
+async def shutdown() -> None:
+    """Stop the hashing process pool, waiting for queued calls (called on shutdown)"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        # Waiting for the workers blocks; keep it off the event loop
+        await asyncio.to_thread(executor.shutdown, wait=True)
+
+
+def _submit(fn, *args) -> Future:
+    """Queue fn on the pool, or raise HashingBusy if the queue is full"""
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        if _executor is None:
+            start()
+        future = _executor.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the process pool without blocking the event loop"""
+    return await asyncio.wrap_future(_submit(hash_password, password))
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the process pool without blocking the event loop"""
+    return await asyncio.wrap_future(_submit(verify_password, plain_password, hashed_password))
@@ -0,0 +1,43 @@
+# http_cache.py
+import hashlib
+from typing import Optional
+from fastapi import Request, Response, status
+
+# Books are effectively immutable once created
+BOOK_CACHE_CONTROL = "public, max-age=300"
+# Listings grow as books are added: shared, but always revalidate
+LIST_CACHE_CONTROL = "public, no-cache"
+# Per-user data may change at any time: cache, but always revalidate
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from version counters / identifying values"""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match already names this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in header.split(","))
+    return any(tag[2:] == etag if tag.startswith("W/") else tag == etag for tag in candidates)
+
+
+def not_modified(etag: str, cache_control: Optional[str] = None) -> Response:
+    """Empty 304 response carrying the validators"""
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+
+def set_validators(response: Response, etag: str, cache_control: Optional[str] = None) -> None:
+    """Attach ETag (and Cache-Control) to a full response"""
+    response.headers["ETag"] = etag
+    if cache_control:
+        response.headers["Cache-Control"] = cache_control
@@ -1,17 +1,58 @@
 # main.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 import models
-from database import engine, Base
+import google_books
+import hashing
+import catalogue_sync
+import search_index
+import crud
+import events
+import metrics
+import profiling
+import progress_buffer
+import security
+import responses
+from compression import COMPRESSION_ENABLED, CompressionMiddleware
+from database import engine, async_engine, ensure_schema, SessionLocal
 from routers import users, books, activity, auth
 
-Base.metadata.create_all(bind=engine)
+ensure_schema(engine)
+search_index.ensure_index(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop shared resources with the application"""
+    await google_books.start_client()
+    hashing.start()
+    catalogue_sync.start()
+    progress_buffer.start(crud.apply_progress_updates)
+    db = SessionLocal()
+    try:
+        crud.warm_activity_feed(db)
+        crud.warm_book_cache(db)
+    finally:
+        db.close()
+    try:
+        yield
+    finally:
+        await catalogue_sync.stop()
+        # Write out acknowledged progress updates before the engine goes away
+        progress_buffer.stop()
+        await hashing.shutdown()
+        await google_books.close_client()
+        await async_engine.dispose()
 
 
 app = FastAPI(
     title="Readify API",
     description="A book tracking and reading management API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=responses.ResponseClass
 )
 
 
@@ -28,6 +69,33 @@ app.add_middleware(
     allow_headers=["*"], 
 )
 
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Inside the metrics middleware, so profiles can read the request's query count
+if profiling.PROFILER_ENABLED:
+    app.add_middleware(profiling.ProfilerMiddleware)
+
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.register_collector("identity_cache", crud.identity_cache_stats)
+    metrics.register_collector("book_cache", crud.book_cache_stats)
+    metrics.register_collector("search_cache", google_books.search_cache.stats)
+    metrics.register_collector("token_cache", security.token_cache.stats)
+    metrics.register_collector("catalogue_sync", catalogue_sync.sync.stats)
+    metrics.register_collector("events", events.broker.stats)
+    metrics.register_collector("progress_buffer", progress_buffer.buffer.stats)
+
+
+@app.exception_handler(hashing.HashingBusy)
+async def hashing_busy_handler(request: Request, exc: hashing.HashingBusy):
+    """Shed load when the password hashing queue is full"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": "1"}
+    )
+
 
 app.include_router(auth.router)      
 app.include_router(users.router)     
@@ -45,6 +113,12 @@ def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
@@ -0,0 +1,237 @@
+# metrics.py
+"""
+Request latency and database query instrumentation, exposed on /metrics in
+the Prometheus text format.
+
+MetricsMiddleware times every request and keeps a per-request context (in
+a contextvar, which also reaches threadpool endpoints) that the engine's
+cursor events add each query's duration to. Upstream calls record their own
+timings, and stats() methods of caches and workers are published as gauges
+through register_collector. Everything is in-process and per worker.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels; thread-safe"""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            base = _labels(self.labelnames, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{base} {values[-1]}")
+            lines.append(f"{self.name}_count{base} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter with optional labels; thread-safe"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+request_duration = Histogram(
+    "readify_http_request_duration_seconds", "Request latency by route",
+    LATENCY_BUCKETS, ("method", "route", "status"),
+)
+request_queries = Histogram(
+    "readify_http_request_db_queries", "SQL statements executed per request",
+    QUERY_COUNT_BUCKETS, ("route",),
+)
+request_db_time = Histogram(
+    "readify_http_request_db_seconds", "Time spent in SQL per request",
+    LATENCY_BUCKETS, ("route",),
+)
+query_duration = Histogram(
+    "readify_db_query_duration_seconds", "Duration of individual SQL statements",
+    LATENCY_BUCKETS,
+)
+slow_queries = Counter("readify_db_slow_queries_total", f"SQL statements slower than {SLOW_QUERY_MS:g} ms")
+upstream_duration = Histogram(
+    "readify_upstream_request_duration_seconds", "Latency of calls to external services",
+    LATENCY_BUCKETS, ("service", "outcome"),
+)
+
+_metrics = [request_duration, request_queries, request_db_time, query_duration, slow_queries, upstream_duration]
+
+# name -> callable returning a flat dict of numbers (e.g. a cache's stats())
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+
+def register_collector(name: str, stats: Callable[[], dict]) -> None:
+    """Publish every numeric value of stats() as readify_<name>_<key>"""
+    _collectors[name] = stats
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for name, stats in _collectors.items():
+        try:
+            values = stats()
+        except Exception:
+            logger.exception("Metrics collector %s failed", name)
+            continue
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                metric = f"readify_{name}_{key}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================================
+# PER-REQUEST DATABASE ACCOUNTING
+# ============================================================================
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("readify_request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Query count / SQL time of the request being handled, if any"""
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    query_duration.observe(elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_queries.inc()
+        # Bound parameters may hold emails or password hashes: never log them
+        count = len(parameters) if isinstance(parameters, (list, tuple, dict)) else 0
+        logger.warning(
+            "Slow query (%.1f ms, %s%d parameters redacted): %s",
+            elapsed * 1000, "executemany, " if executemany else "", count, " ".join(statement.split())
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement run on `engine` (pass async_engine.sync_engine for async)"""
+    if METRICS_ENABLED:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def observe_upstream(service: str, seconds: float, outcome: str) -> None:
+    upstream_duration.observe(seconds, service, outcome)
+
+
+class MetricsMiddleware:
+    """Record latency, query count and SQL time for every HTTP request"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            # The route template, so /books/1 and /books/2 share a series
+            route = getattr(scope.get("route"), "path", "unmatched")
+            request_duration.observe(elapsed, scope["method"], route, str(status_code))
+            request_queries.observe(stats.queries, route)
+            request_db_time.observe(stats.db_seconds, route)
@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -12,6 +12,8 @@ class User(Base):
     email = Column(String(256), unique=True, index=True, nullable=True)
     password_hash = Column(String(256), nullable=False)
     full_name = Column(String(256), nullable=True)
+    # Bumped by every activity write; ETag source for the user's library
+    library_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     activities = relationship("Activity", back_populates="user", cascade="all, delete-orphan")
 
@@ -25,11 +27,20 @@ class Book(Base):
     cover_image = Column(String(512), nullable=True)
     category = Column(String(128), nullable=True)
     external_id = Column(String(128), unique=True, nullable=True, index=True)
+    # Bump on edits; ETag source for book responses
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     activities = relationship("Activity", back_populates="book", cascade="all, delete-orphan")
 
 class Activity(Base):
     __tablename__ = "reading_activity"
+    __table_args__ = (
+        # One activity per (user, book); also serves user_id-only lookups
+        Index("ix_reading_activity_user_id_book_id", "user_id", "book_id", unique=True),
+        Index("ix_reading_activity_user_id_status", "user_id", "status"),
+        # Keyset pages of a library: WHERE user_id = ? AND id > ? ORDER BY id
+        Index("ix_reading_activity_user_id_id", "user_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -37,7 +48,20 @@ class Activity(Base):
     status = Column(String(64), nullable=False, default="wishlist")
     progress = Column(Integer, nullable=True, default=0)
     is_favorite = Column(Integer, default=0)  # 0 = false, 1 = true
-    date_added = Column(DateTime, default=datetime.utcnow)
+    date_added = Column(DateTime, default=datetime.utcnow, index=True)
 
     user = relationship("User", back_populates="activities")
-    book = relationship("Book", back_populates="activities")
\ No newline at end of file
+    book = relationship("Book", back_populates="activities")
+
+class UserStats(Base):
+    """
+    Per-user, per-status reading aggregates, maintained incrementally by the
+    activity write paths in crud (rebuild with reconcile_stats.py)
+    """
+    __tablename__ = "user_reading_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    status = Column(String(64), primary_key=True)
+    activity_count = Column(Integer, nullable=False, default=0)
+    favorite_count = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer, nullable=False, default=0)
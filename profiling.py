@@ -0,0 +1,251 @@
+# profiling.py
+"""
+Opt-in sampling profiler for live requests.
+
+With PROFILER_ENABLED set, ProfilerMiddleware profiles a random
+PROFILER_SAMPLE_RATE share of requests, plus any request that carries a
+valid signed PROFILER_HEADER. A sampler thread snapshots stacks every
+PROFILER_INTERVAL_MS while the request runs. It records the event loop
+thread and any worker thread currently running application code. The
+result is written to PROFILER_DIR as collapsed stacks (open in speedscope,
+or use flamegraph.pl). Next to it goes a JSON file with the route, status,
+duration, SQL query count and DEPLOY_TAG. Only the newest
+PROFILER_MAX_FILES profiles are kept.
+
+Samples are process-wide, so requests running concurrently show up in each
+other's profiles. A signed request against a quiet instance gives the
+cleanest picture.
+
+    python profiling.py sign    # print a header value valid for PROFILER_MAX_SKEW seconds
+
+Signing uses security.SECRET_KEY, so SECRET_KEY must be set (and shared)
+for a header minted here to be accepted by the server.
+"""
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import metrics
+import security
+
+logger = logging.getLogger(__name__)
+
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_DIR = os.getenv("PROFILER_DIR", "./profiles")
+PROFILER_MAX_FILES = int(os.getenv("PROFILER_MAX_FILES", "200"))
+PROFILER_MAX_CONCURRENT = int(os.getenv("PROFILER_MAX_CONCURRENT", "2"))
+PROFILER_HEADER = os.getenv("PROFILER_HEADER", "X-Readify-Profile")
+PROFILER_MAX_SKEW = int(os.getenv("PROFILER_MAX_SKEW", "300"))
+DEPLOY_TAG = os.getenv("DEPLOY_TAG", "")
+
+# Frames from these files count as application code
+APP_ROOT = str(Path(__file__).resolve().parent)
+
+
+# ============================================================================
+# SIGNED DEBUG HEADER
+# ============================================================================
+
+def _signature(timestamp: str) -> str:
+    return hmac.new(security.SECRET_KEY.encode("utf-8"), timestamp.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def sign_debug_header(now: Optional[float] = None) -> str:
+    """Header value that requests a profile: '<unix time>.<hmac>'"""
+    timestamp = str(int(now if now is not None else time.time()))
+    return f"{timestamp}.{_signature(timestamp)}"
+
+
+def verify_debug_header(value: Optional[str], now: Optional[float] = None) -> bool:
+    """True for a correctly signed header value that has not expired"""
+    if not value or "." not in value:
+        return False
+    timestamp, signature = value.split(".", 1)
+    if not timestamp.isdigit():
+        return False
+    current = now if now is not None else time.time()
+    if abs(current - int(timestamp)) > PROFILER_MAX_SKEW:
+        return False
+    return hmac.compare_digest(signature, _signature(timestamp))
+
+
+# ============================================================================
+# SAMPLER
+# ============================================================================
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(APP_ROOT):
+        filename = os.path.relpath(filename, APP_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> Optional[str]:
+    """Root-first ';'-joined stack; None when it holds no application frames"""
+    labels = []
+    in_app = False
+    while frame is not None:
+        code = frame.f_code
+        labels.append(_frame_label(code))
+        in_app = in_app or code.co_filename.startswith(APP_ROOT)
+        frame = frame.f_back
+    return ";".join(reversed(labels)) if in_app else None
+
+
+class Sampler(threading.Thread):
+    """Samples stacks until stop() is called, then writes the profile"""
+
+    def __init__(self, profile_id: str, loop_thread: int, interval: float, store: "ProfileStore"):
+        super().__init__(name=f"profiler-{profile_id}", daemon=True)
+        self.profile_id = profile_id
+        self.loop_thread = loop_thread
+        self.interval = interval
+        self.store = store
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.metadata: dict = {}
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = _collapse(frame)
+                if stack is None and thread_id == self.loop_thread:
+                    # The loop waiting on I/O is still time spent on the request
+                    stack = "[event loop idle]"
+                if stack is not None:
+                    self.stacks[stack] += 1
+        self.metadata["samples"] = self.samples
+        self.store.save(self.profile_id, self.stacks, self.metadata)
+
+    def stop(self, metadata: dict) -> None:
+        self.metadata = metadata
+        self._stopped.set()
+
+
+class ProfileStore:
+    """Bounded on-disk ring of profiles: <id>.collapsed plus <id>.json"""
+
+    def __init__(self, directory: str = PROFILER_DIR, max_files: int = PROFILER_MAX_FILES):
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def save(self, profile_id: str, stacks: Counter, metadata: dict) -> None:
+        try:
+            with self._lock:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                collapsed = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+                (self.directory / f"{profile_id}.collapsed").write_text(collapsed)
+                (self.directory / f"{profile_id}.json").write_text(json.dumps(metadata, indent=2) + "\n")
+                self._trim()
+        except OSError:
+            logger.exception("Could not write profile %s", profile_id)
+
+    def _trim(self) -> None:
+        # Ids start with a sortable timestamp, so name order is age order
+        profiles = sorted(self.directory.glob("*.json"))
+        for old in profiles[:max(0, len(profiles) - self.max_files)]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".collapsed").unlink(missing_ok=True)
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+class ProfilerMiddleware:
+    """Profile sampled or explicitly requested (signed header) HTTP requests"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = PROFILER_SAMPLE_RATE,
+        interval_ms: float = PROFILER_INTERVAL_MS,
+        store: Optional[ProfileStore] = None,
+    ) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        self.store = store or ProfileStore()
+        self._slots = threading.BoundedSemaphore(PROFILER_MAX_CONCURRENT)
+        self._ids = itertools.count(1)
+
+    def _wanted(self, scope: Scope) -> Optional[str]:
+        """Why this request should be profiled, or None"""
+        if verify_debug_header(Headers(scope=scope).get(PROFILER_HEADER)):
+            return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = self._wanted(scope)
+        # Skip rather than queue when enough profiles are already running
+        if trigger is None or not self._slots.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(self._ids):06d}"
+        sampler = Sampler(profile_id, threading.get_ident(), self.interval, self.store)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        started_at = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats = metrics.current_request_stats()
+            sampler.stop({
+                "id": profile_id,
+                "trigger": trigger,
+                "method": scope["method"],
+                "route": getattr(scope.get("route"), "path", "unmatched"),
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round(elapsed * 1000, 3),
+                "db_queries": stats.queries if stats else None,
+                "db_ms": round(stats.db_seconds * 1000, 3) if stats else None,
+                "interval_ms": self.interval * 1000,
+                "deploy": DEPLOY_TAG,
+                "started_at": started_at,
+            })
+            self._slots.release()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["sign"]:
+        print(f"{PROFILER_HEADER}: {sign_debug_header()}")
+    else:
+        print(__doc__)
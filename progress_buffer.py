@@ -0,0 +1,224 @@
+# progress_buffer.py
+"""
+Write-behind buffer for progress-only activity updates.
+
+With PROGRESS_WRITE_BEHIND enabled, PUT /activity/{id} requests that only
+change progress are acknowledged after one lookup. Their value is held
+here, and repeated updates to the same activity keep just the latest. A
+worker thread writes the buffer in one transaction every
+PROGRESS_FLUSH_INTERVAL seconds, or sooner once PROGRESS_FLUSH_SIZE
+activities are pending. Flushes go through crud, so stats, library_version
+and the ETags derived from it stay correct.
+
+Reads overlay buffered values, including those of a flush still in
+progress, so a read never falls back to the old row. Readers snapshot the
+buffer before their SELECT, so a flush that commits in between is covered
+too. Synchronous writes to an activity first take its pending value
+(waiting out a flush in progress), so a buffered update can never
+overwrite a later one, and put it back if their own commit fails.
+stop() flushes everything that is left.
+The buffer is per process: until a flush, other workers still read the old
+value. An update acknowledged here is lost only if the process dies before
+the next flush.
+"""
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_WRITE_BEHIND = os.getenv("PROGRESS_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "1.0"))
+PROGRESS_FLUSH_SIZE = int(os.getenv("PROGRESS_FLUSH_SIZE", "500"))
+PROGRESS_SHUTDOWN_ATTEMPTS = 3
+
+
+class ProgressBuffer:
+    def __init__(self, interval: float = PROGRESS_FLUSH_INTERVAL, flush_size: int = PROGRESS_FLUSH_SIZE):
+        self.interval = interval
+        self.flush_size = flush_size
+        # activity id -> (user id, latest progress)
+        self._pending: Dict[int, Tuple[int, int]] = {}
+        # The batch being written, still served to reads until it commits
+        self._flushing: Dict[int, Tuple[int, int]] = {}
+        # user id -> bumped on every buffered update; part of the library ETag
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        # Held for a whole flush, so take() waits for in-flight writes
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._apply: Optional[Callable] = None
+        self.buffered = 0
+        self.merged = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, apply_updates: Callable) -> None:
+        """Start flushing with apply_updates(db, {activity_id: progress})"""
+        if self._thread is None:
+            self._apply = apply_updates
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="progress-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop the worker and write out every pending update"""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        for _ in range(PROGRESS_SHUTDOWN_ATTEMPTS):
+            if not self._pending:
+                return
+            self.flush()
+        if self._pending:
+            logger.error("Shutting down with %d unwritten progress updates", len(self._pending))
+
+    def add(self, activity_id: int, user_id: int, progress: int) -> None:
+        """Buffer the latest progress for an activity"""
+        with self._lock:
+            if activity_id in self._pending:
+                self.merged += 1
+            self._pending[activity_id] = (user_id, progress)
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self.buffered += 1
+            full = len(self._pending) >= self.flush_size
+        if full:
+            self._wake.set()
+
+    def take(self, activity_id: int) -> Optional[int]:
+        """Remove and return the pending progress, before a synchronous write"""
+        with self._flush_lock, self._lock:
+            entry = self._pending.pop(activity_id, None)
+        return entry[1] if entry else None
+
+    @contextmanager
+    def taken(self, activity_ids: Iterable[int]) -> Iterator[Dict[int, int]]:
+        """
+        take() for a synchronous write that may fail: yields {activity_id:
+        progress} of the pending values and puts them back if the block
+        raises (unless a newer update was buffered meanwhile).
+        """
+        with self._flush_lock, self._lock:
+            entries = {}
+            for activity_id in activity_ids:
+                entry = self._pending.pop(activity_id, None)
+                if entry is not None:
+                    entries[activity_id] = entry
+        try:
+            yield {activity_id: progress for activity_id, (_, progress) in entries.items()}
+        except BaseException:
+            if entries:
+                with self._lock:
+                    for activity_id, entry in entries.items():
+                        self._pending.setdefault(activity_id, entry)
+                        # Reads between the take and now saw the old row
+                        self._generations[entry[0]] = self._generations.get(entry[0], 0) + 1
+            raise
+
+    def get(self, activity_id: int) -> Optional[int]:
+        with self._lock:
+            entry = self._pending.get(activity_id)
+            if entry is None:
+                entry = self._flushing.get(activity_id)
+        return entry[1] if entry else None
+
+    def generation(self, user_id: int) -> int:
+        """Changes whenever a buffered update for the user is added"""
+        return self._generations.get(user_id, 0)
+
+    def snapshot(self, user_id: Optional[int] = None) -> Dict[int, int]:
+        """
+        {activity_id: progress} of everything buffered or being flushed (for
+        one user if given); take it before the SELECT that overlay() patches
+        """
+        if not self._pending and not self._flushing:
+            return {}
+        with self._lock:
+            entries = {**self._flushing, **self._pending}
+        return {
+            activity_id: progress for activity_id, (owner, progress) in entries.items()
+            if user_id is None or owner == user_id
+        }
+
+    def overlay(self, activities: Iterable, values: Optional[Dict[int, int]] = None) -> None:
+        """Show buffered progress (or a snapshot() of it) on loaded activities; never flushed from there"""
+        if values is None:
+            values = self.snapshot()
+        if not values:
+            return
+        for activity in activities:
+            pending = values.get(activity.id)
+            if pending is not None:
+                activity.progress = pending
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._pending:
+                self.flush()
+
+    def flush(self) -> int:
+        """Write pending updates in one transaction; returns how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._flushing = batch
+            if not batch:
+                return 0
+            db = SessionLocal()
+            try:
+                self._apply(db, {activity_id: progress for activity_id, (_, progress) in batch.items()})
+            except Exception:
+                db.rollback()
+                self.errors += 1
+                logger.exception("Failed to write %d progress updates; will retry", len(batch))
+                with self._lock:
+                    # Anything buffered meanwhile is newer than the failed batch
+                    for activity_id, entry in batch.items():
+                        self._pending.setdefault(activity_id, entry)
+                    self._flushing = {}
+                return 0
+            finally:
+                db.close()
+            with self._lock:
+                self._flushing = {}
+            self.flushes += 1
+            self.flushed += len(batch)
+            return len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "flushing": len(self._flushing),
+            "buffered": self.buffered,
+            "merged": self.merged,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "errors": self.errors,
+        }
+
+
+buffer = ProgressBuffer()
+
+
+def start(apply_updates: Callable) -> None:
+    if PROGRESS_WRITE_BEHIND:
+        buffer.start(apply_updates)
+
+
+def stop() -> None:
+    buffer.stop()
@@ -0,0 +1,35 @@
+# reconcile_stats.py
+"""
+Rebuild user_reading_stats from reading_activity and report any drift.
+
+    python reconcile_stats.py                 # rebuild everyone
+    python reconcile_stats.py --user-id 42    # rebuild one user
+    python reconcile_stats.py --dry-run       # only report drift
+"""
+import argparse
+import sys
+from database import SessionLocal
+import crud
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, default=None, help="Only rebuild this user")
+    parser.add_argument("--dry-run", action="store_true", help="Report drift without rewriting the table")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        drift = crud.rebuild_user_stats(db, user_id=args.user_id, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    for row in drift:
+        print(f"user {row['user_id']} status {row['status']!r}: stored={row['stored']} actual={row['actual']}")
+    print(f"{len(drift)} drifted row(s){' (dry run)' if args.dry_run else ' fixed'}")
+    # Non-zero exit on drift so schedulers can alert on it
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+# responses.py
+"""
+Fast JSON path for hot read endpoints.
+
+With FAST_JSON_RESPONSE enabled (and orjson installed) the app's default
+response class encodes with orjson instead of the stdlib. Independently of
+that, `page_response` lets an endpoint validate its ORM rows into the output
+schema exactly once and return the encoded response itself, skipping
+FastAPI's dump / re-validate / jsonable_encoder pass over data that came
+straight from the database. Keep `response_model` on those routes so the
+OpenAPI schema stays accurate.
+"""
+import os
+from typing import Iterable, Optional, Type
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
+from pagination import build_page
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+FAST_JSON_RESPONSE = os.getenv("FAST_JSON_RESPONSE", "false").lower() in ("1", "true", "yes")
+
+ResponseClass = ORJSONResponse if FAST_JSON_RESPONSE and orjson is not None else JSONResponse
+
+# orjson encodes datetimes itself; the stdlib encoder needs JSON-ready values
+_DUMP_MODE = "python" if ResponseClass is ORJSONResponse else "json"
+
+
+def dump_models(model: Type[BaseModel], rows: Iterable) -> list:
+    """Validate ORM rows into `model` and dump them to plain dicts"""
+    return [model.model_validate(row).model_dump(mode=_DUMP_MODE) for row in rows]
+
+
+def page_response(
+    model: Type[BaseModel],
+    rows: list,
+    limit: int,
+    headers: Optional[dict] = None
+) -> JSONResponse:
+    """Encoded Page response from rows fetched with limit + 1 (see build_page)"""
+    page = build_page(rows, limit)
+    page["items"] = dump_models(model, page["items"])
+    return ResponseClass(page, headers=headers)
@@ -1,86 +1,335 @@
 # routers/activity.py
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import csv
+import io
+import json
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_async_db, AsyncSessionLocal, SessionLocal
+import activity_feed
 import crud
+import events
+import progress_buffer
 import schemas
+from http_cache import PRIVATE_CACHE_CONTROL, etag_matches, make_etag, not_modified, set_validators
+from pagination import DEFAULT_LIMIT, MAX_LIMIT, decode_cursor
+from responses import page_response
 
 router = APIRouter(prefix="/activity", tags=["activity"])
 
 
-@router.get("/recent", response_model=List[schemas.ActivityOut])
-def get_recent_activity(limit: int = 10, db: Session = Depends(get_db)):
+@router.get("/recent", response_model=List[Union[schemas.ActivityOut, schemas.ActivityTombstone]])
+async def get_recent_activity(
+    response: Response,
+    limit: int = Query(10, ge=1),
+    since: Optional[int] = Query(None, description="Only changes after this X-Feed-Seq value"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Get recent activity across all users (for dashboard)
+
+    Served from the in-memory feed, newest first. Pass the X-Feed-Seq
+    response header back as `since` to get only the changes after it,
+    oldest first, with {"id": ..., "deleted": true} for deleted activities;
+    X-Feed-Seq then points after the last change returned, so keep polling
+    until the list comes back empty. If the feed can no longer tell what
+    changed since then, the full list is returned with X-Feed-Reset: true.
     """
-    from models import Activity
-    activities = db.query(Activity).order_by(
-        Activity.date_added.desc()
-    ).limit(limit).all()
+    feed = activity_feed.feed
+    if feed.warmed and since is not None:
+        changes = feed.changes(since, limit)
+        if changes is not None:
+            activities, seq = changes
+            response.headers["X-Feed-Seq"] = str(seq)
+            return activities
+        response.headers["X-Feed-Reset"] = "true"
+    if feed.warmed and limit <= feed.size:
+        activities, seq = feed.recent(limit)
+        response.headers["X-Feed-Seq"] = str(seq)
+        return activities
+
+    # Larger windows than the feed holds fall back to the database; the seq
+    # is taken first so changes racing the query are delivered again
+    if feed.warmed:
+        response.headers["X-Feed-Seq"] = str(feed.seq)
+    buffered = progress_buffer.buffer.snapshot()
+    activities = await crud.get_recent_activities_async(db, limit)
+    progress_buffer.buffer.overlay(activities, buffered)
     # Convert is_favorite to bool for all activities
     for activity in activities:
         activity.is_favorite = bool(activity.is_favorite)
     return activities
 
 
+STREAM_KEEPALIVE_SECONDS = 15
+STREAM_RETRY_MS = 3000
+
+
+async def _event_stream(subscriber: events.Subscriber):
+    """Relay queued frames to the client, with keep-alive comments when idle"""
+    try:
+        # Sent at once, so headers go out and clients see the stream is open
+        # (and learn the reconnect delay) before the first event
+        yield f"retry: {STREAM_RETRY_MS}\n\n".encode("ascii")
+        while True:
+            try:
+                frame = await asyncio.wait_for(subscriber.queue.get(), STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if frame is None:
+                # Dropped for falling behind; the client should reconnect
+                yield b"event: dropped\ndata: {}\n\n"
+                return
+            yield frame
+    finally:
+        events.broker.unsubscribe(subscriber)
+
+
+@router.get("/stream")
+async def stream_activity(
+    username: Optional[str] = Query(None, description="Only events for this user"),
+):
+    """
+    Server-sent events for activity create/update/delete, optionally per user
+    """
+    user_id = None
+    if username is not None:
+        # A dependency session would stay checked out for the whole stream
+        async with AsyncSessionLocal() as db:
+            user = await crud.get_user_identity_async(db, username)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        user_id = user.id
+
+    subscriber = events.broker.subscribe(user_id)
+    return StreamingResponse(
+        _event_stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/", response_model=schemas.ActivityOut, status_code=status.HTTP_201_CREATED)
 def create_activity(data: schemas.ActivityCreate, db: Session = Depends(get_db)):
     """
     Create a new reading activity for a user
     """
     # Get user
-    user = crud.get_user(db, data.username)
+    user = crud.get_user_identity(db, data.username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    # Get book
-    book = crud.get_book(db, data.book_id)
-    if not book:
+    # Get book (from the book cache when possible)
+    cached_book = crud.get_cached_book(db, data.book_id)
+    if not cached_book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Book not found"
         )
+    _, book = cached_book
     
-    # Check if activity already exists
-    from models import Activity
-    existing = db.query(Activity).filter(
-        Activity.user_id == user.id,
-        Activity.book_id == book.id
-    ).first()
+    # Check if activity already exists (served by the unique user/book index)
+    buffered = progress_buffer.buffer.snapshot(user.id)
+    existing = crud.get_activity_by_book_and_user(db, book["id"], user.id)
     
     if existing:
+        progress_buffer.buffer.overlay([existing], buffered)
         # Return existing activity instead of creating duplicate
         # Convert is_favorite to bool for response
         existing.is_favorite = bool(existing.is_favorite)
         return existing
     
     # Create activity
-    activity = crud.create_activity(db, user, book, data.status, data.progress)
+    try:
+        return crud.create_activity(db, user, book, data.status, data.progress)
+    except IntegrityError:
+        # A concurrent request created it first; return that one
+        db.rollback()
+        activity = crud.get_activity_by_book_and_user(db, book["id"], user.id)
+        if activity is None:
+            # The conflict was not a duplicate activity (e.g. the row was
+            # deleted again meanwhile); let the client retry
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Activity could not be created, please retry"
+            )
     # Convert is_favorite to bool for response
     activity.is_favorite = bool(activity.is_favorite)
     return activity
 
 
-@router.get("/{username}", response_model=List[schemas.ActivityOut])
-def get_user_library(username: str, db: Session = Depends(get_db)):
+@router.post("/bulk", response_model=List[schemas.ActivityBulkResult])
+def bulk_create_activities(data: schemas.ActivityBulkCreate, db: Session = Depends(get_db)):
     """
-    Get all reading activities (library) for a specific user
+    Add many books to a user's library in one request
     """
-    user = crud.get_user(db, username)
+    user = crud.get_user_identity(db, data.username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    activities = crud.get_user_activities(db, user)
-    # Convert is_favorite to bool for all activities
-    for activity in activities:
-        activity.is_favorite = bool(activity.is_favorite)
-    return activities
+    try:
+        return crud.bulk_create_activities(db, user, data.items)
+    except IntegrityError:
+        # A concurrent request added some of these books first; retry so
+        # they are reported as existing
+        db.rollback()
+        return crud.bulk_create_activities(db, user, data.items)
+
+
+@router.put("/bulk", response_model=List[schemas.ActivityBulkResult])
+def bulk_update_activities(data: schemas.ActivityBulkUpdate, db: Session = Depends(get_db)):
+    """
+    Update many of a user's activities (progress, status, favorite) in one request
+    """
+    user = crud.get_user_identity(db, data.username)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return crud.bulk_update_activities(db, user, data.items)
+
+
+@router.get("/{username}", response_model=schemas.Page[schemas.ActivityOut])
+async def get_user_library(
+    username: str,
+    request: Request,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor from a previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get reading activities (library) for a specific user, one page at a time
+
+    Every activity write bumps the user's library_version (and buffered
+    progress updates the buffer's generation), so a poll whose ETag still
+    matches costs one primary-key lookup.
+    """
+    user = await crud.get_user_identity_async(db, username)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    after_id = decode_cursor(after)
+    version = await crud.get_library_version_async(db, user.id)
+    etag = make_etag("library", user.id, version, progress_buffer.buffer.generation(user.id), limit, after_id)
+    if etag_matches(request, etag):
+        return not_modified(etag, PRIVATE_CACHE_CONTROL)
+
+    # Taken before the SELECT: a flush committing in between is still covered
+    buffered = progress_buffer.buffer.snapshot(user.id)
+    activities = await crud.get_user_activities_async(db, user, limit=limit + 1, after_id=after_id)
+    progress_buffer.buffer.overlay(activities, buffered)
+    # Validated once here (is_favorite is coerced to bool by the schema)
+    response = page_response(schemas.ActivityOut, activities, limit)
+    set_validators(response, etag, PRIVATE_CACHE_CONTROL)
+    return response
+
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_CSV_COLUMNS = [
+    "id", "status", "progress", "is_favorite", "date_added",
+    "book_id", "title", "author", "description", "cover_image", "category", "external_id",
+]
+
+
+def _export_rows(user_id: int):
+    """
+    Yield a user's library rows from a session owned by the generator.
+
+    The request-scoped session may be closed before a streaming response
+    finishes, so the export opens (and closes) its own.
+    """
+    db = SessionLocal()
+    try:
+        yield from crud.iter_user_library(db, user_id, batch_size=EXPORT_BATCH_SIZE)
+    finally:
+        db.close()
+
+
+def _ndjson_lines(user_id: int):
+    """Encode each library row as one JSON object per line (ActivityOut shape)"""
+    for row in _export_rows(user_id):
+        pending = progress_buffer.buffer.get(row["id"])
+        record = {
+            "id": row["id"],
+            "status": row["status"],
+            "progress": row["progress"] if pending is None else pending,
+            "is_favorite": bool(row["is_favorite"]),
+            "date_added": row["date_added"].isoformat() if row["date_added"] else None,
+            "book": {
+                "id": row["book_id"],
+                "title": row["title"],
+                "author": row["author"],
+                "description": row["description"],
+                "cover_image": row["cover_image"],
+                "category": row["category"],
+                "external_id": row["external_id"],
+            },
+        }
+        yield json.dumps(record) + "\n"
+
+
+def _csv_lines(user_id: int):
+    """Encode library rows as CSV, flushing one chunk per row"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_COLUMNS)
+    for row in _export_rows(user_id):
+        values = dict(row)
+        values["is_favorite"] = bool(values["is_favorite"])
+        pending = progress_buffer.buffer.get(values["id"])
+        if pending is not None:
+            values["progress"] = pending
+        writer.writerow([values[column] for column in EXPORT_CSV_COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty library
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get("/{username}/export")
+def export_user_library(
+    username: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream a user's whole library as NDJSON or CSV without buffering it in memory
+    """
+    user = crud.get_user_identity(db, username)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    if format == "csv":
+        body, media_type = _csv_lines(user.id), "text/csv"
+    else:
+        body, media_type = _ndjson_lines(user.id), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{username}-library.{format}"'}
+    )
 
 
 @router.get("/book/{book_id}/user/{username}", response_model=schemas.ActivityOut)
@@ -88,19 +337,21 @@ def get_book_activity(book_id: int, username: str, db: Session = Depends(get_db)
     """
     Get activity for a specific book and user
     """
-    user = crud.get_user(db, username)
+    user = crud.get_user_identity(db, username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
+    buffered = progress_buffer.buffer.snapshot(user.id)
     activity = crud.get_activity_by_book_and_user(db, book_id, user.id)
     if not activity:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Activity not found for this book"
         )
+    progress_buffer.buffer.overlay([activity], buffered)
     # Convert is_favorite to bool
     activity.is_favorite = bool(activity.is_favorite)
     return activity
@@ -114,7 +365,24 @@ def update_activity(
 ):
     """
     Update an activity (progress, status, favorite)
+
+    With write-behind enabled, progress-only updates are buffered and
+    written in batches.
     """
+    if (
+        progress_buffer.buffer.running
+        and update_data.progress is not None
+        and update_data.status is None
+        and update_data.is_favorite is None
+    ):
+        activity = crud.buffer_progress_update(db, activity_id, update_data.progress)
+        if not activity:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Activity not found"
+            )
+        return activity
+
     activity = crud.update_activity(
         db,
         activity_id,
@@ -139,15 +407,9 @@ def delete_activity(activity_id: int, db: Session = Depends(get_db)):
     """
     Remove a book from user's library (delete activity)
     """
-    from models import Activity
-    activity = db.query(Activity).filter(Activity.id == activity_id).first()
-    
-    if not activity:
+    if not crud.delete_activity(db, activity_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Activity not found"
         )
-    
-    db.delete(activity)
-    db.commit()
     return None
\ No newline at end of file
@@ -1,8 +1,10 @@
 # routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 import crud
+import hashing
+import security
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
@@ -21,14 +23,12 @@ class TokenResponse(BaseModel):
 
 
 @router.post("/token", response_model=TokenResponse)
-def login(credentials: TokenRequest, db: Session = Depends(get_db)):
+async def login(credentials: TokenRequest, db: AsyncSession = Depends(get_async_db)):
     """
-    Authenticate user and return access token
-    
-    For now, this returns a simple token. In production, use JWT tokens.
+    Authenticate user and return a signed access token (JWT)
     """
     # Get user by username
-    user = crud.get_user_by_username(db, credentials.username)
+    user = await crud.get_user_by_username_async(db, credentials.username)
     
     if not user:
         raise HTTPException(
@@ -37,28 +37,27 @@ def login(credentials: TokenRequest, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Verify password
-    if not crud.verify_password(credentials.password, user.password_hash):
+    # Verify password on the hashing pool (CPU-bound, keep it off the event loop)
+    if not await hashing.verify_password_async(credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Return token (simplified - in production use JWT)
     return TokenResponse(
-        access_token=f"user_{user.id}_{user.username}",
+        access_token=security.create_access_token(user.id, user.username),
         token_type="bearer"
     )
 
 
 @router.post("/signup", response_model=TokenResponse)
-def signup(credentials: TokenRequest, db: Session = Depends(get_db)):
+async def signup(credentials: TokenRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Alternative signup endpoint that returns token immediately
     """
     # Check if user already exists
-    existing = crud.get_user_by_username(db, credentials.username)
+    existing = await crud.get_user_by_username_async(db, credentials.username)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -66,15 +65,15 @@ def signup(credentials: TokenRequest, db: Session = Depends(get_db)):
         )
     
     # Create user
-    user = crud.create_user(
+    user = await crud.create_user_async(
         db,
         username=credentials.username,
         email=None,
-        password=credentials.password
+        password_hash=await hashing.hash_password_async(credentials.password)
     )
     
     # Return token immediately
     return TokenResponse(
-        access_token=f"user_{user.id}_{user.username}",
+        access_token=security.create_access_token(user.id, user.username),
         token_type="bearer"
     )
\ No newline at end of file
@@ -1,25 +1,57 @@
 # routers/books.py
-from typing import List
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+import os
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_async_db
 import crud
 import schemas
 import google_books
+import catalogue_sync
+from http_cache import BOOK_CACHE_CONTROL, LIST_CACHE_CONTROL, etag_matches, make_etag, not_modified, set_validators
+from pagination import DEFAULT_LIMIT, MAX_LIMIT, decode_cursor
+from responses import ResponseClass, page_response
 
 router = APIRouter(prefix="/books", tags=["books"])
 
+# Hybrid search only goes to Google when the catalogue has fewer hits than this
+HYBRID_MIN_LOCAL_HITS = int(os.getenv("HYBRID_MIN_LOCAL_HITS", "3"))
+
 
 @router.get("/search")
-def search_books(
+async def search_books(
     q: str = Query(..., min_length=1, description="Search query"), 
-    max_results: int = Query(8, ge=1, le=40, description="Maximum results to return")
+    max_results: int = Query(8, ge=1, le=40, description="Maximum results to return"),
+    source: str = Query("remote", pattern="^(local|remote|hybrid)$", description="local, remote or hybrid"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Search for books using Google Books API
+    Search for books in the local catalogue, Google Books (cached), or both
+
+    Hybrid answers from the catalogue and only asks Google when there are too
+    few local hits; local results carry their catalogue `id`.
     """
     try:
-        return google_books.search_google_books(q, max_results=max_results)
+        if source == "remote":
+            remote = await google_books.cached_search(q, max_results=max_results)
+            # Persist into the catalogue off the request path
+            catalogue_sync.enqueue(remote)
+            return remote
+
+        local = [
+            schemas.BookOut.model_validate(book).model_dump()
+            for book in await crud.search_books_local_async(db, q, max_results)
+        ]
+        if source == "local" or len(local) >= min(HYBRID_MIN_LOCAL_HITS, max_results):
+            return local
+
+        remote = await google_books.cached_search(q, max_results=max_results)
+        catalogue_sync.enqueue(remote)
+        known = {book["external_id"] for book in local if book["external_id"]}
+        extra = [book for book in remote if book["external_id"] not in known]
+        return (local + extra)[:max_results]
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -27,26 +59,49 @@ def search_books(
         )
 
 
-@router.get("/", response_model=List[schemas.BookOut])
-def list_books(db: Session = Depends(get_db)):
+@router.get("/", response_model=schemas.Page[schemas.BookOut])
+def list_books(
+    request: Request,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor from a previous page"),
+    db: Session = Depends(get_db)
+):
     """
-    Get all books in the database
+    Get books in the database, one page at a time
+
+    The ETag covers the (id, version) pairs of the page, so a poll that
+    matches is answered from an index-only query.
     """
-    return crud.list_books(db)
+    after_id = decode_cursor(after)
+    versions = crud.list_book_versions(db, limit=limit + 1, after_id=after_id)
+    etag = make_etag("books", limit, *(f"{book_id}.{version}" for book_id, version in versions))
+    if etag_matches(request, etag):
+        return not_modified(etag, LIST_CACHE_CONTROL)
+
+    books = crud.list_books(db, limit=limit + 1, after_id=after_id)
+    response = page_response(schemas.BookOut, books, limit)
+    set_validators(response, etag, LIST_CACHE_CONTROL)
+    return response
 
 
-@router.get("/my-books", response_model=List[schemas.BookOut])
-def get_my_books(username: str = Query(..., description="Username"), db: Session = Depends(get_db)):
+@router.get("/my-books", response_model=schemas.Page[schemas.BookOut])
+def get_my_books(
+    username: str = Query(..., description="Username"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor from a previous page"),
+    db: Session = Depends(get_db)
+):
     """
-    Get all books for a specific user (through activities)
+    Get books for a specific user (through activities), one page at a time
     """
-    user = crud.get_user_by_username(db, username)
+    user = crud.get_user_identity(db, username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return crud.get_books_for_user(db, user.id)
+    books = crud.get_books_for_user(db, user.id, limit=limit + 1, after_id=decode_cursor(after))
+    return page_response(schemas.BookOut, books, limit)
 
 
 @router.post("/", response_model=schemas.BookOut, status_code=status.HTTP_201_CREATED)
@@ -56,22 +111,48 @@ def create_book(book: schemas.BookCreate, db: Session = Depends(get_db)):
     """
     # Check if book with same external_id already exists
     if book.external_id:
-        existing = crud.get_book_by_google_id(db, book.external_id)
+        existing = crud.get_cached_book_by_external_id(db, book.external_id)
         if existing:
-            return existing
+            return ResponseClass(existing[1], status_code=status.HTTP_201_CREATED)
     
     return crud.create_book(db, book)
 
 
+@router.post("/bulk", response_model=schemas.BulkBookResult)
+def bulk_create_books(books: List[schemas.BookCreate], db: Session = Depends(get_db)):
+    """
+    Import many books at once, skipping ones whose external_id already exists
+    """
+    try:
+        created, existing = crud.bulk_create_books(db, books)
+    except IntegrityError:
+        # A concurrent import inserted some of the same external_ids; retry
+        # so they are reported as existing
+        db.rollback()
+        created, existing = crud.bulk_create_books(db, books)
+    return {"created": created, "existing": existing}
+
+
 @router.get("/{book_id}", response_model=schemas.BookOut)
-def get_book(book_id: int, db: Session = Depends(get_db)):
+async def get_book(
+    book_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Get a specific book by ID
     """
-    book = crud.get_book(db, book_id)
-    if not book:
+    cached = await crud.get_cached_book_async(db, book_id)
+    if not cached:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Book not found"
         )
-    return book
\ No newline at end of file
+    version, book = cached
+    etag = make_etag("book", book_id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag, BOOK_CACHE_CONTROL)
+    # Already a serialized BookOut: encode it as is
+    response = ResponseClass(book)
+    set_validators(response, etag, BOOK_CACHE_CONTROL)
+    return response
\ No newline at end of file
@@ -1,22 +1,27 @@
 # routers/users.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_async_db
 import crud
+import hashing
 import schemas
+import security
 from models import User
+from http_cache import PRIVATE_CACHE_CONTROL, etag_matches, make_etag, not_modified, set_validators
+from pagination import DEFAULT_LIMIT, MAX_LIMIT, build_page, decode_cursor
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.post("/", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-def create_user(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_user(user_in: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new user account
     """
     # Check if username already exists
-    existing = crud.get_user_by_username(db, user_in.username)
+    existing = await crud.get_user_by_username_async(db, user_in.username)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -25,50 +30,78 @@ def create_user(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
     
     # Check if email already exists (if provided)
     if user_in.email:
-        existing_email = crud.get_user_by_email(db, user_in.email)
+        existing_email = await crud.get_user_by_email_async(db, user_in.email)
         if existing_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already exists"
             )
 
-    # Create the user
-    return crud.create_user(
+    # Create the user (password hashed on the hashing pool)
+    return await crud.create_user_async(
         db,
         username=user_in.username,
         email=user_in.email,
-        password=user_in.password,
+        password_hash=await hashing.hash_password_async(user_in.password),
         full_name=user_in.full_name
     )
 
 
 @router.get("/me", response_model=schemas.UserOut)
-def get_current_user(db: Session = Depends(get_db)):
+async def get_current_user(
+    current_user: schemas.CurrentUser = Depends(security.get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Get currently authenticated user
-    
-    This is a placeholder - implement proper JWT token validation here
+    Get currently authenticated user (from the bearer token)
+
+    Served from the identity cache, so only a cold cache reads the users
+    table. A username now held by a different account (the token's user was
+    deleted and the name reused) does not match the token's id.
     """
-    raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Not authenticated"
-    )
+    user = await crud.get_user_identity_async(db, current_user.username)
+    if not user or user.id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
 
 
 @router.get("/{username}", response_model=schemas.UserOut)
-def get_user(username: str, db: Session = Depends(get_db)):
+def get_user(username: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Get user by username
     """
-    user = crud.get_user_by_username(db, username)
+    user = crud.get_user_identity(db, username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    # Profiles carry no version counter; hash the (usually cached) identity
+    etag = make_etag("user", *user.model_dump().values())
+    if etag_matches(request, etag):
+        return not_modified(etag, PRIVATE_CACHE_CONTROL)
+    set_validators(response, etag, PRIVATE_CACHE_CONTROL)
     return user
 
 
+@router.get("/{username}/stats", response_model=schemas.UserStatsOut)
+def get_user_stats(username: str, db: Session = Depends(get_db)):
+    """
+    Get reading totals for a user (served from the maintained aggregates)
+    """
+    user = crud.get_user_identity(db, username)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return crud.get_user_stats(db, user.id)
+
+
 @router.put("/{user_id}", response_model=schemas.UserOut)
 def update_user(
     user_id: int, 
@@ -87,9 +120,14 @@ def update_user(
     return user
 
 
-@router.get("/", response_model=List[schemas.UserOut])
-def list_users(db: Session = Depends(get_db)):
+@router.get("/", response_model=schemas.Page[schemas.UserOut])
+def list_users(
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor from a previous page"),
+    db: Session = Depends(get_db)
+):
     """
-    List all users (for admin purposes)
+    List users one page at a time (for admin purposes)
     """
-    return crud.get_all_users(db)
\ No newline at end of file
+    users = crud.get_all_users(db, limit=limit + 1, after_id=decode_cursor(after))
+    return build_page(users, limit)
\ No newline at end of file
@@ -1,6 +1,8 @@
 # schemas.py
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Generic, List, Literal, Optional, TypeVar
+
+T = TypeVar("T")
 
 # User
 class UserCreate(BaseModel):
@@ -13,6 +15,7 @@ class UserUpdate(BaseModel):
     username: Optional[str] = None
     email: Optional[str] = None
     password: Optional[str] = None
+    full_name: Optional[str] = None
 
 class UserOut(BaseModel):
     id: int
@@ -23,6 +26,18 @@ class UserOut(BaseModel):
     class Config:
         from_attributes = True  # Updated from orm_mode in Pydantic v2
 
+class UserStatsOut(BaseModel):
+    """Reading totals for one user"""
+    total: int = 0
+    favorites: int = 0
+    average_progress: float = 0.0
+    by_status: Dict[str, int] = {}
+
+class CurrentUser(BaseModel):
+    """Caller identity decoded from an access token"""
+    id: int
+    username: str
+
 # Book
 class BookBase(BaseModel):
     title: str
@@ -46,6 +61,10 @@ class BookOut(BookBase):
     class Config:
         from_attributes = True
 
+class BulkBookResult(BaseModel):
+    created: List[int]
+    existing: List[int]
+
 # Activity
 class ActivityCreate(BaseModel):
     username: str
@@ -58,6 +77,28 @@ class ActivityUpdate(BaseModel):
     progress: Optional[int] = None
     is_favorite: Optional[bool] = None
 
+class ActivityBulkItem(BaseModel):
+    book_id: int
+    status: str
+    progress: int = 0
+
+class ActivityBulkCreate(BaseModel):
+    username: str
+    items: List[ActivityBulkItem]
+
+class ActivityPatch(ActivityUpdate):
+    id: int
+
+class ActivityBulkUpdate(BaseModel):
+    username: str
+    items: List[ActivityPatch]
+
+class ActivityBulkResult(BaseModel):
+    """Per-item outcome of a bulk activity request"""
+    outcome: str  # created, exists, updated, book_not_found, not_found, forbidden
+    activity_id: Optional[int] = None
+    book_id: Optional[int] = None
+
 class ActivityOut(BaseModel):
     id: int
     status: str
@@ -66,4 +107,15 @@ class ActivityOut(BaseModel):
     book: BookOut
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ActivityTombstone(BaseModel):
+    """Marks a deleted activity in GET /activity/recent?since= results"""
+    id: int
+    deleted: Literal[True]
+
+# Pagination
+class Page(BaseModel, Generic[T]):
+    """Keyset-paginated list; pass next_cursor back as `after` for the next page"""
+    items: List[T]
+    next_cursor: Optional[str] = None
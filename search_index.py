@@ -0,0 +1,118 @@
+# search_index.py
+"""
+Local full-text search over the books catalogue.
+
+On SQLite the index is an FTS5 external-content table kept in sync with
+`books` by triggers, so every insert path (single or bulk) is
+covered without application code. Other databases fall back to a LIKE scan
+until a native backend (e.g. Postgres tsvector) is plugged in through
+SEARCH_BACKEND.
+"""
+import os
+import re
+from typing import Optional
+from sqlalchemy import column, false, or_, select, table, text
+from sqlalchemy.engine import Engine
+from models import Book
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "").strip().lower()
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+class LikeSearchBackend:
+    """Portable fallback: case-insensitive substring match on every term"""
+
+    name = "like"
+
+    def ensure(self, engine: Engine) -> None:
+        pass
+
+    def statement(self, q: str, limit: int):
+        stmt = select(Book)
+        for token in _TOKEN.findall(q):
+            pattern = f"%{token}%"
+            stmt = stmt.where(or_(
+                Book.title.ilike(pattern),
+                Book.author.ilike(pattern),
+                Book.description.ilike(pattern),
+                Book.category.ilike(pattern),
+            ))
+        return stmt.order_by(Book.id).limit(limit)
+
+
+class SQLiteFTSBackend:
+    """SQLite FTS5 index over title, author, description and category"""
+
+    name = "fts5"
+    fts = table("books_fts", column("rowid"))
+
+    SCHEMA = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5("
+        "title, author, description, category, content='books', content_rowid='id')",
+        "CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN "
+        "INSERT INTO books_fts(rowid, title, author, description, category) "
+        "VALUES (new.id, new.title, new.author, new.description, new.category); END",
+        "CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN "
+        "INSERT INTO books_fts(books_fts, rowid, title, author, description, category) "
+        "VALUES ('delete', old.id, old.title, old.author, old.description, old.category); END",
+        "CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE ON books BEGIN "
+        "INSERT INTO books_fts(books_fts, rowid, title, author, description, category) "
+        "VALUES ('delete', old.id, old.title, old.author, old.description, old.category); "
+        "INSERT INTO books_fts(rowid, title, author, description, category) "
+        "VALUES (new.id, new.title, new.author, new.description, new.category); END",
+    ]
+
+    def ensure(self, engine: Engine) -> None:
+        """Create the index and triggers, building it from existing rows the first time"""
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'")
+            ).first()
+            for statement in self.SCHEMA:
+                conn.exec_driver_sql(statement)
+            if not exists:
+                conn.exec_driver_sql("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+
+    @staticmethod
+    def match_query(q: str) -> Optional[str]:
+        """Turn free text into an FTS5 query: every term must match, as a prefix"""
+        tokens = _TOKEN.findall(q)
+        if not tokens:
+            return None
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    def statement(self, q: str, limit: int):
+        match = self.match_query(q)
+        if match is None:
+            return select(Book).where(false())
+        return (
+            select(Book)
+            .join(self.fts, self.fts.c.rowid == Book.id)
+            .where(text("books_fts MATCH :match").bindparams(match=match))
+            .order_by(text("bm25(books_fts)"))
+            .limit(limit)
+        )
+
+
+BACKENDS = {
+    LikeSearchBackend.name: LikeSearchBackend,
+    SQLiteFTSBackend.name: SQLiteFTSBackend,
+}
+
+backend = None
+
+
+def ensure_index(engine: Engine) -> None:
+    """Pick the backend for this database and prepare its index (called on startup)"""
+    global backend
+    name = SEARCH_BACKEND or ("fts5" if engine.dialect.name == "sqlite" else "like")
+    backend = BACKENDS[name]()
+    backend.ensure(engine)
+
+
+def search_statement(q: str, limit: int):
+    """SELECT of the best matching books, for either a sync or async session"""
+    if backend is None:
+        raise RuntimeError("search_index.ensure_index() has not been called")
+    return backend.statement(q, limit)
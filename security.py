@@ -0,0 +1,82 @@
+# security.py
+import logging
+import os
+import secrets
+import time
+from typing import Optional
+import jwt
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from cache import TTLCache
+import schemas
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+
+SECRET_KEY = os.getenv("SECRET_KEY", "").strip()
+if not SECRET_KEY:
+    # Tokens will not survive a restart or be shared between workers
+    logger.warning("SECRET_KEY is not set; using a random per-process signing key")
+    SECRET_KEY = secrets.token_urlsafe(32)
+
+# Decoded claims for recently seen tokens, so repeat requests skip the HMAC check
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def create_access_token(user_id: int, username: str) -> str:
+    """Issue a signed access token for a user"""
+    now = int(time.time())
+    payload = {
+        "sub": str(user_id),
+        "username": username,
+        "iat": now,
+        "exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_access_token(token: str) -> Optional[schemas.CurrentUser]:
+    """
+    Return the caller encoded in a token, or None if it is invalid or expired.
+
+    Valid tokens are cached until the earlier of TOKEN_CACHE_TTL and their own
+    expiry, so the cache never extends a token's lifetime.
+    """
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp", "sub"]})
+        user = schemas.CurrentUser(id=int(claims["sub"]), username=claims["username"])
+    except (jwt.InvalidTokenError, KeyError, ValueError):
+        return None
+
+    remaining = claims["exp"] - time.time()
+    if remaining > 0:
+        token_cache.set(token, user, ttl=min(TOKEN_CACHE_TTL, remaining))
+    return user
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> schemas.CurrentUser:
+    """Dependency resolving the authenticated caller from the bearer token"""
+    user = decode_access_token(credentials.credentials) if credentials else None
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
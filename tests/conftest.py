@@ -0,0 +1,80 @@
+# tests/conftest.py
+"""
+Test configuration. The environment is set before any app module is
+imported, so every test runs against a throwaway SQLite file and the
+local Google Books stub (bench/stub_google.py) instead of the real API.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="readify-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["SECRET_KEY"] = "test-secret-key-for-the-readify-suite"
+os.environ["GOOGLE_BOOKS_API_KEY"] = ""
+os.environ["GOOGLE_BOOKS_BASE_URL"] = "http://stub-google/books/v1/volumes"
+os.environ["STUB_GOOGLE_LATENCY_MS"] = "50"
+os.environ["PASSWORD_HASH_ROUNDS"] = "0"
+os.environ["HASH_WORKERS"] = "1"
+os.environ["PROFILER_ENABLED"] = "false"
+os.environ["IDENTITY_CACHE_BACKEND"] = "memory"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from bench import seed, stub_google
+from database import engine
+import google_books
+from main import app
+
+
+def stub_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url="http://stub-google", transport=httpx.ASGITransport(app=stub_google.app)
+    )
+
+
+@pytest.fixture(scope="session")
+def seeded_db():
+    """bench users, books and activities, with planner statistics gathered"""
+    counts = seed.seed(users=20, books=300, activities_per_user=60)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return counts
+
+
+@pytest.fixture
+def stub_upstream():
+    """Route google_books to the stub with an empty search cache"""
+    google_books.search_cache.clear()
+    google_books._client = stub_client()
+    yield stub_google
+    client, google_books._client = google_books._client, None
+    if client is not None:
+        asyncio.run(client.aclose())
+    google_books.search_cache.clear()
+
+
+@pytest.fixture
+def client(stub_upstream):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+_users = iter(range(1, 1_000_000))
+
+
+@pytest.fixture
+def make_user(client):
+    """Sign up a fresh user and return (username, auth headers)"""
+    def make():
+        username = f"tester{next(_users)}"
+        response = client.post("/auth/signup", json={"username": username, "password": "correct horse battery"})
+        assert response.status_code == 200, response.text
+        return username, {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return make
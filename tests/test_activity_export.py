@@ -0,0 +1,89 @@
+# tests/test_activity_export.py
+import csv
+import io
+import json
+
+import progress_buffer
+from routers import activity as activity_router
+
+LIBRARY_SIZE = 20
+
+
+def make_library(client, username, size=LIBRARY_SIZE):
+    response = client.post("/activity/bulk", json={
+        "username": username,
+        "items": [
+            {"book_id": book_id, "status": "reading" if book_id % 2 else "wishlist", "progress": book_id * 3}
+            for book_id in range(1, size + 1)
+        ],
+    })
+    assert response.status_code == 200, response.text
+    return [item["activity_id"] for item in response.json()]
+
+
+def test_ndjson_export_streams_the_library_across_batches(client, make_user, seeded_db, monkeypatch):
+    username, _ = make_user()
+    ids = make_library(client, username)
+    monkeypatch.setattr(activity_router, "EXPORT_BATCH_SIZE", 7)
+
+    response = client.get(f"/activity/{username}/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == f'attachment; filename="{username}-library.ndjson"'
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    library = client.get(f"/activity/{username}", params={"limit": 100}).json()["items"]
+    assert [record["id"] for record in records] == ids
+    for record, item in zip(records, library):
+        # ActivityOut plus date_added
+        assert record.keys() == item.keys() | {"date_added"}
+        assert record["book"] == item["book"]
+        assert (record["status"], record["progress"], record["is_favorite"]) == (
+            item["status"], item["progress"], item["is_favorite"]
+        )
+
+
+def test_csv_export_has_a_header_and_one_row_per_activity(client, make_user, seeded_db):
+    username, _ = make_user()
+    ids = make_library(client, username)
+
+    response = client.get(f"/activity/{username}/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0].keys()) == activity_router.EXPORT_CSV_COLUMNS
+    assert [int(row["id"]) for row in rows] == ids
+    assert [int(row["book_id"]) for row in rows] == list(range(1, LIBRARY_SIZE + 1))
+    assert rows[4]["status"] == "reading" and rows[4]["progress"] == "15" and rows[4]["is_favorite"] == "False"
+
+
+def test_empty_library_exports_nothing_but_the_csv_header(client, make_user):
+    username, _ = make_user()
+
+    assert client.get(f"/activity/{username}/export").text == ""
+    response = client.get(f"/activity/{username}/export", params={"format": "csv"})
+    assert response.text.splitlines() == [",".join(activity_router.EXPORT_CSV_COLUMNS)]
+
+
+def test_export_includes_buffered_progress(client, make_user, seeded_db):
+    username, _ = make_user()
+    ids = make_library(client, username, size=3)
+    user_id = client.get(f"/users/{username}").json()["id"]
+
+    progress_buffer.buffer.add(ids[1], user_id=user_id, progress=99)
+    try:
+        records = [json.loads(line) for line in client.get(f"/activity/{username}/export").text.splitlines()]
+        rows = list(csv.DictReader(io.StringIO(
+            client.get(f"/activity/{username}/export", params={"format": "csv"}).text
+        )))
+    finally:
+        progress_buffer.buffer.take(ids[1])
+    assert [record["progress"] for record in records] == [3, 99, 9]
+    assert [row["progress"] for row in rows] == ["3", "99", "9"]
+
+
+def test_export_rejects_unknown_users_and_formats(client, make_user):
+    username, _ = make_user()
+    assert client.get("/activity/nobody-here/export").status_code == 404
+    assert client.get(f"/activity/{username}/export", params={"format": "xml"}).status_code == 422
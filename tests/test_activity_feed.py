@@ -0,0 +1,73 @@
+# tests/test_activity_feed.py
+from activity_feed import ActivityFeed
+
+
+def activity(activity_id, progress=0):
+    return {"id": activity_id, "progress": progress}
+
+
+def test_since_returns_changes_in_order_and_resumes_after_limit():
+    feed = ActivityFeed(size=50)
+    feed.warm([])
+    for activity_id in range(1, 16):
+        feed.add(activity(activity_id))
+
+    first, seq = feed.changes(0, 10)
+    assert [item["id"] for item in first] == list(range(1, 11))
+    second, seq = feed.changes(seq, 10)
+    assert [item["id"] for item in second] == list(range(11, 16))
+    assert feed.changes(seq, 10) == ([], seq)
+
+
+def test_updates_move_to_the_end_of_the_change_log():
+    feed = ActivityFeed(size=50)
+    for activity_id in (1, 2, 3):
+        feed.add(activity(activity_id))
+    _, seq = feed.recent(10)
+    feed.update(activity(1, progress=40))
+
+    items, _ = feed.changes(seq, 10)
+    assert items == [activity(1, progress=40)]
+    # The feed itself keeps ordering by when the activity was added
+    assert [item["id"] for item in feed.recent(10)[0]] == [3, 2, 1]
+
+
+def test_deletions_leave_tombstones():
+    feed = ActivityFeed(size=50)
+    for activity_id in (1, 2):
+        feed.add(activity(activity_id))
+    _, seq = feed.recent(10)
+    feed.remove(1)
+
+    assert feed.changes(seq, 10)[0] == [{"id": 1, "deleted": True}]
+    assert [item["id"] for item in feed.recent(10)[0]] == [2]
+
+
+def test_since_older_than_the_log_asks_for_a_reset():
+    feed = ActivityFeed(size=5, log_size=10)
+    for activity_id in range(1, 30):
+        feed.add(activity(activity_id))
+    assert feed.changes(1, 10) is None
+    assert feed.changes(feed.seq + 5, 10) is None
+    assert feed.changes(feed.seq - 3, 10)[0] == [activity(27), activity(28), activity(29)]
+
+
+def test_recent_route_reports_deletions_to_since_pollers(client, make_user, seeded_db):
+    username, _ = make_user()
+    seq = client.get("/activity/recent").headers["X-Feed-Seq"]
+    created = [
+        client.post("/activity/", json={"username": username, "book_id": book_id, "status": "reading"}).json()
+        for book_id in (10, 11, 12)
+    ]
+    assert client.delete(f"/activity/{created[0]['id']}").status_code == 204
+
+    response = client.get("/activity/recent", params={"since": seq, "limit": 2})
+    assert [item["id"] for item in response.json()] == [created[1]["id"], created[2]["id"]]
+    assert "user_id" not in response.json()[0]
+
+    response = client.get("/activity/recent", params={"since": response.headers["X-Feed-Seq"]})
+    assert response.json() == [{"id": created[0]["id"], "deleted": True}]
+
+    response = client.get("/activity/recent", params={"since": 10 ** 9})
+    assert response.headers["X-Feed-Reset"] == "true"
+    assert "deleted" not in response.json()[0]
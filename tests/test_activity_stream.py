@@ -0,0 +1,38 @@
+# tests/test_activity_stream.py
+import asyncio
+
+import crud
+import events
+from bench.sse_fanout import StreamClient
+from database import async_engine
+from main import app
+
+
+def test_stream_opens_at_once_without_holding_a_connection(client, make_user):
+    username, _ = make_user()
+    crud.invalidate_user_identity(username)
+
+    async def run():
+        stream = StreamClient(app, username)
+        stream.start()
+        await asyncio.wait_for(stream.connected.wait(), 5)
+        state = (stream.task.done(), async_engine.pool.checkedout(), events.broker.subscriber_count)
+        await stream.close()
+        return stream, state
+
+    stream, (finished, checked_out, subscribers) = asyncio.run(run())
+    assert stream.status == 200
+    assert not finished
+    assert checked_out == 0
+    assert subscribers == 1
+    assert events.broker.subscriber_count == 0
+
+
+def test_stream_for_unknown_user_is_404(client):
+    async def run():
+        stream = StreamClient(app, "nobody-here")
+        stream.start()
+        await asyncio.wait_for(stream.task, 5)
+        return stream
+
+    assert asyncio.run(run()).status == 404
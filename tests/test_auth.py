@@ -0,0 +1,96 @@
+# tests/test_auth.py
+import base64
+import json
+import threading
+import time
+
+import jwt
+
+import hashing
+import security
+from test_query_counts import count_queries
+
+PASSWORD = "correct horse battery"
+
+
+def test_login_is_shed_with_503_while_the_hashing_queue_is_full(client, make_user, monkeypatch):
+    username, _ = make_user()
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(hashing, "_slots", slots)
+
+    slots.acquire()  # the only slot is taken
+    response = client.post("/auth/token", json={"username": username, "password": PASSWORD})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+    slots.release()
+    response = client.post("/auth/token", json={"username": username, "password": PASSWORD})
+    assert response.status_code == 200
+
+
+def token_for(claims: dict, key: str = security.SECRET_KEY) -> str:
+    return jwt.encode(claims, key, algorithm=security.ALGORITHM)
+
+
+def me(client, token: str):
+    return client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+
+
+def test_me_is_served_from_the_caches_after_the_first_request(client, make_user):
+    username, headers = make_user()
+    assert client.get("/users/me", headers=headers).json()["username"] == username
+
+    with count_queries() as executed:
+        response = client.get("/users/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["username"] == username
+    assert executed == []
+
+
+def test_expired_token_is_rejected(client, make_user):
+    username, _ = make_user()
+    user_id = client.get(f"/users/{username}").json()["id"]
+    now = int(time.time())
+    token = token_for({"sub": str(user_id), "username": username, "iat": now - 120, "exp": now - 60})
+
+    response = me(client, token)
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+
+
+def test_cached_token_still_expires_on_time(client, make_user):
+    username, _ = make_user()
+    user_id = client.get(f"/users/{username}").json()["id"]
+    token = token_for({"sub": str(user_id), "username": username, "exp": time.time() + 1})
+
+    assert me(client, token).status_code == 200
+    time.sleep(1.2)
+    assert me(client, token).status_code == 401
+
+
+def test_token_signed_with_another_key_is_rejected(client, make_user):
+    username, _ = make_user()
+    user_id = client.get(f"/users/{username}").json()["id"]
+    token = token_for({"sub": str(user_id), "username": username, "exp": time.time() + 60}, key="not-the-server-key")
+    assert me(client, token).status_code == 401
+
+
+def test_tampered_claims_are_rejected(client, make_user):
+    _, headers = make_user()
+    victim, _ = make_user()
+    victim_id = client.get(f"/users/{victim}").json()["id"]
+    token = headers["Authorization"].split()[1]
+    header, payload, signature = token.split(".")
+
+    claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    claims.update(sub=str(victim_id), username=victim)
+    forged = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=").decode()
+    assert me(client, f"{header}.{forged}.{signature}").status_code == 401
+
+
+def test_tokens_without_expiry_or_garbage_are_rejected(client, make_user):
+    username, _ = make_user()
+    user_id = client.get(f"/users/{username}").json()["id"]
+    assert me(client, token_for({"sub": str(user_id), "username": username})).status_code == 401
+    assert me(client, "not-a-jwt").status_code == 401
+    assert client.get("/users/me").status_code == 401
@@ -0,0 +1,105 @@
+# tests/test_books.py
+import crud
+from test_query_counts import count_queries
+
+
+def test_create_book_returns_existing_book_with_the_same_status(client):
+    book = {"title": "The Dispossessed", "author": "Ursula K. Le Guin", "external_id": "test-dispossessed"}
+    first = client.post("/books/", json=book)
+    second = client.post("/books/", json=book)
+
+    assert first.status_code == second.status_code == 201
+    assert second.json() == first.json()
+
+
+def test_cached_duplicate_is_answered_with_201_without_queries(client):
+    book = {"title": "The Left Hand of Darkness", "external_id": "test-left-hand"}
+    first = client.post("/books/", json=book)
+    assert first.status_code == 201
+
+    with count_queries() as executed:
+        duplicate = client.post("/books/", json={**book, "title": "A different title"})
+    assert executed == []
+    assert duplicate.status_code == 201
+    assert duplicate.json() == first.json()
+
+    # Once evicted, the duplicate is found in the database, with the same answer
+    crud.invalidate_book(first.json()["id"])
+    with count_queries() as executed:
+        duplicate = client.post("/books/", json=book)
+    assert len(executed) == 1
+    assert duplicate.status_code == 201
+    assert duplicate.json() == first.json()
+
+
+def test_invalidate_book_drops_both_keys_without_counting_lookups(client):
+    created = client.post("/books/", json={"title": "The Lathe of Heaven", "external_id": "test-lathe"}).json()
+    assert crud.book_cache.get(created["id"]) is not None
+    before = crud.book_cache.stats(), crud.book_external_ids.stats()
+
+    crud.invalidate_book(created["id"])
+    crud.invalidate_book(created["id"])  # already gone: a no-op
+
+    after = crud.book_cache.stats(), crud.book_external_ids.stats()
+    for old, new in zip(before, after):
+        assert (new["hits"], new["misses"]) == (old["hits"], old["misses"])
+    assert crud.book_cache.pop(created["id"]) is None
+    assert crud.book_external_ids.pop("test-lathe") is None
+    assert client.get(f"/books/{created['id']}").json() == created
+
+
+def test_get_book_revalidates_with_etag(client):
+    created = client.post("/books/", json={"title": "Kindred", "external_id": "test-kindred"}).json()
+    response = client.get(f"/books/{created['id']}")
+    assert response.status_code == 200
+    assert response.json() == created
+
+    cached = client.get(f"/books/{created['id']}", headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304
+
+
+def test_bulk_import_reports_created_and_existing_in_payload_order(client):
+    first = client.post("/books/", json={"title": "Ammonite", "external_id": "test-bulk-ammonite"}).json()
+    second = client.post("/books/", json={"title": "Beloved", "external_id": "test-bulk-beloved"}).json()
+
+    response = client.post("/books/bulk", json=[
+        {"title": "Cloud Atlas", "external_id": "test-bulk-cloud-atlas"},
+        {"title": "Beloved", "external_id": "test-bulk-beloved"},
+        {"title": "Dune", "external_id": "test-bulk-dune"},
+        {"title": "Ammonite", "external_id": "test-bulk-ammonite"},
+        {"title": "Cloud Atlas again", "external_id": "test-bulk-cloud-atlas"},
+        {"title": "Untracked pamphlet"},
+    ])
+    assert response.status_code == 200
+    result = response.json()
+    assert result["existing"] == [second["id"], first["id"]]
+    assert [client.get(f"/books/{book_id}").json()["title"] for book_id in result["created"]] == [
+        "Cloud Atlas", "Dune", "Untracked pamphlet"
+    ]
+
+
+def test_bulk_import_spans_insert_chunks(client):
+    count = 1203  # more than two of crud.bulk_create_books' 500-row chunks
+    known = [0, 499, 500, 1000, 1202]
+    preexisting = client.post("/books/bulk", json=[
+        {"title": f"Chunked {i}", "external_id": f"test-chunk-{i}"} for i in known
+    ]).json()["created"]
+
+    response = client.post("/books/bulk", json=[
+        {"title": f"Chunked {i}", "external_id": f"test-chunk-{i}"} for i in range(count)
+    ])
+    result = response.json()
+    assert result["existing"] == preexisting
+    assert len(result["created"]) == count - len(known)
+    assert len(set(result["created"]) | set(preexisting)) == count
+    # Ids line up with the payload across chunk boundaries
+    new = [i for i in range(count) if i not in known]
+    for position in (0, 498, 499, 500, 994, len(new) - 1):
+        book = client.get(f"/books/{result['created'][position]}").json()
+        assert book["external_id"] == f"test-chunk-{new[position]}"
+
+    again = client.post("/books/bulk", json=[
+        {"title": f"Chunked {i}", "external_id": f"test-chunk-{i}"} for i in range(count)
+    ]).json()
+    assert again["created"] == []
+    assert len(again["existing"]) == count
@@ -0,0 +1,84 @@
+# tests/test_bulk_activity.py
+import crud
+from database import SessionLocal
+
+
+def user_id_of(client, username):
+    return client.get(f"/users/{username}").json()["id"]
+
+
+def assert_stats_exact(user_id):
+    db = SessionLocal()
+    try:
+        assert crud.rebuild_user_stats(db, user_id=user_id, dry_run=True) == []
+    finally:
+        db.close()
+
+
+def test_bulk_create_reports_an_outcome_per_item(client, make_user, seeded_db):
+    username, _ = make_user()
+    existing = client.post("/activity/", json={"username": username, "book_id": 3, "status": "reading"}).json()
+    seq = client.get("/activity/recent").headers["X-Feed-Seq"]
+
+    response = client.post("/activity/bulk", json={"username": username, "items": [
+        {"book_id": 1, "status": "wishlist"},
+        {"book_id": 2, "status": "reading", "progress": 30},
+        {"book_id": 1, "status": "reading"},
+        {"book_id": 3, "status": "wishlist"},
+        {"book_id": 10 ** 9, "status": "wishlist"},
+    ]})
+    assert response.status_code == 200
+    results = response.json()
+    assert [(item["outcome"], item["book_id"]) for item in results] == [
+        ("created", 1), ("created", 2), ("exists", 1), ("exists", 3), ("book_not_found", 10 ** 9),
+    ]
+    assert results[2]["activity_id"] == results[0]["activity_id"]
+    assert results[3]["activity_id"] == existing["id"]
+
+    assert client.get(f"/users/{username}/stats").json()["by_status"] == {"reading": 2, "wishlist": 1}
+    assert_stats_exact(user_id_of(client, username))
+    feed = client.get("/activity/recent", params={"since": seq}).json()
+    assert [item["id"] for item in feed] == [results[0]["activity_id"], results[1]["activity_id"]]
+
+
+def test_bulk_create_for_unknown_user_is_404(client):
+    response = client.post("/activity/bulk", json={"username": "nobody-here", "items": [{"book_id": 1, "status": "reading"}]})
+    assert response.status_code == 404
+
+
+def test_bulk_update_reports_an_outcome_per_patch(client, make_user, seeded_db):
+    username, _ = make_user()
+    other, _ = make_user()
+    mine = [item["activity_id"] for item in client.post("/activity/bulk", json={"username": username, "items": [
+        {"book_id": book_id, "status": "reading", "progress": 10} for book_id in (1, 2)
+    ]}).json()]
+    theirs = client.post("/activity/", json={"username": other, "book_id": 1, "status": "reading", "progress": 10}).json()
+    seq = client.get("/activity/recent").headers["X-Feed-Seq"]
+
+    response = client.put("/activity/bulk", json={"username": username, "items": [
+        {"id": mine[0], "status": "finished", "progress": 100},
+        {"id": theirs["id"], "progress": 90},
+        {"id": 10 ** 9, "progress": 50},
+        {"id": mine[1], "is_favorite": True},
+    ]})
+    assert response.status_code == 200
+    assert [(item["outcome"], item["activity_id"]) for item in response.json()] == [
+        ("updated", mine[0]), ("forbidden", theirs["id"]), ("not_found", 10 ** 9), ("updated", mine[1]),
+    ]
+
+    library = {item["id"]: item for item in client.get(f"/activity/{username}").json()["items"]}
+    assert (library[mine[0]]["status"], library[mine[0]]["progress"]) == ("finished", 100)
+    assert library[mine[1]]["is_favorite"] is True
+    assert client.get(f"/activity/book/1/user/{other}").json()["progress"] == 10
+
+    stats = client.get(f"/users/{username}/stats").json()
+    assert stats["by_status"] == {"finished": 1, "reading": 1}
+    assert_stats_exact(user_id_of(client, username))
+    assert_stats_exact(user_id_of(client, other))
+    feed = client.get("/activity/recent", params={"since": seq}).json()
+    assert [item["id"] for item in feed] == mine
+
+
+def test_bulk_update_for_unknown_user_is_404(client):
+    response = client.put("/activity/bulk", json={"username": "nobody-here", "items": [{"id": 1, "progress": 5}]})
+    assert response.status_code == 404
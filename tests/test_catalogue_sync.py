@@ -0,0 +1,80 @@
+# tests/test_catalogue_sync.py
+import threading
+import time
+
+import catalogue_sync
+import crud
+from database import SessionLocal
+
+
+def stored(external_ids):
+    db = SessionLocal()
+    try:
+        return [external_id for external_id in external_ids if crud.get_book_by_google_id(db, external_id)]
+    finally:
+        db.close()
+
+
+def test_search_returns_before_results_are_persisted(client, monkeypatch):
+    # Hold the worker inside its write until the search has been answered
+    release = threading.Event()
+    writing = threading.Event()
+    bulk_create_books = crud.bulk_create_books
+
+    def slow_bulk_create_books(db, books, *args, **kwargs):
+        writing.set()
+        release.wait(10)
+        return bulk_create_books(db, books, *args, **kwargs)
+
+    monkeypatch.setattr(crud, "bulk_create_books", slow_bulk_create_books)
+    created = catalogue_sync.sync.created
+
+    start = time.perf_counter()
+    response = client.get("/books/search", params={"q": "write behind lighthouse", "source": "remote"})
+    elapsed = time.perf_counter() - start
+
+    assert response.status_code == 200
+    external_ids = [book["external_id"] for book in response.json()]
+    assert len(external_ids) == 8
+    assert elapsed < 2
+    assert writing.wait(5), "the worker never picked the results up"
+    assert stored(external_ids) == []
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while catalogue_sync.sync.created < created + len(external_ids) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert stored(external_ids) == external_ids
+
+
+def test_stop_drains_a_full_queue_without_blocking_on_it(monkeypatch):
+    sync = catalogue_sync.CatalogueSync(queue_size=2, batch_size=1, interval=0.05)
+    flushed = []
+    release = threading.Event()
+    writing = threading.Event()
+
+    def slow_flush(batch):
+        writing.set()
+        release.wait(10)
+        flushed.extend(book.external_id for book in batch)
+
+    monkeypatch.setattr(sync, "_flush", slow_flush)
+    sync.start()
+    sync.enqueue([{"external_id": "full-0", "title": "Zero"}])
+    assert writing.wait(5)
+    # The worker is busy, so these fill the queue and leave no room for the sentinel
+    sync.enqueue([{"external_id": f"full-{i}", "title": "More"} for i in (1, 2)])
+    assert sync.stats()["queue_depth"] == 2
+
+    start = time.perf_counter()
+    stopper = threading.Thread(target=sync.stop)
+    stopper.start()
+    time.sleep(0.1)
+    release.set()
+    stopper.join(5)
+
+    assert not stopper.is_alive()
+    assert sync._stopping.is_set()
+    assert time.perf_counter() - start < 5
+    assert flushed == ["full-0", "full-1", "full-2"]
+    assert sync._thread is None
@@ -0,0 +1,139 @@
+# tests/test_compression.py
+import asyncio
+import gzip
+import json
+
+import brotli
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from compression import CompressionMiddleware
+
+BIG = "readify " * 500
+CHUNKS = [json.dumps({"line": i, "text": "lantern " * 300}).encode() + b"\n" for i in range(4)]
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse(BIG)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("short")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter(CHUNKS), media_type="application/x-ndjson")
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter(CHUNKS), media_type="text/event-stream")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return app
+
+
+app = build_app()
+
+
+def call(path: str, accept_encoding: str) -> list:
+    """Raw ASGI messages sent for one request, chunk by chunk"""
+    messages = []
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": [(b"accept-encoding", accept_encoding.encode())],
+        "server": ("test", 80), "client": ("test", 1),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages
+
+
+def response_headers(messages) -> dict:
+    return {name.decode(): value.decode() for name, value in messages[0]["headers"]}
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("br, gzip", "br"),
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("BR;q=0.5", "br"),
+    ("*", "br"),
+    ("br;q=0, *", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=0, *;q=0.1", "br"),
+    ("identity", None),
+    ("", None),
+])
+def test_encoding_is_negotiated(accept_encoding, expected):
+    response = TestClient(app).get("/big", headers={"Accept-Encoding": accept_encoding})
+    assert response.headers.get("content-encoding") == expected
+    assert response.text == BIG
+    assert "accept-encoding" in response.headers["vary"].lower()
+
+
+@pytest.mark.parametrize("accept_encoding", ["br", "gzip"])
+def test_small_bodies_are_sent_as_is(accept_encoding):
+    messages = call("/small", accept_encoding)
+    assert "content-encoding" not in response_headers(messages)
+    assert messages[1]["body"] == b"short"
+
+
+def test_brotli_lengths_match_the_compressed_body():
+    messages = call("/big", "br")
+    headers = response_headers(messages)
+    assert int(headers["content-length"]) == len(messages[1]["body"])
+    assert brotli.decompress(messages[1]["body"]).decode() == BIG
+
+
+def test_brotli_stream_chunks_decode_as_they_arrive():
+    messages = call("/stream", "br")
+    headers = response_headers(messages)
+    assert headers["content-encoding"] == "br"
+    assert "content-length" not in headers
+
+    decompressor = brotli.Decompressor()
+    bodies = [message for message in messages[1:] if message.get("body")]
+    decoded = [decompressor.process(message["body"]) for message in bodies]
+    # Every chunk was flushed, so each one decodes to exactly what was sent;
+    # the closing message only ends the stream
+    assert decoded == CHUNKS + [b""]
+    assert decompressor.is_finished()
+
+
+def test_gzip_stream_round_trips():
+    messages = call("/stream", "gzip")
+    assert response_headers(messages)["content-encoding"] == "gzip"
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    assert gzip.decompress(body) == b"".join(CHUNKS)
+
+
+@pytest.mark.parametrize("accept_encoding", ["br", "gzip", "br, gzip"])
+def test_event_streams_are_left_uncompressed(accept_encoding):
+    messages = call("/events", accept_encoding)
+    assert "content-encoding" not in response_headers(messages)
+    assert b"".join(message.get("body", b"") for message in messages[1:]) == b"".join(CHUNKS)
+
+
+def test_api_responses_are_compressed(client, seeded_db):
+    plain = client.get("/books/", params={"limit": 50}, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    for coding in ("br", "gzip"):
+        response = client.get("/books/", params={"limit": 50}, headers={"Accept-Encoding": coding})
+        assert response.headers["content-encoding"] == coding
+        assert response.json() == plain.json()
+        assert int(response.headers["content-length"]) < len(plain.content) / 2
+
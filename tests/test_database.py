@@ -0,0 +1,21 @@
+# tests/test_database.py
+from sqlalchemy import text
+
+from bench.db_contention import contend
+from database import build_engine
+
+# Write latency the tuned engine must hold with readers running
+WRITE_P95_TARGET_MS = 100
+
+
+def test_readers_do_not_lock_out_writers(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'contention.db'}")
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+    result = contend(engine, seconds=1.0, readers=4, writers=2, rows=1000)
+
+    assert result["errors"] == 0, result["first_error"]
+    assert result["reads_per_s"] > 0
+    assert result["writes"]["count"] > 50
+    assert result["writes"]["p95_ms"] < WRITE_P95_TARGET_MS
@@ -0,0 +1,37 @@
+# tests/test_google_books.py
+import asyncio
+import time
+
+import google_books
+
+
+def test_repeat_search_is_served_from_cache(stub_upstream):
+    async def run():
+        start = time.perf_counter()
+        first = await google_books.cached_search("dune", 8)
+        miss = time.perf_counter() - start
+
+        start = time.perf_counter()
+        second = await google_books.cached_search("  DUNE ", 8)
+        hit = time.perf_counter() - start
+        return first, second, miss, hit
+
+    calls = stub_upstream.calls
+    first, second, miss, hit = asyncio.run(run())
+
+    assert second == first and len(first) == 8
+    assert stub_upstream.calls == calls + 1
+    assert miss >= stub_upstream.STUB_GOOGLE_LATENCY_MS / 1000
+    assert hit < miss / 10
+
+
+def test_concurrent_misses_share_one_upstream_call(stub_upstream):
+    async def run():
+        return await asyncio.gather(*(google_books.cached_search("foundation", 8) for _ in range(20)))
+
+    calls = stub_upstream.calls
+    results = asyncio.run(run())
+
+    assert stub_upstream.calls == calls + 1
+    assert all(result == results[0] for result in results)
+    assert not google_books._inflight
@@ -0,0 +1,84 @@
+# tests/test_http_cache.py
+from pagination import encode_cursor
+
+
+def revalidate(client, url, etag, **params):
+    return client.get(url, params=params, headers={"If-None-Match": etag})
+
+
+def test_library_poll_is_answered_with_304_until_a_write(client, make_user, seeded_db):
+    username, _ = make_user()
+    other, _ = make_user()
+    url = f"/activity/{username}"
+    created = client.post("/activity/", json={"username": username, "book_id": 1, "status": "reading"}).json()
+
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert client.get(url).headers["ETag"] == etag
+
+    cached = revalidate(client, url, etag)
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+    assert cached.headers["Cache-Control"] == "private, no-cache"
+    assert revalidate(client, url, f'W/{etag}, "other"').status_code == 304
+    # The page size and cursor are part of the tag
+    assert revalidate(client, url, etag, limit=1).status_code == 200
+
+    # Another user's writes leave this library's tag alone
+    client.post("/activity/", json={"username": other, "book_id": 1, "status": "reading"})
+    assert revalidate(client, url, etag).status_code == 304
+
+    seen = {etag}
+    writes = [
+        lambda: client.post("/activity/", json={"username": username, "book_id": 2, "status": "wishlist"}),
+        lambda: client.put(f"/activity/{created['id']}", json={"progress": 55}),
+        lambda: client.put(f"/activity/{created['id']}", json={"is_favorite": True}),
+        lambda: client.delete(f"/activity/{created['id']}"),
+    ]
+    for write in writes:
+        assert write().status_code < 400
+        response = revalidate(client, url, etag)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert etag not in seen
+        seen.add(etag)
+        assert revalidate(client, url, etag).status_code == 304
+
+    assert [item["book"]["id"] for item in client.get(url).json()["items"]] == [2]
+
+
+def test_book_list_tag_changes_when_its_page_does(client, seeded_db):
+    last_id = client.post("/books/", json={"title": "Parable of the Sower", "external_id": "test-etag-sower"}).json()["id"]
+    params = {"after": encode_cursor(last_id)}
+
+    first = client.get("/books/", params=params)
+    assert first.json()["items"] == []
+    assert first.headers["Cache-Control"] == "public, no-cache"
+    etag = first.headers["ETag"]
+    assert revalidate(client, "/books/", etag, **params).status_code == 304
+
+    added = client.post("/books/", json={"title": "Parable of the Talents", "external_id": "test-etag-talents"}).json()
+    response = revalidate(client, "/books/", etag, **params)
+    assert response.status_code == 200
+    assert [book["id"] for book in response.json()["items"]] == [added["id"]]
+    assert response.headers["ETag"] != etag
+
+
+def test_book_and_profile_carry_cache_headers(client, make_user):
+    created = client.post("/books/", json={"title": "Lilith's Brood", "external_id": "test-etag-lilith"}).json()
+    book = client.get(f"/books/{created['id']}")
+    assert book.headers["Cache-Control"] == "public, max-age=300"
+    cached = revalidate(client, f"/books/{created['id']}", book.headers["ETag"])
+    assert cached.status_code == 304
+    assert cached.headers["Cache-Control"] == "public, max-age=300"
+    # Tags are per book
+    other = client.post("/books/", json={"title": "Fledgling", "external_id": "test-etag-fledgling"}).json()
+    assert revalidate(client, f"/books/{other['id']}", book.headers["ETag"]).status_code == 200
+
+    username, _ = make_user()
+    profile = client.get(f"/users/{username}")
+    assert profile.headers["Cache-Control"] == "private, no-cache"
+    assert revalidate(client, f"/users/{username}", profile.headers["ETag"]).status_code == 304
+    assert revalidate(client, f"/users/{username}", "*").status_code == 304
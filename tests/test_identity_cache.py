@@ -0,0 +1,70 @@
+# tests/test_identity_cache.py
+import asyncio
+
+import crud
+from cache import SQLiteCache, TTLCache
+from database import AsyncSessionLocal, SessionLocal
+
+
+def test_update_invalidates_cached_identity(client, make_user):
+    username, _ = make_user()
+    profile = client.get(f"/users/{username}").json()
+    assert crud.identity_cache.get(username) is not None
+
+    updated = client.put(f"/users/{profile['id']}", json={"full_name": "Ada Lovelace"})
+    assert updated.status_code == 200
+    assert crud.identity_cache.get(username) is None
+    assert client.get(f"/users/{username}").json()["full_name"] == "Ada Lovelace"
+
+
+def _racing_update(read_user):
+    """Wrap a user lookup so an update lands between the read and the cache fill"""
+    def wrapper(db, username):
+        user = read_user(db, username)
+        crud.invalidate_user_identity(username)
+        return user
+    return wrapper
+
+
+def test_read_racing_an_update_is_not_cached(client, make_user, monkeypatch):
+    username, _ = make_user()
+    crud.invalidate_user_identity(username)
+    monkeypatch.setattr(crud, "get_user_by_username", _racing_update(crud.get_user_by_username))
+
+    db = SessionLocal()
+    try:
+        identity = crud.get_user_identity(db, username)
+    finally:
+        db.close()
+
+    assert identity.username == username
+    assert crud.identity_cache.get(username) is None
+
+
+def test_async_read_racing_an_update_is_not_cached(client, make_user, monkeypatch):
+    username, _ = make_user()
+    crud.invalidate_user_identity(username)
+    read_user = crud.get_user_by_username_async
+
+    async def racing(db, name):
+        user = await read_user(db, name)
+        crud.invalidate_user_identity(name)
+        return user
+
+    monkeypatch.setattr(crud, "get_user_by_username_async", racing)
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            return await crud.get_user_identity_async(db, username)
+
+    assert asyncio.run(run()).username == username
+    assert crud.identity_cache.get(username) is None
+
+
+def test_pop_removes_without_counting_a_lookup(tmp_path):
+    for cache in (TTLCache(), SQLiteCache(str(tmp_path / "pop.db"))):
+        cache.set("key", {"id": 1})
+        assert cache.pop("key") == {"id": 1}
+        assert cache.pop("key", "gone") == "gone"
+        assert cache.get("key") is None
+        assert (cache.stats()["hits"], cache.stats()["misses"]) == (0, 1)
@@ -0,0 +1,69 @@
+# tests/test_metrics.py
+import logging
+
+import metrics
+
+
+def scrape(client) -> dict:
+    """Sample name (with labels) -> value from GET /metrics"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            samples[name] = float(value)
+    return samples
+
+
+def test_requests_are_recorded_by_route_template(client, seeded_db):
+    series = 'method="GET",route="/books/{book_id}",status="200"'
+    before = scrape(client)
+    for book_id in (1, 2, 3):
+        assert client.get(f"/books/{book_id}").status_code == 200
+    assert client.get("/books/999999999").status_code == 404
+    after = scrape(client)
+
+    count = f"readify_http_request_duration_seconds_count{{{series}}}"
+    assert after[count] - before.get(count, 0) == 3
+    assert after[f"readify_http_request_duration_seconds_sum{{{series}}}"] > 0
+    missing = 'readify_http_request_duration_seconds_count{method="GET",route="/books/{book_id}",status="404"}'
+    assert after[missing] - before.get(missing, 0) == 1
+    # /books/1 and /books/2 share one series: no per-id labels
+    assert not any("/books/1" in name for name in after)
+
+    queries = 'readify_http_request_db_queries_count{route="/books/{book_id}"}'
+    assert after[queries] - before.get(queries, 0) == 4
+    assert after["readify_db_query_duration_seconds_count"] >= before.get("readify_db_query_duration_seconds_count", 0)
+    assert "readify_book_cache_hits" in after
+    assert "readify_catalogue_sync_queue_depth" in after
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test", (0.1, 1.0), ("route",))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/x")
+
+    lines = histogram.render()
+    assert 'test_seconds_bucket{route="/x",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{route="/x",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{route="/x"} 3.65' in lines
+    assert 'test_seconds_count{route="/x"} 4' in lines
+
+
+def test_slow_queries_are_logged_without_their_parameters(client, monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "SLOW_QUERY_MS", 0)
+    before = scrape(client).get("readify_db_slow_queries_total", 0)
+
+    with caplog.at_level(logging.WARNING, logger="metrics"):
+        response = client.post("/auth/signup", json={
+            "username": "slow-query-secret-name", "password": "slow-query-secret-password",
+        })
+    assert response.status_code == 200
+
+    assert "Slow query" in caplog.text
+    assert "parameters redacted" in caplog.text
+    assert "slow-query-secret" not in caplog.text
+    assert scrape(client)["readify_db_slow_queries_total"] > before
@@ -0,0 +1,93 @@
+# tests/test_migrations.py
+import logging
+import os
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+import models  # noqa: F401 (registers the tables on Base.metadata)
+from database import Base, ensure_schema
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic_env_filter(object, name, type_, reflected, compare_to):
+    """Skip what alembic/env.py leaves out of autogenerate (the FTS index)"""
+    return not (type_ == "table" and name.startswith("books_fts"))
+
+
+@pytest.fixture
+def migrations(tmp_path):
+    """An Alembic config and engine for an empty SQLite file"""
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    config = Config()
+    config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+    config.set_main_option("sqlalchemy.url", url)
+    engine = create_engine(url)
+    yield config, engine
+    engine.dispose()
+
+
+def test_duplicate_activities_are_merged_before_the_unique_index(migrations, caplog):
+    config, engine = migrations
+    command.upgrade(config, "384df1149443")
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO users (id, username, password_hash) VALUES (1, 'reader', 'x')"))
+        connection.execute(text("INSERT INTO books (id, title) VALUES (1, 'One'), (2, 'Two')"))
+        connection.execute(text(
+            "INSERT INTO reading_activity (id, user_id, book_id, status, progress, date_added) VALUES "
+            "(1, 1, 1, 'reading', 10, '2026-01-01 00:00:00'), "
+            "(2, 1, 1, 'finished', 100, '2026-02-01 00:00:00'), "
+            "(3, 1, 1, 'reading', 100, '2026-03-01 00:00:00'), "
+            "(4, 1, 2, 'wishlist', NULL, '2026-04-01 00:00:00')"
+        ))
+
+    with caplog.at_level(logging.WARNING):
+        command.upgrade(config, "7c2e9a41b5d3")
+
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT id, book_id, status, progress, date_added FROM reading_activity ORDER BY id"
+        )).all()
+    # Most progress wins, the later row on a tie, keeping the first date_added
+    assert [tuple(row) for row in rows] == [
+        (3, 1, "reading", 100, "2026-01-01 00:00:00"),
+        (4, 2, "wishlist", None, "2026-04-01 00:00:00"),
+    ]
+    assert "Merging 2 duplicate reading_activity rows" in caplog.text
+
+
+def test_migrations_build_the_schema_the_models_describe(migrations):
+    config, engine = migrations
+    command.upgrade(config, "head")
+
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={"include_object": alembic_env_filter})
+        assert compare_metadata(context, Base.metadata) == []
+
+
+def test_startup_schema_is_stamped_so_migrations_apply_cleanly(migrations):
+    config, engine = migrations
+    ensure_schema(engine)
+    with engine.connect() as connection:
+        assert MigrationContext.configure(connection).get_current_revision() == ScriptDirectory.from_config(config).get_current_head()
+
+    command.upgrade(config, "head")  # nothing to do, and no "table already exists"
+
+
+def test_startup_leaves_migrated_databases_to_alembic(migrations, caplog):
+    config, engine = migrations
+    command.upgrade(config, "7c2e9a41b5d3")
+
+    with caplog.at_level(logging.WARNING):
+        ensure_schema(engine)
+    assert "run `alembic upgrade head`" in caplog.text
+    with engine.connect() as connection:
+        assert "user_reading_stats" not in inspect(connection).get_table_names()
+
+    command.upgrade(config, "head")
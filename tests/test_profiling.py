@@ -0,0 +1,103 @@
+# tests/test_profiling.py
+import json
+import time
+from collections import Counter
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import profiling
+from profiling import PROFILER_HEADER, ProfileStore, ProfilerMiddleware, sign_debug_header, verify_debug_header
+
+
+def busy_work():
+    deadline = time.perf_counter() + 0.1
+    while time.perf_counter() < deadline:
+        pass
+
+
+def build(tmp_path, sample_rate=0.0, max_files=200):
+    app = FastAPI()
+
+    @app.get("/work/{item}")
+    def work(item: int):
+        busy_work()
+        return {"item": item}
+
+    store = ProfileStore(str(tmp_path), max_files=max_files)
+    middleware = ProfilerMiddleware(app, sample_rate=sample_rate, interval_ms=1, store=store)
+    return middleware, TestClient(middleware)
+
+
+def wait_for_profiles(tmp_path, *profile_ids) -> list:
+    """Metadata of the written profiles (the sampler writes after the response)"""
+    deadline = time.monotonic() + 5
+    while not all((tmp_path / f"{profile_id}.json").exists() for profile_id in profile_ids):
+        assert time.monotonic() < deadline, "profile never written"
+        time.sleep(0.02)
+    return [json.loads(path.read_text()) for path in sorted(tmp_path.glob("*.json"))]
+
+
+def test_debug_header_signature_and_expiry():
+    now = time.time()
+    value = sign_debug_header(now)
+    assert verify_debug_header(value, now)
+    assert verify_debug_header(value, now + profiling.PROFILER_MAX_SKEW - 1)
+    assert not verify_debug_header(value, now + profiling.PROFILER_MAX_SKEW + 5)
+
+    timestamp, signature = value.split(".")
+    assert not verify_debug_header(f"{int(timestamp) + 1}.{signature}", now)
+    tampered = signature[:-1] + ("1" if signature.endswith("0") else "0")
+    assert not verify_debug_header(f"{timestamp}.{tampered}", now)
+    for garbage in (None, "", "nodot", "abc.def", f".{signature}"):
+        assert not verify_debug_header(garbage, now)
+
+
+def test_signed_request_writes_a_profile(tmp_path):
+    _, client = build(tmp_path)
+    response = client.get("/work/7", headers={PROFILER_HEADER: sign_debug_header()})
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+
+    [metadata] = wait_for_profiles(tmp_path, profile_id)
+    assert metadata["id"] == profile_id
+    assert metadata["trigger"] == "header"
+    assert metadata["route"] == "/work/{item}"
+    assert metadata["path"] == "/work/7"
+    assert metadata["status"] == 200
+    assert metadata["duration_ms"] >= 100
+    assert metadata["samples"] > 0
+
+    stacks = Counter()
+    for line in (tmp_path / f"{profile_id}.collapsed").read_text().splitlines():
+        stack, _, count = line.rpartition(" ")
+        stacks[stack] = int(count)
+    # The threadpool worker running the endpoint is caught in the busy loop
+    busy = sum(count for stack, count in stacks.items() if "busy_work (tests/test_profiling.py" in stack)
+    assert busy > 0
+    assert all(";" in stack or stack == "[event loop idle]" for stack in stacks)
+
+
+def test_unsigned_and_badly_signed_requests_are_not_profiled(tmp_path):
+    _, client = build(tmp_path)
+    assert "X-Profile-Id" not in client.get("/work/1").headers
+    stale = sign_debug_header(time.time() - profiling.PROFILER_MAX_SKEW - 10)
+    assert "X-Profile-Id" not in client.get("/work/1", headers={PROFILER_HEADER: stale}).headers
+    time.sleep(0.05)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sampled_requests_and_the_concurrency_cap(tmp_path):
+    middleware, client = build(tmp_path, sample_rate=1.0, max_files=2)
+    ids = [client.get(f"/work/{i}").headers["X-Profile-Id"] for i in range(3)]
+    # Only the newest profiles are kept
+    profiles = wait_for_profiles(tmp_path, ids[-1])
+    assert [metadata["id"] for metadata in profiles] == ids[1:]
+    assert {metadata["trigger"] for metadata in profiles} == {"sampled"}
+
+    # With every slot taken, requests are served without a profile
+    for _ in range(profiling.PROFILER_MAX_CONCURRENT):
+        middleware._slots.acquire()
+    response = client.get("/work/9")
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
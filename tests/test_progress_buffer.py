@@ -0,0 +1,180 @@
+# tests/test_progress_buffer.py
+import threading
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import schemas
+from progress_buffer import ProgressBuffer
+
+
+class BlockingWriter:
+    """apply_updates stand-in that holds the flush open until released"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.written = {}
+
+    def __call__(self, db, updates):
+        self.entered.set()
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.written.update(updates)
+
+
+def flush_in_background(buffer: ProgressBuffer) -> threading.Thread:
+    thread = threading.Thread(target=buffer.flush)
+    thread.start()
+    return thread
+
+
+def test_batch_stays_visible_while_it_is_written():
+    buffer = ProgressBuffer()
+    buffer._apply = writer = BlockingWriter()
+    buffer.add(1, user_id=7, progress=40)
+    generation = buffer.generation(7)
+
+    thread = flush_in_background(buffer)
+    assert writer.entered.wait(5)
+    activity = SimpleNamespace(id=1, progress=10)
+    buffer.overlay([activity])
+    assert buffer.get(1) == 40 and activity.progress == 40
+    assert buffer.generation(7) == generation
+    assert buffer.stats()["flushing"] == 1
+
+    writer.release.set()
+    thread.join(5)
+    assert writer.written == {1: 40}
+    assert buffer.get(1) is None
+    assert buffer.stats()["flushing"] == 0
+
+
+def test_failed_batch_is_merged_back_behind_newer_updates():
+    buffer = ProgressBuffer()
+    buffer._apply = writer = BlockingWriter(fail=True)
+    buffer.add(1, user_id=7, progress=40)
+    buffer.add(2, user_id=7, progress=50)
+
+    thread = flush_in_background(buffer)
+    assert writer.entered.wait(5)
+    buffer.add(2, user_id=7, progress=60)
+    writer.release.set()
+    thread.join(5)
+
+    assert buffer.get(1) == 40
+    assert buffer.get(2) == 60
+    assert buffer.stats()["pending"] == 2 and buffer.stats()["flushing"] == 0
+    assert buffer.errors == 1
+
+
+def test_write_behind_progress_is_read_back_and_flushed(client, make_user, seeded_db):
+    import crud
+    import progress_buffer
+    from database import SessionLocal
+
+    username, _ = make_user()
+    activity = client.post("/activity/", json={"username": username, "book_id": 20, "status": "reading"}).json()
+    buffer = progress_buffer.buffer
+    interval, buffer.interval = buffer.interval, 60
+    buffer.start(crud.apply_progress_updates)
+    try:
+        assert client.put(f"/activity/{activity['id']}", json={"progress": 75}).json()["progress"] == 75
+        assert buffer.get(activity["id"]) == 75
+        library = client.get(f"/activity/{username}").json()["items"]
+        assert [item["progress"] for item in library] == [75]
+
+        assert buffer.flush() == 1
+    finally:
+        buffer.stop()
+        buffer.interval = interval
+
+    db = SessionLocal()
+    try:
+        user_id = client.get(f"/users/{username}").json()["id"]
+        assert crud.get_activity_by_book_and_user(db, 20, user_id).progress == 75
+        assert crud.rebuild_user_stats(db, user_id=user_id, dry_run=True) == []
+    finally:
+        db.close()
+
+
+def test_taken_values_are_put_back_when_the_write_fails():
+    buffer = ProgressBuffer()
+    buffer.add(1, user_id=7, progress=40)
+    buffer.add(2, user_id=7, progress=50)
+    generation = buffer.generation(7)
+
+    with pytest.raises(RuntimeError):
+        with buffer.taken([1, 2, 3]) as taken:
+            assert taken == {1: 40, 2: 50}
+            assert buffer.get(1) is None
+            buffer.add(2, user_id=7, progress=60)  # newer than the taken value
+            raise RuntimeError("commit failed")
+
+    assert buffer.get(1) == 40
+    assert buffer.get(2) == 60
+    # Reads made while the value was out saw the old row: invalidate them
+    assert buffer.generation(7) > generation + 1
+
+    with buffer.taken([1, 2]) as taken:
+        assert taken == {1: 40, 2: 60}
+    assert buffer.get(1) is None and buffer.get(2) is None
+
+
+def test_snapshot_covers_a_flush_that_commits_before_the_overlay():
+    buffer = ProgressBuffer()
+    buffer._apply = writer = BlockingWriter()
+    buffer.add(1, user_id=7, progress=40)
+    buffer.add(2, user_id=8, progress=90)
+
+    snapshot = buffer.snapshot(7)
+    assert snapshot == {1: 40}
+    # The flush commits between the reader's snapshot and its SELECT result
+    writer.release.set()
+    assert buffer.flush() == 2
+    assert buffer.get(1) is None
+
+    activity = SimpleNamespace(id=1, progress=10)  # loaded before the commit
+    buffer.overlay([activity], snapshot)
+    assert activity.progress == 40
+
+
+def failing_commit(db):
+    def commit():
+        raise OperationalError("COMMIT", {}, Exception("database is locked"))
+    db.commit = commit
+
+
+def test_update_that_fails_to_commit_keeps_the_buffered_progress(client, make_user, seeded_db):
+    import crud
+    import progress_buffer
+    from database import SessionLocal
+
+    username, _ = make_user()
+    activity = client.post("/activity/", json={"username": username, "book_id": 21, "status": "reading"}).json()
+    user_id = client.get(f"/users/{username}").json()["id"]
+    buffer = progress_buffer.buffer
+    buffer.add(activity["id"], user_id, 65)
+
+    db = SessionLocal()
+    try:
+        failing_commit(db)
+        with pytest.raises(OperationalError):
+            crud.update_activity(db, activity["id"], status="completed")
+        db.rollback()
+        with pytest.raises(OperationalError):
+            crud.bulk_update_activities(db, crud.get_user_identity(db, username), [
+                schemas.ActivityPatch(id=activity["id"], is_favorite=True),
+            ])
+    finally:
+        db.close()
+    assert buffer.get(activity["id"]) == 65
+    assert [item["progress"] for item in client.get(f"/activity/{username}").json()["items"]] == [65]
+
+    # The next write that succeeds folds it in
+    updated = client.put(f"/activity/{activity['id']}", json={"status": "completed"}).json()
+    assert (updated["status"], updated["progress"]) == ("completed", 65)
+    assert buffer.get(activity["id"]) is None
@@ -0,0 +1,73 @@
+# tests/test_query_counts.py
+"""
+Library endpoints must run a fixed number of SQL statements, however many
+books the user has: a count that grows with the library is an N+1.
+"""
+import contextlib
+
+import pytest
+from sqlalchemy import event
+
+from database import async_engine, engine
+
+SMALL_LIBRARY = 3
+LARGE_LIBRARY = 120
+PAGE = 50
+
+ENDPOINTS = [
+    "/activity/{username}?limit=%d" % PAGE,
+    "/activity/{username}/export",
+    "/activity/book/1/user/{username}",
+    "/books/my-books?username={username}&limit=%d" % PAGE,
+    "/users/{username}/stats",
+]
+
+
+@contextlib.contextmanager
+def count_queries():
+    """Count statements on both the sync and the async engine"""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield executed
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def library(client, make_user, seeded_db):
+    """Create a user with `size` activities (books 1..size)"""
+    def make(size):
+        username, _ = make_user()
+        response = client.post("/activity/bulk", json={
+            "username": username,
+            "items": [{"book_id": book_id, "status": "reading", "progress": book_id % 100} for book_id in range(1, size + 1)],
+        })
+        assert response.status_code == 200, response.text
+        assert all(item["outcome"] == "created" for item in response.json())
+        return username
+    return make
+
+
+def queries_for(client, path):
+    # The first request fills caches (identity, books); count a warm one
+    assert client.get(path).status_code == 200
+    with count_queries() as executed:
+        response = client.get(path)
+    assert response.status_code == 200, response.text
+    return len(executed)
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_query_count_does_not_grow_with_library(client, library, endpoint):
+    small = queries_for(client, endpoint.format(username=library(SMALL_LIBRARY)))
+    large = queries_for(client, endpoint.format(username=library(LARGE_LIBRARY)))
+    assert small == large
+    assert large <= 3
@@ -0,0 +1,60 @@
+# tests/test_query_plans.py
+"""
+The reading_activity access paths must stay on their indexes. Plans are
+taken on a seeded database after ANALYZE, as SQLite would run them.
+"""
+import pytest
+from sqlalchemy import func, select
+
+import crud
+from database import SessionLocal, engine
+from models import Activity
+
+
+def query_plan(statement) -> str:
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return "\n".join(row[-1] for row in rows)
+
+
+@pytest.fixture(scope="module")
+def user_id(seeded_db):
+    db = SessionLocal()
+    try:
+        return db.scalar(select(Activity.user_id).order_by(Activity.id).limit(1))
+    finally:
+        db.close()
+
+
+def test_activity_by_book_and_user_uses_unique_index(user_id):
+    plan = query_plan(select(Activity).where(Activity.book_id == 1, Activity.user_id == user_id))
+    assert "USING INDEX ix_reading_activity_user_id_book_id" in plan
+
+
+def test_user_activities_use_a_user_id_index(user_id):
+    plan = query_plan(select(Activity.id, Activity.book_id).where(Activity.user_id == user_id))
+    assert "USING COVERING INDEX ix_reading_activity_user_id_" in plan
+
+
+def test_stats_by_status_use_status_index(user_id):
+    plan = query_plan(
+        select(Activity.status, func.count())
+        .where(Activity.user_id == user_id)
+        .group_by(Activity.user_id, Activity.status)
+    )
+    assert "USING COVERING INDEX ix_reading_activity_user_id_status" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_recent_activities_use_date_added_index(seeded_db):
+    plan = query_plan(crud._recent_activities_stmt(10))
+    assert "USING INDEX ix_reading_activity_date_added" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.parametrize("after_id", [None, 10])
+def test_library_page_seeks_without_sorting(user_id, after_id):
+    plan = query_plan(crud._user_activities_stmt(user_id, limit=50, after_id=after_id))
+    assert "USING INDEX ix_reading_activity_user_id_id" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,57 @@
+# tests/test_user_stats.py
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+import crud
+from database import SessionLocal
+from models import UserStats
+
+
+def stats_row(db, user_id, status):
+    row = db.scalar(select(UserStats).where(UserStats.user_id == user_id, UserStats.status == status))
+    return (row.activity_count, row.favorite_count, row.progress_total) if row else None
+
+
+def test_stats_deltas_upsert_and_accumulate(client, make_user):
+    username, _ = make_user()
+    user_id = client.get(f"/users/{username}").json()["id"]
+
+    db = SessionLocal()
+    try:
+        crud._apply_stats_deltas(db, {(user_id, "finished"): [1, 1, 100]})
+        db.commit()
+        assert stats_row(db, user_id, "finished") == (1, 1, 100)
+
+        crud._apply_stats_deltas(db, {(user_id, "finished"): [2, 0, 50]})
+        db.commit()
+        assert stats_row(db, user_id, "finished") == (3, 1, 150)
+    finally:
+        db.close()
+
+
+def test_activity_writes_keep_stats_exact(client, make_user, seeded_db):
+    username, _ = make_user()
+    for book_id in (1, 2, 3):
+        response = client.post("/activity/", json={"username": username, "book_id": book_id, "status": "reading", "progress": 10})
+        assert response.status_code == 201
+    activity_id = response.json()["id"]
+    assert client.put(f"/activity/{activity_id}", json={"status": "finished", "progress": 100}).status_code == 200
+
+    assert client.get(f"/users/{username}/stats").json()["by_status"] == {"reading": 2, "finished": 1}
+    user_id = client.get(f"/users/{username}").json()["id"]
+    db = SessionLocal()
+    try:
+        assert crud.rebuild_user_stats(db, user_id=user_id, dry_run=True) == []
+    finally:
+        db.close()
+
+
+def test_create_activity_conflict_without_duplicate_is_409(client, make_user, seeded_db, monkeypatch):
+    username, _ = make_user()
+
+    def conflicting(*args, **kwargs):
+        raise IntegrityError("INSERT INTO reading_activity", {}, Exception("constraint failed"))
+
+    monkeypatch.setattr(crud, "create_activity", conflicting)
+    response = client.post("/activity/", json={"username": username, "book_id": 4, "status": "reading"})
+    assert response.status_code == 409